@@ -0,0 +1,81 @@
+# =========================
+# Файл: tests/conftest.py
+# =========================
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# web — пакет без __init__.py в корне репозитория: тесты импортируют его как web.<модуль>
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# web.app и web.uc_api читают окружение при импорте: все данные тестов — во временном каталоге,
+# до первого импорта любого модуля web
+DATA_DIR = Path(tempfile.mkdtemp(prefix="uc-tests-"))
+atexit.register(shutil.rmtree, DATA_DIR, True)
+os.environ.update({
+    "UC_DATA_DIR": str(DATA_DIR),
+    "UC_WARMUP": "off",
+    "UC_MAX_RUNNING_JOBS": "4",
+    "PYTHON": sys.executable,
+})
+
+
+def write_tree(root: Path, files: dict) -> Path:
+    """Создать файлы {относительный путь: текст} в root."""
+    for rel, text in files.items():
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text, encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    """Маленький репозиторий: пакет из двух модулей с импортом и вызовом между ними."""
+    return write_tree(tmp_path / "repo", {
+        "pkg/__init__.py": "",
+        "pkg/a.py": "import os\n\n\ndef helper():\n    return os.getcwd()\n",
+        "pkg/b.py": "from pkg.a import helper\n\n\nclass B:\n    def run(self):\n        return helper()\n",
+    })
+
+
+# __main__.py встроенного репозитория для тестов /api/run: первый аргумент — сценарий
+STUB_MAIN = '''import sys, time
+cmd, args = sys.argv[1], sys.argv[2:]
+if cmd == "echo":
+    for a in args:
+        print(a, flush=True)
+elif cmd == "sleep":
+    time.sleep(float(args[0]))
+elif cmd == "fail":
+    print("boom", file=sys.stderr)
+    sys.exit(3)
+'''
+
+
+@pytest.fixture(scope="session")
+def web_app():
+    """Модуль web.app (один на сессию) со встроенным репозиторием в DATA_DIR/repos/UC."""
+    write_tree(DATA_DIR / "repos" / "UC", {
+        "__main__.py": STUB_MAIN,
+        "pkg/__init__.py": "",
+        "pkg/a.py": "import os\n\n\ndef helper():\n    return os.getcwd()\n",
+        "pkg/b.py": "from pkg.a import helper\n\n\ndef run():\n    return helper()\n",
+    })
+    from web import app as module
+    return module
+
+
+@pytest.fixture
+def client(web_app):
+    from fastapi.testclient import TestClient
+    # lifespan и общий цикл событий для фоновых задач /api/run — только внутри with
+    with TestClient(web_app.app) as c:
+        yield c
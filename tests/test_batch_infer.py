@@ -0,0 +1,127 @@
+# =========================
+# Файл: tests/test_batch_infer.py
+# =========================
+import asyncio
+import json
+
+from web import batch_infer
+from web.batch_infer import LINE_TOO_LONG, aiter_lines, aiter_records, stream_predictions
+
+
+async def chunks_of(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def parse(data: bytes, fmt: str, size: int = 3):
+    async def main():
+        return [rec async for rec in aiter_records(aiter_lines(chunks_of(data, size)), fmt)]
+    return asyncio.run(main())
+
+
+def test_lines_are_split_across_chunk_boundaries():
+    async def main():
+        return [line async for line in aiter_lines(chunks_of("привет\nмир\nбез конца".encode("utf-8"), 4))]
+    assert asyncio.run(main()) == ["привет\n", "мир\n", "без конца"]
+
+
+def test_oversized_lines_are_skipped_with_bounded_buffer():
+    async def main(data, size):
+        return [line async for line in aiter_lines(chunks_of(data, size), max_line=8)]
+
+    data = b"ok\n" + b"x" * 50 + b"\nfine\n" + b"y" * 20 + b"\n" + b"z" * 9
+    for size in (1, 4, 7, 100):
+        assert asyncio.run(main(data, size)) == ["ok\n", None, "fine\n", None, None]
+    # строка ровно в лимит проходит
+    assert asyncio.run(main(b"12345678\n", 3)) == ["12345678\n"]
+
+
+def test_input_without_newlines_yields_one_error():
+    async def chunks():
+        for _ in range(2000):
+            yield b"a" * 1024
+
+    async def main():
+        return [line async for line in aiter_lines(chunks(), max_line=1 << 16)]
+
+    # 2 МБ без перевода строки: одна ошибка, буфер не растет дальше лимита
+    assert asyncio.run(main()) == [None]
+
+
+def test_oversized_records_become_errors(monkeypatch):
+    monkeypatch.setattr(batch_infer, "MAX_LINE_BYTES", 16)
+    data = b'{"text": "a"}\n{"text": "' + b"x" * 40 + b'"}\n{"text": "b"}\n'
+
+    async def main(fmt, data):
+        lines = aiter_lines(chunks_of(data, 5), max_line=16)
+        return [rec async for rec in aiter_records(lines, fmt)]
+
+    assert asyncio.run(main("jsonl", data)) == [({"text": "a"}, None), (None, LINE_TOO_LONG), ({"text": "b"}, None)]
+    # CSV-запись, чьи строки в кавычках вместе длиннее лимита, тоже отбрасывается целиком
+    csv_data = b'text\n"' + b"line\n" * 5 + b'"\nok\n'
+    assert asyncio.run(main("csv", csv_data)) == [(None, LINE_TOO_LONG), ({"text": "ok"}, None)]
+
+
+def test_jsonl_records_and_errors():
+    data = b'{"text": "a"}\n\n[1, 2]\n{broken\n{"text": "b"}'
+    res = parse(data, "jsonl")
+    assert res[0] == ({"text": "a"}, None)
+    assert res[1] == (None, "Each JSONL line must be an object")
+    assert res[2][0] is None and res[2][1].startswith("Invalid JSON")
+    assert res[3] == ({"text": "b"}, None)
+
+
+def test_csv_quoted_newlines_and_column_mismatch():
+    data = b'text,label\n"multi\nline, with comma",1\nshort\n"plain",2\n'
+    res = parse(data, "csv", size=5)
+    assert res == [
+        ({"text": "multi\nline, with comma", "label": "1"}, None),
+        (None, "Expected 2 columns, got 1"),
+        ({"text": "plain", "label": "2"}, None),
+    ]
+
+
+def test_csv_unterminated_quote_is_reported():
+    assert parse(b'text\n"never closed\n', "csv") == [(None, "Unterminated quoted field at end of input")]
+
+
+def test_predictions_keep_input_order_across_chunks():
+    batches = []
+
+    def infer_batch(config, inputs):
+        batches.append(len(inputs))
+        return [{"ok": True, "echo": x["n"]} for x in inputs]
+
+    async def records():
+        for n in range(5):
+            yield ({"n": n}, None) if n != 2 else (None, "bad row")
+
+    async def main():
+        return [json.loads(line) async for line in stream_predictions(records(), {}, infer_batch, chunk_size=2)]
+
+    out = asyncio.run(main())
+    preds, summary = out[:-1], out[-1]
+    assert [p["index"] for p in preds] == [0, 1, 2, 3, 4]
+    assert [p.get("echo") for p in preds] == [0, 1, None, 3, 4]
+    assert preds[2] == {"type": "prediction", "index": 2, "ok": False, "error": "bad row"}
+    assert batches == [2, 1, 1]
+    assert summary == {"type": "summary", "count": 5, "errors": 1, "chunk_size": 2}
+
+
+def test_batch_endpoint_streams_ndjson(client):
+    body = '{"text": "a"}\n{"text": "b"}\nnot json\n'
+    r = client.post("/api/uc/infer/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["ok"] for line in lines[:-1]] == [True, True, False]
+    assert lines[-1]["count"] == 3
+    assert client.post("/api/uc/infer/batch", params={"path": "../../etc/passwd"}).status_code == 400
+
+
+def test_batch_endpoint_rejects_format_before_reading_input(client, web_app, monkeypatch):
+    from web import batch_infer as module
+    spooled = []
+    monkeypatch.setattr(module, "spool_upload", lambda *a, **kw: spooled.append(1))
+    r = client.post("/api/uc/infer/batch", params={"format": "xml"}, content=b'{"text": "a"}\n')
+    assert r.status_code == 400
+    assert spooled == []
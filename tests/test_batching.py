@@ -0,0 +1,86 @@
+# =========================
+# Файл: tests/test_batching.py
+# =========================
+import asyncio
+import gc
+import logging
+import threading
+
+import pytest
+
+from web.batching import BatchScheduler
+
+CFG = {"model": {"name": "m"}}
+
+
+def test_full_batch_is_flushed_without_waiting():
+    calls = []
+
+    def run_batch(config, inputs):
+        calls.append(len(inputs))
+        return [{"y": x["x"] * 2} for x in inputs]
+
+    async def main():
+        b = BatchScheduler(run_batch, max_batch_size=4, max_wait_ms=10_000)
+        return await asyncio.wait_for(asyncio.gather(*(b.submit(CFG, {"x": i}) for i in range(4))), 2)
+
+    assert asyncio.run(main()) == [{"y": i * 2} for i in range(4)]
+    assert calls == [4]
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    async def main():
+        b = BatchScheduler(lambda c, xs: xs, max_batch_size=100, max_wait_ms=20)
+        res = await asyncio.gather(b.submit(CFG, {"x": 1}), b.submit(CFG, {"x": 2}))
+        return res, b.stats()
+
+    res, stats = asyncio.run(main())
+    assert res == [{"x": 1}, {"x": 2}]
+    assert stats["batches"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_pending_batch_survives_garbage_collection():
+    release = threading.Event()
+
+    def run_batch(config, inputs):
+        release.wait(5)
+        return inputs
+
+    async def main():
+        b = BatchScheduler(run_batch, max_batch_size=1)
+        fut = asyncio.ensure_future(b.submit(CFG, {"x": 1}))
+        await asyncio.sleep(0.05)
+        in_flight = b.stats()["in_flight"]
+        gc.collect()
+        release.set()
+        return in_flight, await asyncio.wait_for(fut, 5), b.stats()["in_flight"]
+
+    assert asyncio.run(main()) == (1, {"x": 1}, 0)
+
+
+def test_batch_error_reaches_callers_and_is_logged(caplog):
+    def run_batch(config, inputs):
+        raise ValueError("model exploded")
+
+    async def main():
+        b = BatchScheduler(run_batch, max_batch_size=2)
+        res = await asyncio.gather(b.submit(CFG, {}), b.submit(CFG, {}), return_exceptions=True)
+        await asyncio.sleep(0)
+        return res
+
+    with caplog.at_level(logging.ERROR, logger="web.batching"):
+        res = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in res)
+    assert any("Inference batch failed" in rec.message for rec in caplog.records)
+
+
+def test_wrong_result_count_fails_the_batch():
+    async def main():
+        b = BatchScheduler(lambda c, xs: xs[:1], max_batch_size=2)
+        return await asyncio.gather(b.submit(CFG, {}), b.submit(CFG, {}), return_exceptions=True)
+
+    res = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in res)
+    with pytest.raises(RuntimeError, match="2 inputs"):
+        raise res[0]
@@ -0,0 +1,98 @@
+# =========================
+# Файл: tests/test_code_index.py
+# =========================
+import pytest
+
+from web.code_index import CodeIndex
+from web.scan_cache import ScanCache
+
+from .conftest import write_tree
+
+
+def build(root, store_path):
+    index = CodeIndex(ScanCache(store_path, root), root)
+    index.update()
+    return index
+
+
+def snapshot(index):
+    forward, reverse = index.import_graph()
+    callers = {k: sorted(v) for k, v in index.callers_index().items() if v}
+    return (
+        {k: sorted(v) for k, v in forward.items()},
+        {k: sorted(v) for k, v in reverse.items() if v},
+        callers,
+    )
+
+
+@pytest.fixture
+def pkg(tmp_path):
+    return write_tree(tmp_path / "repo", {
+        "pkg/__init__.py": "from .core import train\n",
+        "pkg/core.py": "def train():\n    return 1\n",
+        "app.py": "import pkg\nimport pkg.extra\n\n\ndef main():\n    pkg.train()\n    pkg.extra.run()\n",
+    })
+
+
+def test_resolves_reexported_callers(pkg, tmp_path):
+    index = build(pkg, tmp_path / "index.json")
+    sites = index.callers("pkg.core.train")["callers"]
+    assert [(s["caller"], s["target"]) for s in sites] == [("app.main", "pkg.train")]
+    assert index.imports("app")["modules"] == ["pkg", "pkg.core"]
+
+
+def test_incremental_update_matches_full_rebuild(pkg, tmp_path):
+    index = build(pkg, tmp_path / "index.json")
+    steps = [
+        # новый модуль: import pkg.extra теперь ведет к нему, а не к pkg
+        {"pkg/extra.py": "from pkg.core import train\n\n\ndef run():\n    train()\n"},
+        # реэкспорт в __init__ указывает на другую функцию — меняются канонические имена вызовов app.py
+        {"pkg/__init__.py": "from .extra import run as train\n"},
+        {"app.py": "from pkg import train\n\n\ndef main():\n    train()\n"},
+    ]
+    for i, files in enumerate(steps):
+        write_tree(pkg, files)
+        index.update()
+        fresh = build(pkg, tmp_path / f"fresh-{i}.json")
+        assert snapshot(index) == snapshot(fresh)
+    (pkg / "pkg/extra.py").unlink()
+    index.update()
+    assert snapshot(index) == snapshot(build(pkg, tmp_path / "fresh-removed.json"))
+    assert "pkg.extra" not in index.import_graph()[1]
+
+
+def test_update_does_not_rebuild_untouched_files(pkg, tmp_path, monkeypatch):
+    write_tree(pkg, {f"other/m{i}.py": "import os\n\n\ndef f():\n    os.getcwd()\n" for i in range(20)})
+    index = build(pkg, tmp_path / "index.json")
+    indexed = []
+    real = CodeIndex._index_calls
+    monkeypatch.setattr(CodeIndex, "_index_calls", lambda self, rel: indexed.append(rel) or real(self, rel))
+    write_tree(pkg, {"pkg/core.py": "def train():\n    return 2\n"})
+    index.update()
+    # сам файл и app.py, чей вызов pkg.train раскрывается через pkg.core
+    assert sorted(indexed) == ["app.py", "pkg/core.py"]
+
+
+def test_queries_pick_up_edits_without_explicit_update(pkg, tmp_path):
+    index = build(pkg, tmp_path / "index.json")
+    assert index.callers("pkg.core.train")["callers"]
+    write_tree(pkg, {"app.py": "import os\n\n\ndef main():\n    os.getcwd()\n"})
+    assert index.callers("pkg.core.train")["callers"] == []
+    assert index.imports("app")["modules"] == []
+
+
+def test_index_endpoints_refuse_while_repository_is_fetched(client, web_app):
+    lock = web_app.repos.lock(web_app.UC_ROOT)
+    lock.acquire_write()
+    try:
+        codes = [
+            client.get("/api/index/callers", params={"symbol": "helper"}).status_code,
+            client.get("/api/index/imports", params={"module": "pkg.b"}).status_code,
+            client.get("/api/index/reachability", params={"entry": "pkg.b:run"}).status_code,
+            client.post("/api/module-map", json=["pkg/b.py"]).status_code,
+        ]
+    finally:
+        lock.release_write()
+    assert codes == [409, 409, 409, 409]
+    assert lock.readers == 0
+    assert client.get("/api/index/callers", params={"symbol": "pkg.a.helper"}).json()["callers"][0]["caller"] == "pkg.b.run"
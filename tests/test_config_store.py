@@ -0,0 +1,78 @@
+# =========================
+# Файл: tests/test_config_store.py
+# =========================
+import json
+import os
+import threading
+
+from web.config_store import ConfigStore, bind_config_args, serialize_config
+from web.run_utils import write_configs
+
+
+def run_threads(n, fn):
+    errors = []
+    barrier = threading.Barrier(n)
+
+    def body(i):
+        barrier.wait()
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=body, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    return errors
+
+
+def test_hash_ignores_key_order_and_json_formatting():
+    a, _ = serialize_config("c.json", {"a": 1, "b": 2})
+    b, _ = serialize_config("c.json", {"b": 2, "a": 1})
+    c, _ = serialize_config("c.json", '{"b":2,  "a":1}')
+    assert a == b == c
+    assert serialize_config("c.yaml", {"a": 1})[0] != a
+
+
+def test_put_set_is_immutable_and_deduplicated(tmp_path):
+    store = ConfigStore(tmp_path)
+    set_dir, paths = store.put_set({"config": {"lr": 0.1}, "model.yaml": "hidden: 8\n"})
+    assert sorted(paths) == ["config.json", "model.yaml"]
+    assert json.loads(open(paths["config.json"]).read()) == {"lr": 0.1}
+    assert os.stat(paths["config.json"]).st_mode & 0o222 == 0
+    again, _ = store.put_set({"model.yaml": "hidden: 8\n", "config": {"lr": 0.1}})
+    assert again == set_dir
+    assert store.stats()["writes"] == 2 and store.stats()["sets"] == 1
+    other, _ = store.put_set({"config": {"lr": 0.2}})
+    assert other != set_dir
+
+
+def test_concurrent_put_set_builds_one_directory(tmp_path):
+    store = ConfigStore(tmp_path)
+    dirs = []
+    errors = run_threads(8, lambda i: dirs.append(store.put_set({"config": {"lr": 0.1}})[0]))
+    assert errors == []
+    assert len(set(dirs)) == 1
+    assert [p.name for p in (tmp_path / "sets").iterdir()] == [dirs[0].name]
+
+
+def test_bind_config_args():
+    paths = {"config.json": "/store/sets/x/config.json"}
+    args = ["train", "config.json", "--config=data/configs/config.json", "other/config.json", "--lr=1"]
+    assert bind_config_args(args, paths) == [
+        "train",
+        "/store/sets/x/config.json",
+        "--config=/store/sets/x/config.json",
+        "other/config.json",
+        "--lr=1",
+    ]
+
+
+def test_write_configs_from_many_threads(tmp_path):
+    # одинаковый pid у потоков: временные файлы не должны пересекаться
+    errors = run_threads(16, lambda i: [write_configs(tmp_path, {"config": {"n": i % 2, "pad": "x" * 4096}}) for _ in range(20)])
+    assert errors == []
+    assert json.loads((tmp_path / "config.json").read_text())["n"] in (0, 1)
+    assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
@@ -0,0 +1,50 @@
+# =========================
+# Файл: tests/test_datasets.py
+# =========================
+import os
+
+from web.datasets import MmapCsvDataset, open_dataset
+
+
+def write_csv(path, n, extra=""):
+    path.write_text("x,label\n" + "".join(f"{i},{extra}row{i}\n" for i in range(n)), encoding="utf-8")
+    return path
+
+
+def test_rows_and_quoted_fields(tmp_path):
+    path = tmp_path / "d.csv"
+    path.write_text('x,text\n1,"a,b"\n2,"multi\nline"\n3,plain\n', encoding="utf-8")
+    ds = MmapCsvDataset(path, tmp_path / "cache")
+    assert len(ds) == 3
+    assert ds.rows(1, 3) == [["2", "multi\nline"], ["3", "plain"]]
+    assert ds.dtypes == {"x": "float", "text": "str"}
+    # второй экземпляр берет индекс смещений с диска
+    again = MmapCsvDataset(path, tmp_path / "cache")
+    assert list(again.offsets) == list(ds.offsets)
+
+
+def test_batches_row_and_columnar(tmp_path):
+    ds = MmapCsvDataset(write_csv(tmp_path / "d.csv", 10), tmp_path / "cache")
+    rows = list(ds.iter_batches(4))
+    cols = list(ds.iter_batches(4, columnar=True))
+    assert [len(b["x"]) for b in rows] == [4, 4, 2]
+    assert [list(b["x"]) for b in rows] == [list(b["x"]) for b in cols]
+    assert str(cols[2]["label"][1]) == "row9"
+
+
+def test_reopen_after_change_keeps_old_handle_readable(tmp_path):
+    path = write_csv(tmp_path / "d.csv", 50)
+    old = open_dataset(path, tmp_path / "cache")
+    assert open_dataset(path, tmp_path / "cache") is old
+    batches = old.iter_batches(10)
+    first = next(batches)
+
+    # датасет перезаписан новым файлом (как при выгрузке новой версии) — старый читатель продолжает
+    tmp = write_csv(tmp_path / "d.csv.new", 60, extra="v2-")
+    os.replace(tmp, path)
+    new = open_dataset(path, tmp_path / "cache")
+    assert new is not old
+    rest = list(batches)
+    assert len(first["x"]) + sum(len(b["x"]) for b in rest) == 50
+    assert old.rows(49, 50) == [["49", "row49"]]
+    assert new.rows(59, 60) == [["59", "v2-row59"]]
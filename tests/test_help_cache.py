@@ -0,0 +1,92 @@
+# =========================
+# Файл: tests/test_help_cache.py
+# =========================
+import asyncio
+import sys
+import threading
+import time
+
+from web import help_cache
+from web.help_cache import HelpCache, get_help, prefetch_help, static_help
+
+from .conftest import write_tree
+
+CLI = '''import argparse
+parser = argparse.ArgumentParser(description="Train UC")
+parser.add_argument("--lr", type=float, default=0.1, help="learning rate")
+parser.add_argument("config", help="path to config")
+args = parser.parse_args()
+'''
+
+
+def test_static_help_matches_argparse():
+    text = static_help(CLI, "train.py")
+    assert text.startswith("usage: train.py")
+    assert "learning rate" in text
+    assert "Train UC" in text
+
+
+def test_help_is_cached_until_file_changes(tmp_path):
+    root = write_tree(tmp_path / "repo", {"tools/__init__.py": "", "tools/train.py": CLI})
+    cache = HelpCache(tmp_path / "cache")
+
+    def run():
+        return asyncio.run(get_help(cache, root, module="tools.train", python=sys.executable, head="h1"))
+
+    first = run()
+    assert first["returncode"] == 0 and "learning rate" in first["stdout"]
+    assert first["cached"] is False
+    assert run()["cached"] is True
+    (root / "tools/train.py").write_text(CLI.replace("learning rate", "step size"), encoding="utf-8")
+    changed = run()
+    assert changed["cached"] is False
+    assert "step size" in changed["stdout"]
+
+
+def test_prefetch_keeps_git_and_hashing_off_the_loop(tmp_path, monkeypatch):
+    root = write_tree(tmp_path / "repo", {"a.py": CLI, "b.py": CLI})
+    cache = HelpCache(tmp_path / "cache")
+    calls = []
+
+    def record(name, fn):
+        return lambda *a: calls.append((name, threading.current_thread())) or fn(*a)
+
+    monkeypatch.setattr(help_cache, "git_head", record("head", lambda repo_root: "h"))
+    monkeypatch.setattr(help_cache, "build_static", record("build", help_cache.build_static))
+    for name in ("key", "get", "put"):
+        real = getattr(HelpCache, name)
+        monkeypatch.setattr(HelpCache, name, lambda self, *a, _n=name, _f=real: record(_n, lambda *b: _f(self, *b))(*a))
+
+    async def main():
+        loop_thread = threading.current_thread()
+        res = await prefetch_help(cache, root, ["a", "b"], sys.executable, mode="static")
+        return loop_thread, res
+
+    loop_thread, res = asyncio.run(main())
+    assert [r["returncode"] for r in res] == [0, 0]
+    # HEAD один раз; ключ, чтение кеша, разбор и запись — на каждый модуль
+    assert sorted(name for name, _ in calls) == ["build"] * 2 + ["get"] * 2 + ["head"] + ["key"] * 2 + ["put"] * 2
+    assert all(thread is not loop_thread for _, thread in calls)
+
+
+def test_prefetch_static_respects_concurrency(tmp_path, monkeypatch):
+    root = write_tree(tmp_path / "repo", {f"m{i}.py": CLI for i in range(6)})
+    cache = HelpCache(tmp_path / "cache")
+    monkeypatch.setattr(help_cache, "git_head", lambda repo_root: "h")
+    lock = threading.Lock()
+    active = [0, 0]  # сейчас, максимум
+    real = help_cache.build_static
+
+    def build(*a):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return real(*a)
+
+    monkeypatch.setattr(help_cache, "build_static", build)
+    res = asyncio.run(prefetch_help(cache, root, [f"m{i}" for i in range(6)], sys.executable, mode="static", concurrency=2))
+    assert [r["returncode"] for r in res] == [0] * 6
+    assert active[1] == 2
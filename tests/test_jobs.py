@@ -0,0 +1,157 @@
+# =========================
+# Файл: tests/test_jobs.py
+# =========================
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from web.jobs import JobManager, QueueFull
+
+
+def py(code: str):
+    return [sys.executable, "-c", code]
+
+
+async def wait_done(manager: JobManager, job_id: str):
+    await manager.get(job_id).task
+    return manager.get(job_id)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_job_outcomes(tmp_path):
+    async def main():
+        m = JobManager(max_concurrent=2)
+        ok = m.submit(py("print('hi')"), tmp_path, dict(os.environ))
+        bad = m.submit(py("import sys; sys.exit(3)"), tmp_path, dict(os.environ))
+        slow = m.submit(py("import time; time.sleep(30)"), tmp_path, dict(os.environ), timeout=0.5)
+        return [await wait_done(m, j.id) for j in (ok, bad, slow)]
+
+    ok, bad, slow = run(main())
+    assert (ok.status, ok.returncode, ok.to_dict()["stdout"]) == ("done", 0, "hi")
+    assert (bad.status, bad.returncode) == ("failed", 3)
+    assert (slow.status, slow.returncode) == ("timeout", 124)
+
+
+def test_concurrency_limit_and_queue_bound(tmp_path):
+    async def main():
+        m = JobManager(max_concurrent=1, max_queued=1)
+        first = m.submit(py("import time; time.sleep(0.3)"), tmp_path, dict(os.environ))
+        await asyncio.sleep(0.1)
+        second = m.submit(py("pass"), tmp_path, dict(os.environ))
+        await asyncio.sleep(0)
+        states = (first.status, second.status)
+        with pytest.raises(QueueFull):
+            m.submit(py("pass"), tmp_path, dict(os.environ))
+        await wait_done(m, second.id)
+        return states, first, second
+
+    states, first, second = run(main())
+    assert states == ("running", "queued")
+    # второй запуск начался только после завершения первого
+    assert second.started_at >= first.finished_at
+
+
+def test_cancel_stops_running_process(tmp_path):
+    async def main():
+        m = JobManager(kill_grace=0.5)
+        job = m.submit(py("import time; time.sleep(30)"), tmp_path, dict(os.environ))
+        await asyncio.sleep(0.3)
+        t0 = time.monotonic()
+        await m.cancel(job.id)
+        return job, time.monotonic() - t0
+
+    job, took = run(main())
+    assert job.status == "cancelled"
+    assert took < 5
+
+
+def test_api_run_returns_job_and_completes(client):
+    r = client.post("/api/run", json={"args": ["echo", "one", "two"]})
+    assert r.status_code == 200
+    job_id = r.json()["job_id"]
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()["job"]
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "done"
+    assert job["stdout"] == "one\ntwo"
+    assert client.post("/api/run", json={"args": []}).status_code == 400
+
+
+# команда, чей потомок держит stdout/stderr; detach=True — потомок уходит в свою сессию
+def with_grandchild(detach: bool):
+    return py(
+        "import subprocess, sys, time\n"
+        f"child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'], start_new_session={detach})\n"
+        "print(child.pid, flush=True)\n"
+        "time.sleep(30)\n"
+    )
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # зомби уже не держит каналы; ждать его здесь некому
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().split(")")[-1].split()[0] != "Z"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    async def main():
+        m = JobManager(kill_grace=0.5)
+        job = m.submit(with_grandchild(False), tmp_path, dict(os.environ), timeout=0.5)
+        t0 = time.monotonic()
+        await wait_done(m, job.id)
+        return job, time.monotonic() - t0
+
+    job, took = run(main())
+    assert job.status == "timeout"
+    assert took < 5
+    grandchild = int(job.to_dict()["stdout"].splitlines()[0])
+    deadline = time.monotonic() + 5
+    while alive(grandchild):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_detached_grandchild_does_not_hold_timeout_or_cancel(tmp_path):
+    errors = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx["message"]))
+        m = JobManager(kill_grace=0.5)
+        timed = m.submit(with_grandchild(True), tmp_path, dict(os.environ), timeout=0.5)
+        cancelled = m.submit(with_grandchild(True), tmp_path, dict(os.environ))
+        t0 = time.monotonic()
+        await wait_done(m, timed.id)
+        await asyncio.sleep(0.2)
+        await m.cancel(cancelled.id)
+        took = time.monotonic() - t0
+        await asyncio.sleep(0.1)
+        return timed, cancelled, took
+
+    timed, cancelled, took = run(main())
+    try:
+        assert (timed.status, cancelled.status) == ("timeout", "cancelled")
+        assert took < 5
+        assert errors == []
+    finally:
+        for job in (timed, cancelled):
+            out = job.to_dict()["stdout"].splitlines()
+            if out and out[0].isdigit():
+                try:
+                    os.kill(int(out[0]), 9)
+                except ProcessLookupError:
+                    pass
@@ -0,0 +1,94 @@
+# =========================
+# Файл: tests/test_log_buffer.py
+# =========================
+import asyncio
+
+from web.jobs import MAX_LINE_CHARS, LogBuffer
+
+
+def test_ring_buffer_keeps_last_lines_and_spills_everything(tmp_path):
+    async def main():
+        buf = LogBuffer(max_lines=3, log_path=tmp_path / "job.log")
+        buf.open()
+        for i in range(5):
+            await buf.append("stdout", f"line {i}\n")
+        await buf.append("stderr", "x" * (MAX_LINE_CHARS + 10) + "\n")
+        await buf.close()
+        return buf
+
+    buf = asyncio.run(main())
+    assert [rec["text"] for rec in buf.since(0)][:2] == ["line 3", "line 4"]
+    assert buf.since(0)[-1]["text"].endswith("…[truncated]")
+    assert buf.seq == 6
+    assert [rec["seq"] for rec in buf.since(5)] == [6]
+    spilled = (tmp_path / "job.log").read_text(encoding="utf-8").splitlines()
+    assert spilled[:5] == [f"line {i}" for i in range(5)]
+    assert spilled[5].startswith("[stderr] xxx")
+
+
+def test_follow_replays_then_waits_for_new_lines_until_close():
+    async def main():
+        buf = LogBuffer()
+        await buf.append("stdout", "early\n")
+        seen = []
+
+        async def reader():
+            async for rec in buf.follow(0):
+                seen.append(rec["text"])
+
+        task = asyncio.create_task(reader())
+        await asyncio.sleep(0.05)
+        replayed = list(seen)
+        await buf.append("stdout", "late\n")
+        await asyncio.sleep(0.05)
+        await buf.close()
+        await asyncio.wait_for(task, 1)
+        return replayed, seen
+
+    replayed, seen = asyncio.run(main())
+    assert replayed == ["early"]
+    assert seen == ["early", "late"]
+
+
+def test_follow_from_seq_skips_older_lines():
+    async def main():
+        buf = LogBuffer()
+        for text in ("a", "b", "c"):
+            await buf.append("stdout", text)
+        await buf.close()
+        return [rec["text"] async for rec in buf.follow(2)]
+
+    assert asyncio.run(main()) == ["c"]
+
+
+def test_sse_log_stream_ends_with_status(client):
+    job_id = client.post("/api/run", json={"args": ["fail"]}).json()["job_id"]
+    body = client.get(f"/api/jobs/{job_id}/logs/stream").text
+    assert "event: stderr\ndata: \"boom\"" in body
+    assert body.rstrip().endswith('event: end\ndata: {"status": "failed", "returncode": 3}')
+
+
+def test_spill_writes_run_off_the_loop_in_batches(tmp_path, monkeypatch):
+    import threading
+
+    from web import jobs
+
+    monkeypatch.setattr(jobs, "SPILL_INTERVAL", 3600)
+    writes = []
+
+    async def main():
+        buf = LogBuffer(log_path=tmp_path / "job.log")
+        buf.open()
+        real = buf._log.write
+        buf._log.write = lambda data: writes.append((threading.current_thread(), len(data))) or real(data)
+        for i in range(1000):
+            await buf.append("stdout", f"{i:0127d}\n")
+        await buf.close()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+    # 128 КБ вывода — две пачки по SPILL_CHUNK, а не тысяча записей
+    assert len(writes) == 2
+    assert all(t is not loop_thread for t, _ in writes)
+    lines = (tmp_path / "job.log").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1000 and lines[-1] == f"{999:0127d}"
@@ -0,0 +1,41 @@
+# =========================
+# Файл: tests/test_metrics.py
+# =========================
+from web.metrics import Registry, subprocess_outcome
+
+
+def test_render_counters_gauges_and_histograms():
+    reg = Registry()
+    reg.counter("c_total", "Counter", ("kind",)).labels("a\"b").inc(2)
+    reg.gauge("g", "Gauge").labels().set(1.5)
+    h = reg.histogram("h_seconds", "Histogram", buckets=[0.1, 1.0])
+    h.labels().observe(0.05)
+    h.labels().observe(0.5)
+    text = reg.render()
+    assert '# TYPE c_total counter' in text
+    assert 'c_total{kind="a\\"b"} 2' in text
+    assert "\ng 1.5\n" in text
+    assert 'h_seconds_bucket{le="0.1"} 1' in text
+    assert 'h_seconds_bucket{le="1"} 2' in text
+    assert 'h_seconds_bucket{le="+Inf"} 2' in text
+    assert "h_seconds_count 2" in text
+
+
+def test_broken_function_metric_is_skipped():
+    reg = Registry()
+    reg.func("bad", "gauge", "Broken", lambda: 1 / 0)
+    reg.func("good", "gauge", "Jobs", lambda: {("queued",): 3}, ("state",))
+    text = reg.render()
+    assert "bad" not in text
+    assert 'good{state="queued"} 3' in text
+
+
+def test_subprocess_outcome():
+    assert [subprocess_outcome(c) for c in (0, 124, 1)] == ["ok", "timeout", "error"]
+
+
+def test_metrics_endpoint_uses_route_templates(client):
+    client.get("/api/jobs/does-not-exist")
+    text = client.get("/metrics").text
+    assert 'route="/api/jobs/{job_id}"' in text
+    assert "does-not-exist" not in text
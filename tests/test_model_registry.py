@@ -0,0 +1,74 @@
+# =========================
+# Файл: tests/test_model_registry.py
+# =========================
+import threading
+import time
+
+import pytest
+
+from web.model_registry import ModelRegistry
+
+
+def cfg(name: str):
+    return {"model": {"name": name}, "runtime": {"device": "cpu"}}
+
+
+def test_concurrent_requests_share_one_load():
+    calls = []
+
+    def loader(config):
+        calls.append(config["model"]["name"])
+        time.sleep(0.1)
+        return object()
+
+    reg = ModelRegistry(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reg.get(cfg("a")))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ["a"]
+    assert len({id(m) for m in results}) == 1
+
+
+def test_lru_eviction_by_count_and_bytes():
+    class Model:
+        def __init__(self, nbytes):
+            self.nbytes = nbytes
+
+    reg = ModelRegistry(lambda c: Model(c["model"]["size"]), memory_budget=100, max_models=2)
+    reg.get({"model": {"name": "a", "size": 10}})
+    reg.get({"model": {"name": "b", "size": 10}})
+    reg.get({"model": {"name": "a", "size": 10}})  # a становится последней использованной
+    reg.get({"model": {"name": "c", "size": 10}})
+    assert [e["key"]["model"]["name"] for e in reg.stats()["models"]] == ["a", "c"]
+    reg.get({"model": {"name": "d", "size": 95}})
+    assert [e["key"]["model"]["name"] for e in reg.stats()["models"]] == ["d"]
+    assert reg.stats()["evictions"] == 3
+
+
+def test_failed_load_does_not_leave_a_loading_lock():
+    attempts = []
+
+    def loader(config):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("weights missing")
+        return object()
+
+    reg = ModelRegistry(loader)
+    with pytest.raises(RuntimeError):
+        reg.get(cfg("a"))
+    assert reg._loading == {}
+    assert reg.get(cfg("a")) is not None
+    assert reg._loading == {}
+
+
+def test_stub_model_counts_against_memory_budget():
+    from web.uc_api import load_model
+    reg = ModelRegistry(load_model, memory_budget=300 * 300 * 4)
+    reg.get({"model": {"name": "small", "hidden_size": 256}})
+    assert reg.used_bytes() == 256 * 256 * 4
+    reg.get({"model": {"name": "big", "hidden_size": 300}})
+    assert [e["key"]["model"]["name"] for e in reg.stats()["models"]] == ["big"]
@@ -0,0 +1,151 @@
+# =========================
+# Файл: tests/test_repo_lock.py
+# =========================
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from web.repo_manager import RepoBusy, RepoLock, RepoManager
+
+from .conftest import write_tree
+
+
+def start(fn):
+    t = threading.Thread(target=fn, daemon=True)
+    t.start()
+    return t
+
+
+def test_readers_share_and_writer_waits_for_them():
+    lock = RepoLock()
+    assert lock.acquire_read() and lock.acquire_read()
+    acquired = threading.Event()
+    writer = start(lambda: (lock.acquire_write(), acquired.set()))
+    time.sleep(0.1)
+    assert not acquired.is_set()
+    lock.release_read()
+    lock.release_read()
+    writer.join(5)
+    assert acquired.is_set() and lock.writer
+    lock.release_write()
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = RepoLock()
+    lock.acquire_read()
+    writer = start(lock.acquire_write)
+    deadline = time.monotonic() + 5
+    while not lock.writers_waiting:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    # писатель ждет — новый читатель не проходит, иначе писатель мог бы ждать бесконечно
+    assert lock.acquire_read(blocking=False) is False
+    got = threading.Event()
+    reader = start(lambda: (lock.acquire_read(), got.set()))
+    time.sleep(0.1)
+    assert not got.is_set()
+    lock.release_read()
+    writer.join(5)
+    assert lock.writer and not got.is_set()
+    lock.release_write()
+    reader.join(5)
+    assert got.is_set() and lock.readers == 1
+
+
+def test_release_from_another_thread():
+    lock = RepoLock()
+    lock.acquire_read()
+    start(lock.release_read).join(5)
+    assert lock.readers == 0
+    lock.acquire_write()
+    start(lock.release_write).join(5)
+    assert lock.acquire_read(blocking=False)
+
+
+def test_reading_raises_busy_during_write(tmp_path):
+    repos = RepoManager()
+    lock = repos.lock(tmp_path)
+    assert repos.lock(tmp_path / ".") is lock
+    lock.acquire_write()
+    try:
+        with pytest.raises(RepoBusy):
+            with repos.reading(tmp_path):
+                pass
+    finally:
+        lock.release_write()
+    with repos.reading(tmp_path):
+        assert lock.readers == 1
+    assert lock.readers == 0
+
+
+def git(*args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """Локальный bare-репозиторий с одним коммитом; file:// — чтобы работали --depth и --filter."""
+    if shutil.which("git") is None:
+        pytest.skip("git is not installed")
+    bare = tmp_path / "origin.git"
+    git("init", "-q", "--bare", str(bare))
+    git("-C", str(bare), "config", "uploadpack.allowFilter", "true")
+    work = write_tree(tmp_path / "work", {"a.py": "def f():\n    return 1\n"})
+    git("init", "-q", str(work))
+    git("-C", str(work), "add", "a.py")
+    git("-C", str(work), "commit", "-q", "-m", "init")
+    git("-C", str(work), "push", "-q", str(bare), "HEAD:refs/heads/main")
+    git("-C", str(bare), "symbolic-ref", "HEAD", "refs/heads/main")
+    return bare.as_uri()
+
+
+def test_sync_clones_local_repository_with_progress(origin, tmp_path):
+    repos = RepoManager()
+    target = tmp_path / "clone"
+    op = repos.sync(origin, target)
+    assert op.done.wait(60)
+    assert op.status == "done", op.to_dict()
+    assert (target / "a.py").read_text() == "def f():\n    return 1\n"
+    log = op.to_dict()["log"]
+    assert log.startswith("$ git clone --progress") and "Receiving objects: 100%" in log
+    assert repos.busy(target) is None
+    # повторный sync того же пути — update
+    op = repos.sync(origin, target)
+    assert op.done.wait(60) and (op.action, op.status) == ("update", "done")
+
+
+def test_scan_refuses_while_sync_holds_write_lock(origin, client, web_app, monkeypatch):
+    root = web_app.UC_ROOT
+    backup = root.with_name(root.name + ".orig")
+    root.rename(backup)
+    gate, paused = threading.Event(), threading.Event()
+    real = web_app.repos._git
+
+    def gated(op, step, cmd):
+        if step == "checkout":
+            paused.set()
+            assert gate.wait(30)
+        real(op, step, cmd)
+
+    monkeypatch.setattr(web_app.repos, "_git", gated)
+    try:
+        op = web_app.repos.sync(origin, root)
+        assert paused.wait(60)
+        # clone прошел, checkout ждет: замок на запись у sync, скан получает 409 с прогрессом операции
+        r = client.get("/api/scan")
+        assert r.status_code == 409
+        busy = r.json()["op"]
+        assert (busy["id"], busy["status"], busy["step"]) == (op.id, "running", "clone")
+        assert (busy["phase"], busy["percent"]) == ("Receiving objects", 100)
+        gate.set()
+        assert op.done.wait(60) and op.status == "done"
+        r = client.get("/api/scan")
+        assert r.status_code == 200
+        assert "a.py" in r.json()["scan"]["modules"]
+    finally:
+        gate.set()
+        shutil.rmtree(root, ignore_errors=True)
+        backup.rename(root)
@@ -0,0 +1,55 @@
+# =========================
+# Файл: tests/test_repo_registry.py
+# =========================
+import asyncio
+import sys
+
+from web.jobs import JobManager
+from web.repo_registry import RepoRegistry
+from web.scan_cache import get_scan_cache
+
+
+def test_builtin_repository_has_its_own_cache_dir(tmp_path):
+    registry = RepoRegistry(tmp_path / "repos", tmp_path / "cache", tmp_path / "repos.json")
+    entry = registry.ensure("UC", "https://example.invalid/UC.git", JobManager())
+    assert entry.builtin
+    assert entry.cache_dir == tmp_path / "cache" / "repos" / "UC"
+    # файл индекса /api/scan основного процесса и файл процесса репозитория различаются
+    main = get_scan_cache(entry.root, tmp_path / "cache")
+    assert main.index_path.parent == tmp_path / "cache"
+    assert not registry.state_path.exists()
+
+
+def test_builtin_worker_scan_does_not_touch_main_scan_index(client, web_app):
+    main_index = get_scan_cache(web_app.UC_ROOT, web_app.CACHE_DIR).index_path
+    assert client.get("/api/scan").status_code == 200
+    before = main_index.read_bytes()
+    r = client.get(f"/api/repos/{web_app.REPO_NAME}/scan")
+    assert r.status_code == 200
+    assert set(r.json()["scan"]["modules"]) >= {"pkg/a.py", "pkg/b.py"}
+    assert main_index.read_bytes() == before
+    worker_dir = web_app.CACHE_DIR / "repos" / web_app.REPO_NAME
+    assert any(p.name.startswith("scan-") for p in worker_dir.iterdir())
+
+
+def test_purge_cancels_jobs_before_deleting_checkout(tmp_path):
+    registry = RepoRegistry(tmp_path / "repos", tmp_path / "cache", tmp_path / "repos.json", max_concurrent=1)
+    entry = registry.add("other", "https://example.invalid/other.git")
+    entry.root.mkdir(parents=True)
+    entry.cache_dir.mkdir(parents=True)
+    sleep = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+    async def main():
+        running = entry.jobs.submit(sleep, entry.root, {})
+        queued = entry.jobs.submit(sleep, entry.root, {})
+        while running.status != "running":
+            await asyncio.sleep(0.01)
+        assert queued.status == "queued"
+        await registry.remove("other", purge=True)
+        return running, queued
+
+    running, queued = asyncio.run(main())
+    assert (running.status, queued.status) == ("cancelled", "cancelled")
+    assert running.proc is None
+    assert not entry.root.exists() and not entry.cache_dir.exists()
+    assert registry.get("other") is None
@@ -0,0 +1,73 @@
+# =========================
+# Файл: tests/test_result_cache.py
+# =========================
+import os
+import time
+
+from web import result_cache
+from web.result_cache import ResultCache, canonical_hash, dataset_fingerprint
+
+
+def test_canonical_hash_ignores_key_order():
+    assert canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash({"b": [1, 2], "a": 1})
+
+
+def test_put_get_and_ttl(tmp_path):
+    cache = ResultCache(tmp_path, ttl=0.2)
+    cache.put("k", {"accuracy": 0.9})
+    assert cache.get("k") == {"accuracy": 0.9}
+    time.sleep(0.3)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_put_does_not_rescan_directory(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path, max_bytes=1 << 20)
+    scans = []
+    real = ResultCache._entries
+    monkeypatch.setattr(ResultCache, "_entries", lambda self: scans.append(1) or real(self))
+    for i in range(50):
+        cache.put(f"k{i}", {"i": i})
+    assert len(scans) == 1
+    stats = cache.stats()
+    assert stats["entries"] == 50
+    assert stats["bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+
+
+def test_eviction_removes_oldest_down_to_low_water(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1000)
+    for i in range(20):
+        cache.put(f"k{i:02d}", {"pad": "x" * 80})
+        os.utime(tmp_path / f"k{i:02d}.json", (1000 + i, 1000 + i))  # порядок вытеснения — по mtime
+    stats = cache.stats()
+    assert stats["bytes"] <= 1000
+    assert stats["bytes"] == sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+    assert cache.get("k19") is not None
+    assert cache.get("k00") is None
+
+
+def test_index_is_shared_with_existing_directory(tmp_path):
+    ResultCache(tmp_path).put("old", {"v": 1})
+    cache = ResultCache(tmp_path)
+    cache.put("new", {"v": 2})
+    assert cache.stats()["entries"] == 2
+    assert cache.invalidate("old") == 1
+    assert cache.stats()["entries"] == 1
+    assert cache.invalidate() == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_dataset_digest_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "DIGEST_MEMO_SIZE", 3)
+    result_cache._digests.clear()
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"d{i}.csv"
+        p.write_text(f"a\n{i}\n", encoding="utf-8")
+        paths.append(p)
+        dataset_fingerprint(str(p))
+    assert len(result_cache._digests) == 3
+    assert {k[0] for k in result_cache._digests} == {str(p.resolve()) for p in paths[2:]}
+    first = dataset_fingerprint(str(paths[2]))
+    assert first["sha256"] == result_cache._digests[next(reversed(result_cache._digests))]
@@ -0,0 +1,111 @@
+# =========================
+# Файл: tests/test_sandbox.py
+# =========================
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from web.sandbox import CpuAllocator, SandboxPolicy, parse_cpus, read_usage
+
+pytestmark = pytest.mark.skipif(not SandboxPolicy().enabled, reason="sandbox needs fork and resource")
+
+
+def launch(policy, code, cpus=None):
+    """Запуск python -c code через запускатель: (процесс, свой конец канала отчета)."""
+    r, w = os.pipe()
+    cmd = policy.wrap([sys.executable, "-c", code], w, cpus)
+    proc = subprocess.Popen(cmd, pass_fds=(w,), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    os.close(w)
+    return proc, r
+
+
+def finish(proc, r, timeout=60):
+    out, err = proc.communicate(timeout=timeout)
+    return proc.returncode, out.decode(), read_usage(r)
+
+
+def test_parse_cpus():
+    assert parse_cpus("0-3, 6,2") == [0, 1, 2, 3, 6]
+
+
+def test_allocator_spreads_jobs_over_least_loaded_cores():
+    alloc = CpuAllocator([0, 1, 2, 3], cores_per_job=2)
+    a, b = alloc.acquire(), alloc.acquire()
+    assert a == [0, 1] and b == [2, 3]
+    alloc.release(a)
+    assert alloc.acquire() == [0, 1]
+    assert alloc.stats()["load"] == {0: 1, 1: 1, 2: 1, 3: 1}
+
+
+def test_policy_from_env():
+    policy = SandboxPolicy.from_env({"UC_RUN_MAX_MEMORY_MB": "64", "UC_RUN_MAX_CPU_SECONDS": "5", "UC_RUN_CPUS": "0", "UC_RUN_CORES_PER_JOB": "1"})
+    assert policy.limits() == {"core": 0, "as": 64 << 20, "cpu": 5}
+    assert policy.allocator.cpus == [0]
+
+
+def test_usage_report_and_exit_code():
+    proc, r = launch(SandboxPolicy(open_files=64), "import resource, sys; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0]); sys.exit(3)")
+    code, out, usage = finish(proc, r)
+    assert code == 3
+    assert out.strip() == "64"
+    assert usage["limits"] == {"core": 0, "nofile": 64}
+    assert usage["max_rss_bytes"] > 0 and usage["wall_s"] > 0
+
+
+def test_killed_command_kills_launcher_with_same_signal():
+    proc, r = launch(SandboxPolicy(), "import os, signal; os.kill(os.getpid(), signal.SIGKILL)")
+    code, _, usage = finish(proc, r)
+    assert code == -signal.SIGKILL
+    assert usage["signal"] == "SIGKILL"
+
+
+def test_cpu_limit_is_reported():
+    proc, r = launch(SandboxPolicy(cpu_seconds=1), "while True: pass")
+    code, _, usage = finish(proc, r)
+    assert code in (-signal.SIGXCPU, -signal.SIGKILL)
+    assert usage["limit_exceeded"] == "cpu"
+
+
+def test_command_starts_with_unblocked_signals():
+    # запускатель блокирует сигналы остановки на время fork — команде маска не достается
+    proc, r = launch(SandboxPolicy(), "import signal; print(sorted(signal.pthread_sigmask(signal.SIG_BLOCK, [])))")
+    code, out, _ = finish(proc, r)
+    assert code == 0
+    assert out.strip() == "[]"
+
+
+def test_stop_signal_is_forwarded_and_usage_still_reported():
+    code = (
+        "import signal, sys, time\n"
+        "signal.signal(signal.SIGTERM, lambda *a: (print('term', flush=True), sys.exit(0)))\n"
+        "print('ready', flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    proc, r = launch(SandboxPolicy(), code)
+    assert proc.stdout.readline().strip() == b"ready"
+    t0 = time.monotonic()
+    proc.send_signal(signal.SIGTERM)
+    returncode, out, usage = finish(proc, r)
+    assert returncode == 0
+    assert out.strip() == "term"
+    assert usage is not None and usage["wall_s"] < 30
+    assert time.monotonic() - t0 < 10
+
+
+def test_timeout_tolerates_group_that_already_exited(tmp_path, monkeypatch):
+    from web import run_utils
+    real = os.killpg
+
+    def killpg(pgid, signum):
+        # группа успела завершиться между TimeoutExpired и сигналом
+        real(pgid, signum)
+        raise ProcessLookupError(pgid)
+
+    monkeypatch.setattr(run_utils.os, "killpg", killpg)
+    cmdline = f'"{sys.executable}" -c "import time; time.sleep(30)"'
+    rc, out, err = run_utils.run_command_cwd(tmp_path, cmdline, timeout=1, sandbox=SandboxPolicy())
+    assert (rc, err) == (124, "Timeout: 1s")
@@ -0,0 +1,109 @@
+# =========================
+# Файл: tests/test_scan_cache.py
+# =========================
+import json
+import os
+
+from web.scan_cache import SCAN_INDEX_VERSION, ScanCache
+from web.scanner import scan_repo
+
+
+def test_second_scan_is_served_from_stat(repo, tmp_path):
+    cache = ScanCache(tmp_path / "index.json", repo)
+    first = scan_repo(repo, cache=cache)
+    assert cache.stats()["misses"] == 3
+    second = scan_repo(repo, cache=cache)
+    assert second["modules"] == first["modules"]
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_changed_file_is_reparsed(repo, tmp_path):
+    cache = ScanCache(tmp_path / "index.json", repo)
+    scan_repo(repo, cache=cache)
+    (repo / "pkg/a.py").write_text("def other():\n    pass\n", encoding="utf-8")
+    res = scan_repo(repo, cache=cache)
+    assert cache.stats()["misses"] == 4
+    assert res["modules"]["pkg/a.py"]["functions"] == ["other"]
+
+
+def test_touched_file_with_same_content_is_rehashed_not_parsed(repo, tmp_path):
+    cache = ScanCache(tmp_path / "index.json", repo)
+    scan_repo(repo, cache=cache)
+    st = (repo / "pkg/a.py").stat()
+    os.utime(repo / "pkg/a.py", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    scan_repo(repo, cache=cache)
+    stats = cache.stats()
+    assert stats["rehashed"] == 1
+    assert stats["misses"] == 3
+
+
+def test_deleted_file_is_dropped_and_index_persists(repo, tmp_path):
+    index = tmp_path / "index.json"
+    cache = ScanCache(index, repo)
+    scan_repo(repo, cache=cache)
+    (repo / "pkg/b.py").unlink()
+    scan_repo(repo, cache=cache)
+    assert "pkg/b.py" not in cache.entries
+
+    reloaded = ScanCache(index, repo)
+    assert set(reloaded.entries) == {"pkg/__init__.py", "pkg/a.py"}
+    scan_repo(repo, cache=reloaded)
+    assert reloaded.stats()["misses"] == 0
+
+
+def test_index_of_other_version_is_discarded(repo, tmp_path):
+    index = tmp_path / "index.json"
+    cache = ScanCache(index, repo)
+    scan_repo(repo, cache=cache)
+    data = json.loads(index.read_text(encoding="utf-8"))
+    data["version"] = SCAN_INDEX_VERSION - 1
+    index.write_text(json.dumps(data), encoding="utf-8")
+    assert ScanCache(index, repo).entries == {}
+
+
+def test_head_change_forces_content_check(repo, tmp_path, monkeypatch):
+    import web.scan_cache as scan_cache
+    cache = ScanCache(tmp_path / "index.json", repo)
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "a" * 40)
+    scan_repo(repo, cache=cache)
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "b" * 40)
+    scan_repo(repo, cache=cache)
+    # stat не изменился, но после смены HEAD файлы сверяются по хешу
+    assert cache.stats()["rehashed"] == 3
+    assert cache.stats()["hits"] == 0
+
+
+def test_overlapping_scans_keep_their_own_verify_mode(repo, tmp_path, monkeypatch):
+    import web.scan_cache as scan_cache
+    cache = ScanCache(tmp_path / "index.json", repo)
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "a" * 40)
+    scan_repo(repo, cache=cache)
+    st = (repo / "pkg/a.py").stat()
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "b" * 40)
+    # первый проход после смены HEAD проверяет содержимое; второй начался, пока первый идет
+    first = cache.begin_scan()
+    second = cache.begin_scan()
+    assert first is True and second is True
+    # второй закончился раньше, но и он проверял — его end_scan не отключает проверку первому
+    cache.end_scan(set(cache.entries), second)
+    assert cache.lookup("pkg/a.py", st, first) is None
+    cache.end_scan(set(cache.entries), first)
+    # проверка завершена — новые проходы снова доверяют stat
+    assert cache.begin_scan() is False
+    assert cache.lookup("pkg/a.py", st) is not None
+
+
+def test_unverified_scan_end_does_not_clear_pending_verify(repo, tmp_path, monkeypatch):
+    import web.scan_cache as scan_cache
+    cache = ScanCache(tmp_path / "index.json", repo)
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "a" * 40)
+    scan_repo(repo, cache=cache)
+    monkeypatch.setattr(scan_cache, "git_head", lambda root: "b" * 40)
+    verify = cache.begin_scan()
+    # чтение без прохода (module_call_map) видит, что stat пока не доверяем
+    assert cache.pending_verify() is True
+    cache.end_scan(set(cache.entries), False)
+    assert cache.pending_verify() is True
+    cache.end_scan(set(cache.entries), verify)
+    assert cache.pending_verify() is False
@@ -0,0 +1,40 @@
+# =========================
+# Файл: tests/test_scan_stream.py
+# =========================
+import json
+
+
+def test_ndjson_stream_ends_with_summary(client):
+    r = client.get("/api/scan/stream")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in r.text.splitlines()]
+    modules = {rec["path"] for rec in records if rec["type"] == "module"}
+    assert {"pkg/a.py", "pkg/b.py", "__main__.py"} <= modules
+    summary = records[-1]
+    assert summary["type"] == "summary"
+    assert summary["module_count"] == len(modules)
+
+
+def test_sse_stream_uses_event_names(client):
+    r = client.get("/api/scan/stream", params={"format": "sse"})
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in r.text.split("\n\n") if block]
+    assert events[0].startswith("event: module\ndata: ")
+    assert events[-1].startswith("event: summary\ndata: ")
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/api/scan/stream", params={"format": "xml"}).status_code == 400
+
+
+def test_stream_is_refused_while_repository_is_fetched(client, web_app):
+    lock = web_app.repos.lock(web_app.UC_ROOT)
+    lock.acquire_write()
+    try:
+        r = client.get("/api/scan/stream")
+    finally:
+        lock.release_write()
+    assert r.status_code == 409
+    # замок читателя из отказанного запроса не остался висеть
+    assert lock.readers == 0
@@ -0,0 +1,71 @@
+# =========================
+# Файл: tests/test_scanner.py
+# =========================
+from web.scanner import parse_definitions, scan_repo
+
+from .conftest import write_tree
+
+
+def test_parallel_scan_matches_sequential_and_keeps_order(tmp_path):
+    repo = write_tree(tmp_path / "repo", {f"m{i:02d}.py": f"def f{i}():\n    pass\n" for i in range(12)})
+    sequential = scan_repo(repo)["modules"]
+    parallel = scan_repo(repo, workers=2, chunksize=2)["modules"]
+    assert list(parallel) == list(sequential)
+    assert parallel == sequential
+    assert parallel["m07.py"]["functions"] == ["f7"]
+
+
+def test_syntax_error_is_reported_per_file(tmp_path):
+    repo = write_tree(tmp_path / "repo", {"ok.py": "x = 1\n", "bad.py": "def (:\n"})
+    modules = scan_repo(repo, workers=2, chunksize=1)["modules"]
+    assert "error" in modules["bad.py"]
+    assert "error" not in modules["ok.py"]
+
+
+SAMPLE = '''
+import argparse
+from . import sibling
+from ..pkg.mod import thing
+
+
+class Outer:
+    def method(self):
+        def inner():
+            pass
+
+    async def amethod(self):
+        pass
+
+
+async def top():
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    if __name__ == "__main__":
+        pass
+
+
+if "__main__" == __name__:
+    main()
+'''
+
+
+def test_visitor_collects_definitions_in_one_pass():
+    res = parse_definitions(SAMPLE, "sample.py")
+    assert res["classes"] == ["Outer"]
+    # вложенная функция — не метод класса
+    assert res["methods"] == {"Outer": ["method", "amethod"]}
+    assert res["functions"] == ["method", "inner", "main"]
+    assert res["async_functions"] == ["amethod", "top"]
+    assert res["imports"] == ["argparse", "", "pkg"]
+    assert res["relative_imports"] == [".", "..pkg.mod"]
+    assert res["uses_argparse"] is True
+    assert res["has_main_guard"] is True
+
+
+def test_main_guard_inside_function_does_not_count():
+    res = parse_definitions('def f():\n    if __name__ == "__main__":\n        pass\n', "x.py")
+    assert res["has_main_guard"] is False
+    assert res["uses_argparse"] is False
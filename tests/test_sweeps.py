@@ -0,0 +1,120 @@
+# =========================
+# Файл: tests/test_sweeps.py
+# =========================
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from web.result_cache import ResultCache
+from web.sweeps import FINAL_STATUSES, SweepManager, expand_grid, sample_random
+
+
+def test_expand_grid():
+    grid = expand_grid({"b": [1, 2], "a": ["x"]})
+    assert grid == [{"a": "x", "b": 1}, {"a": "x", "b": 2}]
+
+
+def test_sample_random_is_seeded_and_in_range():
+    space = {"lr": {"min": 1e-4, "max": 1e-2, "log": True}, "h": {"min": 8, "max": 16, "int": True}, "opt": ["adam", "sgd"]}
+    a = sample_random(space, 5, seed=1)
+    assert a == sample_random(space, 5, seed=1)
+    for p in a:
+        assert 1e-4 <= p["lr"] <= 1e-2
+        assert isinstance(p["h"], int) and 8 <= p["h"] <= 16
+        assert p["opt"] in ("adam", "sgd")
+
+
+def offline_manager(tmp_path, **kwargs):
+    """Менеджер без пула процессов: очередь отчетов и монитор — в этом процессе."""
+    mgr = SweepManager(ResultCache(tmp_path), **kwargs)
+    mgr._reports = queue.Queue()
+    mgr._stops = {}
+    threading.Thread(target=mgr._monitor_loop, daemon=True).start()
+    return mgr
+
+
+def add_sweep(mgr, n):
+    # испытания в пул не уходят: их завершение тест вызывает сам через _done
+    mgr._start = lambda: None
+    mgr._pool = type("NoPool", (), {"submit": lambda self, *a: Future()})()
+    return mgr.submit({"training": {"epochs": 3}}, {"training.lr": [0.1 * (i + 1) for i in range(n)]})
+
+
+def wait_until(cond, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def finish(mgr, sweep, trial, result):
+    fut = Future()
+    fut.set_result({"ok": True, "result": result})
+    mgr._done(sweep, trial, fut)
+
+
+def test_done_waits_for_pending_reports_before_caching(tmp_path):
+    mgr = offline_manager(tmp_path)
+    sweep = add_sweep(mgr, 1)
+    trial = sweep.trials[0]
+    key = f"{sweep.id}:0"
+    for step in range(3):
+        mgr._reports.put((key, step, {"loss": 1.0 / (step + 1)}))
+    finish(mgr, sweep, trial, {"metrics": {"loss": 1 / 3}, "stopped": False})
+    wait_until(lambda: trial.status in FINAL_STATUSES)
+    assert trial.status == "done"
+    assert [h["step"] for h in trial.history] == [0, 1, 2]
+    wait_until(lambda: mgr.cache.get(trial.cache_key) is not None)
+    assert [h["step"] for h in mgr.cache.get(trial.cache_key)["history"]] == [0, 1, 2]
+
+
+def test_late_report_does_not_reopen_finished_trial(tmp_path):
+    mgr = offline_manager(tmp_path)
+    sweep = add_sweep(mgr, 1)
+    trial = sweep.trials[0]
+    finish(mgr, sweep, trial, {"metrics": {"loss": 0.5}, "stopped": False})
+    wait_until(lambda: trial.status == "done")
+    mgr._report(f"{sweep.id}:0", 5, {"loss": 9.0})
+    assert trial.status == "done"
+    assert trial.history == []
+
+
+def test_stopped_trial_is_not_cached(tmp_path):
+    mgr = offline_manager(tmp_path)
+    sweep = add_sweep(mgr, 1)
+    trial = sweep.trials[0]
+    finish(mgr, sweep, trial, {"metrics": {"loss": 0.9}, "stopped": True})
+    wait_until(lambda: trial.status == "stopped")
+    assert mgr.cache.get(trial.cache_key) is None
+
+
+def test_median_rule_stops_worse_trial(tmp_path):
+    mgr = offline_manager(tmp_path, grace_steps=1, min_peers=3)
+    sweep = add_sweep(mgr, 4)
+    for i in range(3):
+        mgr._report(f"{sweep.id}:{i}", 1, {"loss": 0.5})
+    mgr._report(f"{sweep.id}:3", 1, {"loss": 0.4})
+    assert f"{sweep.id}:3" not in mgr._stops
+    mgr._report(f"{sweep.id}:3", 2, {"loss": 0.9})  # на шаге 2 соседей еще нет
+    assert f"{sweep.id}:3" not in mgr._stops
+    mgr._report(f"{sweep.id}:2", 2, {"loss": 0.5})
+    mgr._report(f"{sweep.id}:1", 2, {"loss": 0.5})
+    mgr._report(f"{sweep.id}:0", 2, {"loss": 0.7})
+    assert mgr._stops.get(f"{sweep.id}:0") is True
+    assert all(t.status == "running" for t in sweep.trials)
+
+
+def test_sweep_runs_and_reuses_cache(tmp_path):
+    mgr = SweepManager(ResultCache(tmp_path), max_workers=2)
+    try:
+        space = {"training.lr": [0.1, 0.2]}
+        sweep = mgr.submit({"training": {"epochs": 2}}, space)
+        wait_until(lambda: sweep.to_dict()["finished"], timeout=120)
+        assert [t.status for t in sweep.trials] == ["done", "done"]
+        assert all(len(t.history) == 2 for t in sweep.trials)
+        again = mgr.submit({"training": {"epochs": 2}}, space)
+        assert [t.status for t in again.trials] == ["cached", "cached"]
+        assert again.trials[0].history == sweep.trials[0].history
+    finally:
+        mgr.shutdown()
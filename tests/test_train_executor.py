@@ -0,0 +1,91 @@
+# =========================
+# Файл: tests/test_train_executor.py
+# =========================
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from web.train_executor import TrainingExecutor, parse_device_limits
+
+
+def slow_train(config):
+    """Цель пула в тестах (импортируется процессами spawn по имени модуля)."""
+    if config.get("crash"):
+        os._exit(1)
+    time.sleep(config.get("sleep", 0))
+    return {"ok": True, "result": {"pid": os.getpid()}}
+
+
+def wait_final(executor, runs, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(r.status in ("done", "failed", "cancelled") for r in runs):
+            return
+        time.sleep(0.05)
+    raise AssertionError([r.to_dict() for r in runs])
+
+
+def test_parse_device_limits():
+    assert parse_device_limits("cpu=2, cuda=1,bad") == {"cpu": 2, "cuda": 1}
+
+
+def test_device_limit_queues_runs():
+    ex = TrainingExecutor(max_workers=2, device_limits={"cuda": 1}, target=slow_train)
+    try:
+        runs = [ex.submit({"runtime": {"device": "cuda"}, "sleep": 0.3}) for _ in range(2)]
+        time.sleep(0.1)
+        assert [r.status for r in runs] == ["running", "queued"]
+        wait_final(ex, runs)
+        assert [r.status for r in runs] == ["done", "done"]
+        assert runs[1].started_at >= runs[0].finished_at
+    finally:
+        ex.shutdown()
+
+
+def test_killed_worker_does_not_fail_the_healthy_run():
+    ex = TrainingExecutor(max_workers=2, target=slow_train)
+    try:
+        ex.warm()
+        runs = [ex.submit({"sleep": 2}) for _ in range(2)]
+        deadline = time.monotonic() + 30
+        while len(ex._pool._processes) < 2 or any(r.status != "running" for r in runs):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        time.sleep(0.3)  # оба запуска уже внутри процессов пула
+        os.kill(next(iter(ex._pool._processes)), signal.SIGKILL)
+        wait_final(ex, runs)
+        assert [r.status for r in runs] == ["done", "done"]
+        assert [r.attempts for r in runs] == [2, 2]
+    finally:
+        ex.shutdown()
+
+
+def test_run_that_keeps_crashing_fails_after_retries():
+    ex = TrainingExecutor(max_workers=1, max_retries=1, target=slow_train)
+    try:
+        run = ex.submit({"crash": True})
+        wait_final(ex, [run])
+        assert run.status == "failed"
+        assert run.attempts == 2
+        assert "crashed" in run.error
+        # пул пересоздан и снова принимает запуски
+        ok = ex.submit({})
+        wait_final(ex, [ok])
+        assert ok.status == "done"
+    finally:
+        ex.shutdown()
+
+
+def test_late_callback_does_not_reset_rebuilt_pool():
+    ex = TrainingExecutor(max_workers=1, target=slow_train)
+    old = ProcessPoolExecutor(max_workers=1)
+    try:
+        current = ex.pool()
+        ex._reset_pool(old)
+        assert ex._pool is current
+        ex._reset_pool(current)
+        assert ex._pool is None
+    finally:
+        old.shutdown()
+        ex.shutdown()
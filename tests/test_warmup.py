@@ -0,0 +1,56 @@
+# =========================
+# Файл: tests/test_warmup.py
+# =========================
+import os
+import subprocess
+import sys
+import tempfile
+
+from web.warmup import Warmup
+
+from .conftest import ROOT
+
+
+def test_steps_run_in_order_and_optional_failures_keep_ready():
+    calls = []
+    w = Warmup()
+    w.add("a", lambda: calls.append("a"))
+    w.add("optional", lambda: 1 / 0, required=False)
+    w.add("b", lambda: calls.append("b"))
+    assert w.stats()["state"] == "pending"
+    w.run()
+    assert calls == ["a", "b"]
+    assert w.ready
+    assert "division" in w.stats()["errors"]["optional"]
+    assert set(w.stats()["timings"]) == {"a", "optional", "b"}
+    w.run()  # повторный прогрев не выполняется
+    assert calls == ["a", "b"]
+
+
+def test_required_failure_marks_failed():
+    w = Warmup()
+    w.add("broken", lambda: 1 / 0)
+    w.start()
+    w._thread.join(5)
+    assert w.stats()["state"] == "failed" and not w.ready
+
+
+def test_app_import_defers_heavy_modules():
+    with tempfile.TemporaryDirectory() as data:
+        os.makedirs(os.path.join(data, "repos", "UC"))
+        code = (
+            "import sys, web.app\n"
+            "print(sorted(m for m in ('numpy', 'jinja2', 'web.scanner', 'web.uc_api') if m in sys.modules))\n"
+        )
+        env = {**os.environ, "UC_DATA_DIR": data, "UC_WARMUP": "off"}
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == "[]"
+
+
+def test_ready_and_health(client, web_app):
+    assert client.get("/health").json() == {"ok": True}
+    r = client.get("/ready")
+    # в тестах UC_WARMUP=off: готов сразу
+    assert r.status_code == 200
+    assert r.json()["mode"] == "off"
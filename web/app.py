@@ -3,43 +3,82 @@
 # =========================
 import os
 import json
-import yaml
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Iterator, Optional, List
 
 from fastapi import FastAPI, HTTPException, Body
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.templating import Jinja2Templates
 from starlette.requests import Request
-from starlette.responses import RedirectResponse
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 
-from .scanner import scan_repo, module_call_map, run_help_for_module
-from .run_utils import run_command_from_args, simple_shell_run, detect_python
-from .uc_api import train as uc_train, eval_model as uc_eval, infer_model as uc_infer
+# Тяжелые модули (scanner, run_utils, uc_api с датасетами и numpy, batch_infer, Jinja2)
+# импортируются внутри обработчиков и в фоновом прогреве — старт процесса их не ждет
+from .jobs import JobManager, QueueFull
+from .train_executor import TrainingExecutor, parse_device_limits
+from .sweeps import SweepManager
+from .result_cache import ResultCache
+from .scan_cache import get_scan_cache
+from .warmup import Warmup
+from .metrics import REGISTRY, MetricsMiddleware
+from .help_cache import HelpCache, get_help, module_name, prefetch_help
+from .repo_manager import RepoBusy, RepoManager
+from .repo_registry import RepoEntry, RepoRegistry, worker_entrypoints, worker_scan, worker_uc
+from .sandbox import SandboxPolicy
 
-@app.post("/api/uc/train")
-def api_uc_train(cfg: Dict[str, Any] = Body(...)):
-    return uc_train(cfg)
-
-@app.post("/api/uc/eval")
-def api_uc_eval(cfg: Dict[str, Any] = Body(...)):
-    return uc_eval(cfg)
-
-@app.post("/api/uc/infer")
-def api_uc_infer(cfg: Dict[str, Any] = Body(...), input_data: Dict[str, Any] = Body(...)):
-    return uc_infer(cfg, input_data)
 BASE_DIR = Path(__file__).resolve().parent
-REPOS_DIR = BASE_DIR.parent.parent / "data" / "repos"
+# Все данные (checkout, конфиги, кеши, логи) — в UC_DATA_DIR; по умолчанию data/ рядом с проектом
+DATA_DIR = Path(os.environ.get("UC_DATA_DIR", str(BASE_DIR.parent.parent / "data")))
+REPOS_DIR = DATA_DIR / "repos"
 REPO_NAME = "UC"
-UC_REPO_URL = "https://github.com/singaevsky/UC.git"
+REPOS_STATE = DATA_DIR / "repos.json"
+UC_REPO_URL = os.environ.get("UC_REPO_URL", "https://github.com/singaevsky/UC.git")
 UC_ROOT = REPOS_DIR / REPO_NAME
-CONFIGS_DIR = BASE_DIR.parent.parent / "data" / "configs"
+CONFIGS_DIR = DATA_DIR / "configs"
+CONFIG_STORE_DIR = CONFIGS_DIR / "store"
+CACHE_DIR = DATA_DIR / "cache"
+DATASETS_DIR = DATA_DIR / "datasets"
+# Параллельный разбор в scan_repo: 0/1 — последовательно
+SCAN_WORKERS = int(os.environ.get("UC_SCAN_WORKERS", "0"))
+SCAN_CHUNKSIZE = int(os.environ.get("UC_SCAN_CHUNKSIZE", "64"))
+# Очередь запусков /api/run: одновременно выполняемые и ожидающие задачи
+MAX_RUNNING_JOBS = int(os.environ.get("UC_MAX_RUNNING_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.environ.get("UC_MAX_QUEUED_JOBS", "32"))
+# Пул обучения: число процессов, лимиты по runtime.device ("cpu=2,cuda=1") и модули для прогрева
+TRAIN_WORKERS = int(os.environ.get("UC_TRAIN_WORKERS", "2"))
+TRAIN_DEVICE_LIMITS = os.environ.get("UC_TRAIN_DEVICE_LIMITS", "")
+TRAIN_WARM_MODULES = os.environ.get("UC_TRAIN_WARM_MODULES", "numpy")
+# Перебор гиперпараметров: размер пула и срок хранения завершенных испытаний
+SWEEP_WORKERS = int(os.environ.get("UC_SWEEP_WORKERS", str(os.cpu_count() or 2)))
+SWEEP_CACHE_TTL = float(os.environ.get("UC_SWEEP_CACHE_TTL", str(30 * 86400)))
+# Вывод запусков: последние N строк в памяти, полный лог — в data/logs (UC_SPILL_LOGS=0 — отключить)
+LOGS_DIR = DATA_DIR / "logs"
+JOB_LOG_LINES = int(os.environ.get("UC_JOB_LOG_LINES", "1000"))
+SPILL_JOB_LOGS = os.environ.get("UC_SPILL_LOGS", "1") != "0"
+# Сбор --help: одновременно запущенных интерпретаторов при массовой выборке
+HELP_CONCURRENCY = int(os.environ.get("UC_HELP_CONCURRENCY", str(os.cpu_count() or 2)))
+# Прогрев после старта: background — в фоне (по умолчанию), eager — до приема запросов, off — без прогрева
+WARMUP_MODE = os.environ.get("UC_WARMUP", "background")
+# Поднимать ли процессы пула обучения при прогреве
+WARMUP_TRAINER = os.environ.get("UC_WARMUP_TRAINER", "0") == "1"
+# Метрики Prometheus на /metrics; UC_METRICS=0 отключает замер длительности запросов
+METRICS_ENABLED = os.environ.get("UC_METRICS", "1") != "0"
+# Клонирование: глубина истории (0 — полная), partial clone фильтр ("" — без фильтра),
+# sparse-checkout: "" — все дерево, "scan" — только файлы, которые читает сканер, иначе каталоги через запятую
+CLONE_DEPTH = int(os.environ.get("UC_CLONE_DEPTH", "1"))
+CLONE_FILTER = os.environ.get("UC_CLONE_FILTER", "blob:none")
+CLONE_SPARSE = os.environ.get("UC_CLONE_SPARSE", "")
+# Песочница запусков (UC_SANDBOX=0 — отключить): лимиты UC_RUN_MAX_MEMORY_MB, UC_RUN_MAX_CPU_SECONDS,
+# UC_RUN_MAX_OPEN_FILES, UC_RUN_MAX_PROCS (0 — без лимита), UC_RUN_NICE и привязка к ядрам
+# UC_RUN_CORES_PER_JOB из UC_RUN_CPUS ("0-3,6"; по умолчанию — доступные процессу)
+SANDBOX_ENABLED = os.environ.get("UC_SANDBOX", "1") != "0"
 DEFAULT_CONFIG = {
     "dataset": {
-        "train": str(BASE_DIR.parent.parent / "data" / "datasets" / "train.csv"),
-        "val": str(BASE_DIR.parent.parent / "data" / "datasets" / "val.csv")
+        "train": str(DATA_DIR / "datasets" / "train.csv"),
+        "val": str(DATA_DIR / "datasets" / "val.csv")
     },
     "model": {
         "name": "UCModel",
@@ -58,19 +97,100 @@ DEFAULT_CONFIG = {
 def ensure_repo() -> None:
     REPOS_DIR.mkdir(parents=True, exist_ok=True)
 
-def clone_or_update(repo_url: str, target_dir: Path) -> Dict[str, Any]:
-    target_dir.parent.mkdir(parents=True, exist_ok=True)
-    if target_dir.exists():
-        # update
-        import subprocess
-        proc = subprocess.run(["git", "-C", str(target_dir), "pull", "--rebase"], capture_output=True, text=True)
-        return {"ok": True, "action": "update", "log": proc.stdout + proc.stderr}
-    else:
-        import subprocess
-        proc = subprocess.run(["git", "clone", repo_url, str(target_dir)], capture_output=True, text=True)
-        return {"ok": True, "action": "clone", "log": proc.stdout + proc.stderr}
+def parse_sparse(value: str) -> Optional[List[str]]:
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    return items or None
+
+def find_job(job_id: str) -> Any:
+    manager = registry.job_manager(job_id)
+    return manager.get(job_id) if manager else None
+
+def get_repo(repo_id: str) -> RepoEntry:
+    entry = registry.get(repo_id)
+    if entry is None:
+        raise HTTPException(404, f"Repository not registered: {repo_id}")
+    return entry
+
+async def repo_call(entry: RepoEntry, fn: Any, *args: Any) -> Any:
+    try:
+        return await entry.call(fn, *args)
+    except RuntimeError as e:
+        raise HTTPException(500, str(e))
+
+@contextmanager
+def repo_reading(target: Path = UC_ROOT) -> Iterator[None]:
+    """Чтение дерева репозитория: 409, пока идет clone/fetch, 400 — если репозитория нет."""
+    with repos.reading(target):
+        if not target.exists():
+            raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
+        yield
+
+_templates = None
+
+def get_templates():
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+    return _templates
+
+def _warm_imports() -> None:
+    from . import scanner, run_utils, uc_api, batch_infer  # noqa: F401
+    from .datasets import numpy_module
+    numpy_module()
 
-app = FastAPI(title="UC Repository Web Starter", version="0.1.0")
+warmup = Warmup()
+warmup.add("imports", _warm_imports)
+warmup.add("templates", get_templates)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_MODE == "eager":
+        await run_in_threadpool(warmup.run)
+    elif WARMUP_MODE == "background":
+        warmup.start()
+    yield
+    registry.shutdown()
+    trainer.shutdown()
+    sweeps.shutdown()
+
+app = FastAPI(title="UC Repository Web Starter", version="0.1.0", lifespan=lifespan)
+trainer = TrainingExecutor(
+    max_workers=TRAIN_WORKERS,
+    device_limits=parse_device_limits(TRAIN_DEVICE_LIMITS),
+    warm_modules=[m.strip() for m in TRAIN_WARM_MODULES.split(",") if m.strip()],
+)
+sweeps = SweepManager(
+    ResultCache(CACHE_DIR / "sweeps", ttl=SWEEP_CACHE_TTL),
+    max_workers=SWEEP_WORKERS,
+)
+# одна политика (и один распределитель ядер) на все очереди запусков процесса
+sandbox = SandboxPolicy.from_env() if SANDBOX_ENABLED else None
+jobs = JobManager(
+    max_concurrent=MAX_RUNNING_JOBS,
+    max_queued=MAX_QUEUED_JOBS,
+    log_lines=JOB_LOG_LINES,
+    log_dir=LOGS_DIR if SPILL_JOB_LOGS else None,
+    sandbox=sandbox,
+)
+if WARMUP_TRAINER:
+    warmup.add("trainer", trainer.warm, required=False)
+help_cache = HelpCache(CACHE_DIR / "help")
+repos = RepoManager(depth=CLONE_DEPTH or None, filter=CLONE_FILTER or None, sparse=parse_sparse(CLONE_SPARSE))
+# Несколько checkout (в т.ч. веток) рядом: свой процесс, кеш скана и очередь запусков на каждый;
+# исходный UC_ROOT — встроенный репозиторий REPO_NAME с общей очередью jobs
+registry = RepoRegistry(
+    REPOS_DIR,
+    CACHE_DIR,
+    REPOS_STATE,
+    max_concurrent=MAX_RUNNING_JOBS,
+    max_queued=MAX_QUEUED_JOBS,
+    log_lines=JOB_LOG_LINES,
+    log_dir=LOGS_DIR if SPILL_JOB_LOGS else None,
+    sandbox=sandbox,
+)
+registry.ensure(REPO_NAME, UC_REPO_URL, jobs)
+REGISTRY.func("uc_jobs", "gauge", "Run jobs by state", lambda: {(k,): v for k, v in jobs.counts().items()}, ("state",))
 
 app.add_middleware(
     CORSMiddleware,
@@ -78,76 +198,396 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-# статические ассеты/шаблоны
+# статические ассеты; шаблоны — get_templates()
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+
+@app.exception_handler(RepoBusy)
+async def repo_busy_handler(request: Request, exc: RepoBusy):
+    op = exc.op.to_dict(with_log=False) if exc.op else None
+    return JSONResponse({"detail": str(exc), "op": op}, status_code=409)
 
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse(request, "index.html")
 
 @app.get("/api/clone")
-def api_clone():
+async def api_clone(wait: bool = False, branch: Optional[str] = None, sparse: Optional[str] = None):
+    """
+    Клонирование (shallow + blobless, опционально sparse) или обновление в фоне. Сразу возвращает
+    операцию; прогресс — GET /api/clone/{op_id}. Повторный вызов во время fetch вернет ту же операцию.
+    """
     ensure_repo()
-    res = clone_or_update(UC_REPO_URL, UC_ROOT)
-    return res
+    op = repos.sync(UC_REPO_URL, UC_ROOT, branch=branch, sparse=parse_sparse(sparse) if sparse is not None else None)
+    if wait:
+        await run_in_threadpool(op.done.wait)
+    return {"ok": op.status != "failed", "op_id": op.id, **op.to_dict()}
+
+@app.get("/api/clone/{op_id}")
+def api_clone_status(op_id: str):
+    op = repos.get(op_id)
+    if not op:
+        raise HTTPException(404, "Operation not found")
+    return {"ok": True, **op.to_dict()}
 
 @app.get("/api/scan")
-def api_scan():
-    if not UC_ROOT.exists():
-        raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
-    scan = scan_repo(UC_ROOT)
-    return {"ok": True, "scan": scan}
+def api_scan(workers: Optional[int] = None, chunksize: Optional[int] = None):
+    from .scanner import scan_repo
+    with repo_reading():
+        cache = get_scan_cache(UC_ROOT, CACHE_DIR)
+        scan = scan_repo(
+            UC_ROOT,
+            cache=cache,
+            workers=SCAN_WORKERS if workers is None else workers,
+            chunksize=chunksize or SCAN_CHUNKSIZE,
+        )
+    return {"ok": True, "scan": scan, "cache": cache.stats()}
+
+@app.get("/api/scan/stream")
+def api_scan_stream(format: str = "ndjson"):
+    """Потоковый скан: NDJSON (по умолчанию) или Server-Sent Events (format=sse)."""
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(400, "format must be ndjson or sse")
+    from .scanner import iter_scan_repo
+    cache = get_scan_cache(UC_ROOT, CACHE_DIR)
+
+    def records():
+        # замок держится, пока поток не дочитан или не оборван (close() генератора)
+        with repo_reading():
+            yield ""
+            for rec in iter_scan_repo(UC_ROOT, cache=cache):
+                if rec["type"] == "summary":
+                    rec["cache"] = cache.stats()
+                line = json.dumps(rec, ensure_ascii=False)
+                if format == "sse":
+                    yield f"event: {rec['type']}\ndata: {line}\n\n"
+                else:
+                    yield line + "\n"
+
+    stream = records()
+    next(stream)  # берем замок до ответа: 409/400 уходят обычным JSON, а не обрывом потока
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream, media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/scan/cache")
+def api_scan_cache():
+    return {"ok": True, "cache": get_scan_cache(UC_ROOT, CACHE_DIR).stats()}
+
+@app.delete("/api/scan/cache")
+def api_scan_cache_invalidate():
+    cache = get_scan_cache(UC_ROOT, CACHE_DIR)
+    cache.invalidate()
+    cache.save()
+    return {"ok": True, "cache": cache.stats()}
 
 @app.post("/api/module-map")
 def api_module_map(selected_modules: List[str] = Body(...)):
-    if not UC_ROOT.exists():
-        raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
-    return {"ok": True, "map": module_call_map(UC_ROOT, selected_modules)}
+    from .scanner import module_call_map
+    from .code_index import get_code_index
+    from .help_cache import module_name
+    with repo_reading():
+        modules = module_call_map(UC_ROOT, selected_modules, cache=get_scan_cache(UC_ROOT, CACHE_DIR))
+        # первый запрос строит индекс — читает дерево, как и скан
+        index = get_code_index(UC_ROOT, CACHE_DIR)
+        graph = {rel: index.module_graph(module_name(rel)) for rel in modules}
+    return {"ok": True, "map": modules, "graph": graph}
+
+@app.post("/api/index/update")
+def api_index_update(workers: Optional[int] = None):
+    """Инкрементальное обновление индекса символов/импортов/вызовов: разбираются только изменившиеся файлы."""
+    from .code_index import get_code_index
+    with repo_reading():
+        index = get_code_index(UC_ROOT, CACHE_DIR)
+        update = index.update(workers=SCAN_WORKERS if workers is None else workers)
+    return {"ok": True, "update": update, "index": index.stats()}
+
+@app.get("/api/index")
+def api_index_stats():
+    from .code_index import get_code_index
+    return {"ok": True, "index": get_code_index(UC_ROOT, CACHE_DIR).stats()}
+
+@app.get("/api/index/callers")
+def api_index_callers(symbol: str, depth: int = 1, unresolved: bool = False, limit: int = 1000):
+    """Кто вызывает symbol (pkg.mod.func, pkg.mod.Class.method или просто имя); depth > 1 — транзитивно."""
+    from .code_index import get_code_index
+    with repo_reading():
+        res = get_code_index(UC_ROOT, CACHE_DIR).callers(symbol, depth=depth, include_unresolved=unresolved, limit=limit)
+    return {"ok": True, **res}
+
+@app.get("/api/index/imports")
+def api_index_imports(module: str, transitive: bool = True, reverse: bool = False):
+    """Модули репозитория, импортируемые module (reverse=true — импортирующие его), транзитивно по умолчанию."""
+    from .code_index import get_code_index
+    with repo_reading():
+        res = get_code_index(UC_ROOT, CACHE_DIR).imports(module, transitive=transitive, reverse=reverse)
+    if not res["found"]:
+        raise HTTPException(404, f"Module not found: {module}")
+    return {"ok": True, **res}
+
+@app.get("/api/index/reachability")
+def api_index_reachability(entry: str):
+    """Модули и функции, достижимые из entrypoint ("name = pkg.mod:func", "pkg.mod:func" или модуль)."""
+    from .code_index import get_code_index
+    with repo_reading():
+        res = get_code_index(UC_ROOT, CACHE_DIR).reachability(entry)
+    if not res["found"]:
+        raise HTTPException(404, f"Entrypoint module not found: {entry}")
+    return {"ok": True, **res}
 
 @app.get("/api/entrypoints")
 def api_entrypoints():
-    if not UC_ROOT.exists():
-        raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
     from .scanner import detect_entrypoints
-    ep = detect_entrypoints(UC_ROOT)
+    with repo_reading():
+        ep = detect_entrypoints(UC_ROOT)
     return {"ok": True, "entrypoints": ep}
 
 @app.get("/api/help")
-def api_help(entry: Optional[str] = None, module: Optional[str] = None):
-    if not UC_ROOT.exists():
-        raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
+async def api_help(entry: Optional[str] = None, module: Optional[str] = None, mode: str = "run", refresh: bool = False):
+    """
+    Справка --help модуля или entrypoint. mode=run — запуск интерпретатора, mode=static — разбор
+    вызовов add_argument из AST без запуска. Результат кешируется по файлу модуля и HEAD.
+    """
     if not entry and not module:
         raise HTTPException(400, "Provide entry or module")
-    python = detect_python()
-    code, out, err = run_help_for_module(UC_ROOT, module or "", entry or "", python)
-    return {"ok": True, "returncode": code, "stdout": out, "stderr": err}
+    if mode not in ("run", "static"):
+        raise HTTPException(400, "mode must be run or static")
+    from .run_utils import detect_python
+    with repo_reading():
+        res = await get_help(help_cache, UC_ROOT, module=module or "", entry=entry or "", python=detect_python(), mode=mode, refresh=refresh)
+    return {"ok": True, **res}
+
+@app.post("/api/help/prefetch")
+async def api_help_prefetch(mode: str = "run", concurrency: Optional[int] = None, refresh: bool = False):
+    """Справка для всех модулей с argparse (uses_argparse из скана) — параллельно, не больше concurrency процессов."""
+    if mode not in ("run", "static"):
+        raise HTTPException(400, "mode must be run or static")
+    from .scanner import scan_repo
+    from .run_utils import detect_python
+    with repo_reading():
+        scan = await run_in_threadpool(scan_repo, UC_ROOT, get_scan_cache(UC_ROOT, CACHE_DIR))
+        modules = [module_name(rel) for rel, info in scan["modules"].items() if info.get("uses_argparse")]
+        results = await prefetch_help(
+            help_cache, UC_ROOT, modules, detect_python(), mode=mode, concurrency=concurrency or HELP_CONCURRENCY, refresh=refresh
+        )
+    return {
+        "ok": True,
+        "modules": len(results),
+        "cached": sum(1 for r in results if r["cached"]),
+        "failed": sum(1 for r in results if r["returncode"] != 0),
+        "help": {r["module"]: r for r in results},
+    }
+
+@app.get("/api/help/cache")
+def api_help_cache():
+    return {"ok": True, "cache": help_cache.stats()}
+
+@app.delete("/api/help/cache")
+def api_help_cache_invalidate():
+    return {"ok": True, "removed": help_cache.invalidate()}
 
 @app.post("/api/run")
-def api_run(
+async def api_run(
     args: List[str] = Body(...),
     config_files: Optional[Dict[str, Any]] = None,
     env_add: Optional[Dict[str, str]] = None,
     timeout: int = 600
 ):
+    """Ставим запуск в очередь и сразу возвращаем job_id; статус — GET /api/jobs/{job_id}."""
+    busy = repos.busy(UC_ROOT)
+    if busy:
+        raise RepoBusy(busy)
     if not UC_ROOT.exists():
         raise HTTPException(400, "Repository not found. Clone via /api/clone first.")
     if not args:
         raise HTTPException(400, "Args cannot be empty")
-    # Если нужно подменить конфиги — кладем в data/configs/
-    config_files = config_files or {}
-    if config_files:
-        from .run_utils import write_configs
-        CONFIGS_DIR.mkdir(parents=True, exist_ok=True)
-        write_configs(CONFIGS_DIR, config_files)
-
-    # Запуск как python -m __main__ <args> из репозитория
-    python = detect_python()
-    full_cmd = [python, "-m", "__main__"] + args
-    import shlex
-    code, out, err = simple_shell_run(UC_ROOT, " ".join(shlex.quote(c) for c in full_cmd), env_add=env_add, timeout=timeout)
-    return {"ok": True, "returncode": code, "stdout": out, "stderr": err}
+    # Конфиги — в хранилище по содержимому: у запуска свой неизменяемый каталог набора,
+    # ссылки на них в args переписываются, каталог передается в UC_CONFIGS_DIR
+    from .run_utils import build_env, main_module_cmd, prepare_run_configs
+    args, env_add, configs = prepare_run_configs(CONFIG_STORE_DIR, args, config_files, env_add)
+
+    # Запуск как python __main__.py <args> из репозитория
+    try:
+        job = jobs.submit(main_module_cmd(args), UC_ROOT, build_env(UC_ROOT, env_add), timeout=timeout)
+    except QueueFull as e:
+        raise HTTPException(429, str(e))
+    return {"ok": True, "job_id": job.id, "status": job.status, "configs": configs}
+
+@app.get("/api/jobs")
+def api_jobs():
+    return {
+        "ok": True,
+        "jobs": jobs.list(),
+        "counts": jobs.counts(),
+        "max_running": jobs.max_concurrent,
+        "max_queued": jobs.max_queued,
+        "sandbox": jobs.sandbox.to_dict() if jobs.sandbox is not None else None,
+    }
+
+@app.get("/api/jobs/{job_id}")
+def api_job_status(job_id: str):
+    job = find_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return {"ok": True, "job": job.to_dict()}
+
+@app.get("/api/jobs/{job_id}/logs")
+def api_job_logs(job_id: str, since: int = 0):
+    """Строки из кольцевого буфера с номером больше since — для опроса без SSE."""
+    job = find_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return {"ok": True, "status": job.status, "lines": job.log.since(since), "last_seq": job.log.seq}
+
+@app.get("/api/jobs/{job_id}/logs/stream")
+async def api_job_logs_stream(job_id: str, since: int = 0):
+    """Живой вывод запуска через Server-Sent Events; в конце — событие end со статусом."""
+    job = find_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    async def events():
+        async for rec in job.log.follow(since):
+            yield f"id: {rec['seq']}\nevent: {rec['stream']}\ndata: {json.dumps(rec['text'], ensure_ascii=False)}\n\n"
+        end = {"status": job.status, "returncode": job.returncode}
+        yield f"event: end\ndata: {json.dumps(end)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/jobs/{job_id}/logs/file")
+def api_job_log_file(job_id: str):
+    job = find_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    path = job.log.log_path
+    if path is None or not path.exists():
+        raise HTTPException(404, "Log file not available")
+    return FileResponse(str(path), media_type="text/plain; charset=utf-8")
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def api_job_cancel(job_id: str):
+    manager = registry.job_manager(job_id) or jobs
+    job = await manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return {"ok": True, "job": job.to_dict(with_output=False)}
+
+@app.get("/api/repos")
+def api_repos():
+    return {"ok": True, "repos": registry.list()}
+
+@app.post("/api/repos")
+def api_repos_add(id: str = Body(...), url: str = Body(...), branch: Optional[str] = Body(None)):
+    """Зарегистрировать checkout (url + ветка) под id; клонирование — POST /api/repos/{id}/clone."""
+    try:
+        entry = registry.add(id, url, branch)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except KeyError as e:
+        raise HTTPException(409, e.args[0])
+    return {"ok": True, "repo": entry.to_dict()}
+
+@app.get("/api/repos/{repo_id}")
+def api_repo(repo_id: str):
+    entry = get_repo(repo_id)
+    busy = repos.busy(entry.root)
+    return {"ok": True, "repo": entry.to_dict(), "fetch": busy.to_dict(with_log=False) if busy else None}
+
+@app.delete("/api/repos/{repo_id}")
+async def api_repo_remove(repo_id: str, purge: bool = False):
+    entry = get_repo(repo_id)
+    busy = repos.busy(entry.root)
+    if busy:
+        raise RepoBusy(busy)
+    try:
+        await registry.remove(repo_id, purge=purge)
+    except KeyError as e:
+        raise HTTPException(409, e.args[0])
+    return {"ok": True, "removed": repo_id, "purged": purge}
+
+@app.post("/api/repos/{repo_id}/clone")
+async def api_repo_clone(repo_id: str, wait: bool = False, sparse: Optional[str] = None):
+    entry = get_repo(repo_id)
+    ensure_repo()
+    op = repos.sync(entry.url, entry.root, branch=entry.branch, sparse=parse_sparse(sparse) if sparse is not None else None)
+    if wait:
+        await run_in_threadpool(op.done.wait)
+    return {"ok": op.status != "failed", "op_id": op.id, **op.to_dict()}
+
+@app.get("/api/repos/{repo_id}/scan")
+async def api_repo_scan(repo_id: str, workers: Optional[int] = None, chunksize: Optional[int] = None):
+    """Скан в процессе репозитория: кеш скана этого checkout остается в памяти процесса между запросами."""
+    entry = get_repo(repo_id)
+    with repo_reading(entry.root):
+        res = await repo_call(entry, worker_scan, SCAN_WORKERS if workers is None else workers, chunksize or SCAN_CHUNKSIZE)
+    return {"ok": True, "repo": repo_id, **res}
+
+@app.get("/api/repos/{repo_id}/entrypoints")
+async def api_repo_entrypoints(repo_id: str):
+    entry = get_repo(repo_id)
+    with repo_reading(entry.root):
+        ep = await repo_call(entry, worker_entrypoints)
+    return {"ok": True, "repo": repo_id, "entrypoints": ep}
+
+@app.get("/api/repos/{repo_id}/help")
+async def api_repo_help(repo_id: str, entry: Optional[str] = None, module: Optional[str] = None, mode: str = "run", refresh: bool = False):
+    repo = get_repo(repo_id)
+    if not entry and not module:
+        raise HTTPException(400, "Provide entry or module")
+    if mode not in ("run", "static"):
+        raise HTTPException(400, "mode must be run or static")
+    from .run_utils import detect_python
+    # --help и так идет отдельным интерпретатором с PYTHONPATH на этот checkout
+    with repo_reading(repo.root):
+        res = await get_help(help_cache, repo.root, module=module or "", entry=entry or "", python=detect_python(), mode=mode, refresh=refresh)
+    return {"ok": True, "repo": repo_id, **res}
+
+@app.post("/api/repos/{repo_id}/run")
+async def api_repo_run(
+    repo_id: str,
+    args: List[str] = Body(...),
+    config_files: Optional[Dict[str, Any]] = None,
+    env_add: Optional[Dict[str, str]] = None,
+    timeout: int = 600
+):
+    """Запуск в очереди этого репозитория; статус и логи — общие /api/jobs/{job_id}..."""
+    entry = get_repo(repo_id)
+    busy = repos.busy(entry.root)
+    if busy:
+        raise RepoBusy(busy)
+    if not entry.root.exists():
+        raise HTTPException(400, f"Repository {repo_id} not cloned. Clone via /api/repos/{repo_id}/clone first.")
+    if not args:
+        raise HTTPException(400, "Args cannot be empty")
+    # хранилище конфигов общее: объекты адресуются содержимым и не зависят от репозитория
+    from .run_utils import build_env, main_module_cmd, prepare_run_configs
+    args, env_add, configs = prepare_run_configs(CONFIG_STORE_DIR, args, config_files, env_add)
+    try:
+        job = entry.jobs.submit(main_module_cmd(args), entry.root, build_env(entry.root, env_add), timeout=timeout)
+    except QueueFull as e:
+        raise HTTPException(429, str(e))
+    return {"ok": True, "repo": repo_id, "job_id": job.id, "status": job.status, "configs": configs}
+
+@app.get("/api/repos/{repo_id}/jobs")
+def api_repo_jobs(repo_id: str):
+    entry = get_repo(repo_id)
+    return {"ok": True, "repo": repo_id, "jobs": entry.jobs.list(), "counts": entry.jobs.counts()}
+
+@app.post("/api/repos/{repo_id}/uc/{op}")
+async def api_repo_uc(repo_id: str, op: str, cfg: Dict[str, Any] = Body(...)):
+    """uc_api.train / eval_model в процессе репозитория: UC импортируется из его checkout."""
+    entry = get_repo(repo_id)
+    if op not in ("train", "eval"):
+        raise HTTPException(404, f"Unknown operation: {op}")
+    with repo_reading(entry.root):
+        res = await repo_call(entry, worker_uc, op, cfg)
+    return {"repo": repo_id, **res}
+
+@app.get("/api/configs/store")
+def api_config_store():
+    from .config_store import get_config_store
+    return {"ok": True, "store": get_config_store(CONFIG_STORE_DIR).stats()}
 
 @app.get("/api/default-config")
 def api_default_config():
@@ -155,16 +595,193 @@ def api_default_config():
 
 @app.post("/api/ensure-default-configs")
 def api_ensure_default_configs():
-    CONFIGS_DIR.mkdir(parents=True, exist_ok=True)
-    cfg_path = CONFIGS_DIR / "config.json"
-    with open(cfg_path, "w", encoding="utf-8") as f:
-        json.dump(DEFAULT_CONFIG, f, ensure_ascii=False, indent=2)
-    return {"ok": True, "path": str(cfg_path)}
+    from .run_utils import write_configs
+    cfg_path = write_configs(CONFIGS_DIR, {"config.json": DEFAULT_CONFIG})[0]
+    return {"ok": True, "path": cfg_path}
+
+@app.post("/api/uc/train")
+def api_uc_train(cfg: Dict[str, Any] = Body(...)):
+    """Ставим обучение в пул процессов; статус — GET /api/uc/train/{run_id}."""
+    run = trainer.submit(cfg)
+    return {"ok": True, "run_id": run.id, "status": run.status, "device": run.device}
+
+@app.get("/api/uc/train")
+def api_uc_train_list():
+    return {"ok": True, "runs": trainer.list(), "executor": trainer.stats()}
+
+@app.post("/api/uc/train/warm")
+def api_uc_train_warm():
+    trainer.warm()
+    return {"ok": True, "executor": trainer.stats()}
+
+@app.get("/api/uc/train/{run_id}")
+def api_uc_train_status(run_id: str):
+    run = trainer.get(run_id)
+    if run is None:
+        raise HTTPException(404, "Run not found")
+    return {"ok": True, "run": run.to_dict()}
+
+@app.post("/api/uc/train/{run_id}/cancel")
+def api_uc_train_cancel(run_id: str):
+    run = trainer.cancel(run_id)
+    if run is None:
+        raise HTTPException(404, "Run not found")
+    return {"ok": run.status == "cancelled", "run": run.to_dict()}
+
+@app.post("/api/uc/eval")
+def api_uc_eval(cfg: Dict[str, Any] = Body(...), refresh: bool = False):
+    from .uc_api import eval_model_cached as uc_eval_cached
+    return uc_eval_cached(cfg, refresh=refresh)
+
+@app.get("/api/uc/eval/cache")
+def api_uc_eval_cache():
+    from .uc_api import eval_cache as uc_eval_cache
+    return {"ok": True, "cache": uc_eval_cache.stats()}
+
+@app.post("/api/uc/eval/invalidate")
+def api_uc_eval_invalidate(cfg: Optional[Dict[str, Any]] = Body(None)):
+    """Сбросить закешированный результат для конфигурации или (без тела) весь кеш оценок."""
+    from .uc_api import eval_cache as uc_eval_cache, eval_cache_key as uc_eval_cache_key
+    removed = uc_eval_cache.invalidate(uc_eval_cache_key(cfg) if cfg else None)
+    return {"ok": True, "removed": removed}
+
+@app.post("/api/uc/infer")
+async def api_uc_infer(cfg: Dict[str, Any] = Body(...), input_data: Dict[str, Any] = Body(...)):
+    from .uc_api import infer_model as uc_infer, batcher as uc_batcher
+    if uc_batcher.max_batch_size <= 1:
+        return await run_in_threadpool(uc_infer, cfg, input_data)
+    return await uc_batcher.submit(cfg, input_data)
+
+@app.post("/api/uc/infer/batch")
+async def api_uc_infer_batch(
+    request: Request,
+    path: Optional[str] = None,
+    format: Optional[str] = None,
+    config: Optional[str] = None,
+    chunk_size: int = 256,
+):
+    """
+    Пакетный инференс. Вход — тело запроса (JSONL или CSV; принимается во временный файл,
+    в памяти не больше 8 МБ) либо path относительно data/datasets. config — JSON конфигурации (по умолчанию DEFAULT_CONFIG).
+    Ответ — NDJSON с предсказаниями по мере обработки кусков по chunk_size записей.
+    """
+    from .uc_api import infer_batch as uc_infer_batch
+    from .batch_infer import aiter_file, aiter_fileobj, aiter_lines, aiter_records, spool_upload, stream_predictions
+    try:
+        cfg = json.loads(config) if config else DEFAULT_CONFIG
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid config JSON: {e}")
+    if chunk_size < 1:
+        raise HTTPException(400, "chunk_size must be positive")
+    # до открытия файла и приема тела: на отказе нечего закрывать
+    if format and format not in ("jsonl", "csv"):
+        raise HTTPException(400, "format must be jsonl or csv")
+
+    if path:
+        src = (DATASETS_DIR / path).resolve()
+        if DATASETS_DIR.resolve() not in src.parents or not src.is_file():
+            raise HTTPException(400, "path must point to a file under data/datasets")
+        fmt = format or ("csv" if src.suffix.lower() == ".csv" else "jsonl")
+        chunks = aiter_file(src)
+    else:
+        ctype = request.headers.get("content-type", "")
+        fmt = format or ("csv" if "csv" in ctype else "jsonl")
+        chunks = aiter_fileobj(await spool_upload(request.stream()), close=True)
+
+    records = aiter_records(aiter_lines(chunks), fmt)
+    return StreamingResponse(
+        stream_predictions(records, cfg, uc_infer_batch, chunk_size=chunk_size),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/api/uc/dataset")
+def api_uc_dataset(cfg: Optional[Dict[str, Any]] = Body(None), split: str = "train", columnar: bool = False, preview: int = 5):
+    """Сведения о датасете split из конфигурации (строки, колонки, типы) и первые preview строк."""
+    from .uc_api import load_split as uc_load_split
+    cfg = cfg or DEFAULT_CONFIG
+    try:
+        ds = uc_load_split(cfg, split)
+        if columnar:
+            ds.load_columnar(build=True)
+    except (OSError, ValueError) as e:
+        raise HTTPException(400, str(e))
+    return {"ok": True, "dataset": ds.info(), "preview": ds.rows(0, preview)}
+
+@app.get("/api/uc/batching")
+def api_uc_batching():
+    from .uc_api import batcher as uc_batcher
+    return {"ok": True, "batching": uc_batcher.stats()}
+
+@app.post("/api/uc/sweeps")
+def api_uc_sweep(
+    space: Dict[str, Any] = Body(...),
+    base: Optional[Dict[str, Any]] = Body(None),
+    search: str = Body("grid"),
+    n_trials: int = Body(10),
+    seed: int = Body(0),
+    metric: str = Body("loss"),
+    goal: str = Body("min"),
+):
+    """
+    Запуск перебора: space — {"training.lr": [1e-3, 1e-4], ...} для grid
+    или значения/диапазоны {"min", "max", "log", "int"} для random. base — по умолчанию DEFAULT_CONFIG.
+    """
+    if not space:
+        raise HTTPException(400, "space cannot be empty")
+    try:
+        sweep = sweeps.submit(base or DEFAULT_CONFIG, space, search=search, n_trials=n_trials, seed=seed, metric=metric, goal=goal)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(400, str(e))
+    return {"ok": True, "sweep": sweep.to_dict(with_trials=False)}
+
+@app.get("/api/uc/sweeps")
+def api_uc_sweeps():
+    return {"ok": True, "sweeps": sweeps.list()}
+
+@app.get("/api/uc/sweeps/{sweep_id}")
+def api_uc_sweep_status(sweep_id: str):
+    sweep = sweeps.get(sweep_id)
+    if sweep is None:
+        raise HTTPException(404, "Sweep not found")
+    return {"ok": True, "sweep": sweep.to_dict()}
+
+@app.get("/api/uc/models")
+def api_uc_models():
+    from .uc_api import models as uc_models
+    return {"ok": True, "registry": uc_models.stats()}
+
+@app.post("/api/uc/models/warm")
+def api_uc_models_warm(cfg: Dict[str, Any] = Body(...)):
+    """Заранее загрузить модель для конфигурации, чтобы первый /api/uc/infer не ждал."""
+    from .uc_api import models as uc_models
+    try:
+        uc_models.get(cfg)
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "registry": uc_models.stats()}
+
+@app.post("/api/uc/models/evict")
+def api_uc_models_evict(cfg: Optional[Dict[str, Any]] = Body(None)):
+    from .uc_api import models as uc_models
+    return {"ok": True, "evicted": uc_models.evict(cfg), "registry": uc_models.stats()}
 
 @app.get("/health")
 def health():
+    """Liveness: отвечает сразу после старта, не дожидаясь прогрева."""
     return {"ok": True}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 после прогрева (или при UC_WARMUP=off), до этого — 503 с состоянием прогрева."""
+    is_ready = warmup.ready or WARMUP_MODE == "off"
+    body = {"ok": is_ready, "mode": WARMUP_MODE, "warmup": warmup.stats()}
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="127.0.0.1", port=8000, reload=False)
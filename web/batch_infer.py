@@ -0,0 +1,185 @@
+# =========================
+# Файл: web/batch_infer.py
+# =========================
+import csv
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+READ_CHUNK = 1 << 16
+SPOOL_MAX_MEMORY = 8 << 20
+# Одна строка входа (и одна CSV-запись с переводами строк в кавычках) — не длиннее, байт
+MAX_LINE_BYTES = 1 << 20
+LINE_TOO_LONG = f"Line exceeds {MAX_LINE_BYTES} bytes"
+
+
+async def aiter_fileobj(f: BinaryIO, close: bool = False) -> AsyncIterator[bytes]:
+    """Читаем файловый объект кусками в пуле потоков, не блокируя цикл событий."""
+    try:
+        while True:
+            chunk = await run_in_threadpool(f.read, READ_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        if close:
+            f.close()
+
+
+def aiter_file(path: Path) -> AsyncIterator[bytes]:
+    return aiter_fileobj(open(path, "rb"), close=True)
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], max_memory: int = SPOOL_MAX_MEMORY) -> BinaryIO:
+    """
+    Принимаем тело запроса целиком до начала ответа: StreamingResponse сам читает receive()
+    (ждет отключения клиента) и может «отобрать» куски тела. Сверх max_memory — на диск.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for chunk in chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes], max_line: int = MAX_LINE_BYTES) -> AsyncIterator[Optional[str]]:
+    """
+    Байтовый поток -> строки (с \\n). В памяти держится только незаконченная строка, не длиннее
+    max_line: более длинная пропускается до своего конца, а вместо нее отдается None.
+    """
+    parts: List[bytes] = []
+    size = 0
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                break
+            if skipping:
+                skipping = False
+            elif size + nl - start > max_line:
+                yield None
+            else:
+                parts.append(chunk[start:nl + 1])
+                yield b"".join(parts).decode("utf-8", errors="replace")
+            parts, size = [], 0
+            start = nl + 1
+        if start < len(chunk) and not skipping:
+            size += len(chunk) - start
+            if size > max_line:
+                # начало строки уже не нужно: остаток до перевода строки пропускаем
+                parts, size, skipping = [], 0, True
+                yield None
+            else:
+                parts.append(chunk[start:])
+    if parts:
+        yield b"".join(parts).decode("utf-8", errors="replace")
+
+
+async def aiter_records(lines: AsyncIterator[Optional[str]], fmt: str) -> AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Записи входа: (запись, None) или (None, ошибка) для битой строки.
+    CSV: первая строка — заголовок; строки копятся, пока кавычки не сбалансированы,
+    так что поля с переводами строк внутри кавычек разбираются корректно.
+    None из aiter_lines (строка длиннее MAX_LINE_BYTES) — запись с ошибкой.
+    """
+    if fmt == "jsonl":
+        async for line in lines:
+            if line is None:
+                yield None, LINE_TOO_LONG
+                continue
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                rec = json.loads(s)
+            except ValueError as e:
+                yield None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(rec, dict):
+                yield rec, None
+            else:
+                yield None, "Each JSONL line must be an object"
+        return
+
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    pending_size = 0
+    quotes = 0
+    skipping = False  # слишком длинная запись: ошибка уже отдана, ждем баланса кавычек
+    async for line in lines:
+        if line is None:
+            # кавычки пропущенной строки неизвестны — считаем, что запись на ней закончилась
+            pending, pending_size, quotes, skipping = [], 0, 0, False
+            yield None, LINE_TOO_LONG
+            continue
+        quotes = (quotes + line.count('"')) % 2
+        if skipping:
+            skipping = bool(quotes)
+            continue
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size > MAX_LINE_BYTES:
+            pending, pending_size, skipping = [], 0, bool(quotes)
+            yield None, LINE_TOO_LONG
+            continue
+        if quotes:
+            continue
+        text = "".join(pending)
+        pending, pending_size = [], 0
+        if not text.strip():
+            continue
+        row = next(csv.reader([text]))
+        if header is None:
+            header = row
+            continue
+        if len(row) != len(header):
+            yield None, f"Expected {len(header)} columns, got {len(row)}"
+            continue
+        yield dict(zip(header, row)), None
+    if "".join(pending).strip():
+        yield None, "Unterminated quoted field at end of input"
+
+
+async def stream_predictions(
+    records: AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]],
+    config: Dict[str, Any],
+    infer_batch: Callable[[Dict[str, Any], List[Dict[str, Any]]], List[Dict[str, Any]]],
+    chunk_size: int = 256,
+) -> AsyncIterator[str]:
+    """
+    NDJSON-ответ: {"type": "prediction", "index", "ok", ...} на каждую запись входа в исходном
+    порядке, в конце {"type": "summary", ...}. В памяти одновременно не больше chunk_size записей.
+    """
+    index = 0
+    count = 0
+    errors = 0
+    # (index, запись | None, ошибка разбора | None)
+    chunk: List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]] = []
+
+    async def flush() -> AsyncIterator[str]:
+        nonlocal count, errors
+        inputs = [rec for _, rec, err in chunk if err is None]
+        outs = iter(await run_in_threadpool(infer_batch, config, inputs) if inputs else [])
+        for i, _, err in chunk:
+            res = {"ok": False, "error": err} if err is not None else next(outs)
+            count += 1
+            if not res.get("ok"):
+                errors += 1
+            yield json.dumps({"type": "prediction", "index": i, **res}, ensure_ascii=False) + "\n"
+        chunk.clear()
+
+    async for rec, err in records:
+        chunk.append((index, rec, err))
+        index += 1
+        if len(chunk) >= chunk_size:
+            async for line in flush():
+                yield line
+    if chunk:
+        async for line in flush():
+            yield line
+    yield json.dumps({"type": "summary", "count": count, "errors": errors, "chunk_size": chunk_size}) + "\n"
@@ -0,0 +1,102 @@
+# =========================
+# Файл: web/batching.py
+# =========================
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .metrics import Histogram
+from .model_registry import model_key
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Динамический микро-батчинг. Запросы с одинаковым ключом модели копятся, пока не наберется
+    max_batch_size или не пройдет max_wait_ms с первого запроса в пачке; затем пачка уходит
+    в run_batch(config, inputs) одним вызовом (в пуле потоков), результаты раздаются вызывающим.
+    run_batch возвращает список результатов в порядке inputs.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Dict[str, Any], List[Dict[str, Any]]], List[Dict[str, Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # ключ -> (config, [(input, future, enqueued_at)], таймер)
+        self._pending: Dict[str, Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], asyncio.Future, float]], Optional[asyncio.TimerHandle]]] = {}
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches = 0
+        # цикл событий держит задачи только по слабым ссылкам — без этого набора пачку может собрать GC
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, config: Dict[str, Any], input_data: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        key = model_key(config)
+        fut = loop.create_future()
+        if key not in self._pending:
+            timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush, key)
+            self._pending[key] = (config, [], timer)
+        items = self._pending[key][1]
+        items.append((input_data, fut, time.perf_counter()))
+        if len(items) >= self.max_batch_size:
+            self._flush(key)
+        return await fut
+
+    def _flush(self, key: str) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        config, items, timer = pending
+        if timer is not None:
+            timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._run(config, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Inference batch failed", exc_info=task.exception())
+
+    async def _run(self, config: Dict[str, Any], items: List[Tuple[Dict[str, Any], asyncio.Future, float]]) -> None:
+        try:
+            now = time.perf_counter()
+            for _, _, enqueued in items:
+                self.queue_wait_ms.observe((now - enqueued) * 1000.0)
+            self.batch_sizes.observe(len(items))
+            self.batches += 1
+            inputs = [inp for inp, _, _ in items]
+            results = await asyncio.get_running_loop().run_in_executor(None, self.run_batch, config, inputs)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} inputs")
+        except BaseException as e:
+            # ожидающие запросы получают ошибку в любом случае, а сама ошибка (кроме отмены)
+            # остается исключением задачи — его записывает в лог _task_done
+            for _, fut, _ in items:
+                if not fut.done():
+                    fut.set_exception(e if isinstance(e, Exception) else RuntimeError("Batch cancelled"))
+            raise
+        for (_, fut, _), res in zip(items, results):
+            if not fut.done():
+                fut.set_result(res)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "in_flight": len(self._tasks),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
@@ -0,0 +1,267 @@
+# =========================
+# Файл: web/bench/bench_e2e.py
+# =========================
+"""
+Сквозной бенчмарк и нагрузочный тест: синтетический репозиторий заданного размера,
+scan_repo (без кеша и с ScanCache), module_call_map, detect_entrypoints, /api/run с быстрым
+stub __main__.py и /api/uc/infer под конкурентной нагрузкой через ASGI-клиент в том же процессе.
+Отчет — JSON: перцентили задержек, пропускная способность, пиковый RSS; --compare печатает
+изменения относительно отчета другого коммита.
+Запуск из корня репозитория:
+    python -m web.bench.bench_e2e --files 2000 --runs 50 --infer 2000 --concurrency 16 --out bench.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .bench_scan import make_tree
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Stub UC: печатает аргументы и сразу выходит — /api/run меряет накладные расходы сервиса, а не UC
+STUB_MAIN = 'import sys\nprint("stub", len(sys.argv) - 1)\n'
+
+
+def make_repo(root: Path, files: int, entrypoints: int) -> None:
+    """Синтетический репозиторий: пакеты с модулями (bench_scan), __main__.py и entrypoints в setup.cfg/pyproject.toml."""
+    make_tree(root, files)
+    (root / "__main__.py").write_text(STUB_MAIN, encoding="utf-8")
+    scripts = [(f"uc-tool{i}", f"pkg{i // 100}.mod{i}:main") for i in range(min(entrypoints, files))]
+    cfg = "[entry_points]\nconsole_scripts =\n" + "".join(f"    {name} = {target}\n" for name, target in scripts)
+    (root / "setup.cfg").write_text(cfg, encoding="utf-8")
+    toml = "[project]\nname = \"uc-bench\"\n\n[project.scripts]\n" + "".join(f'"{name}" = "{target}"\n' for name, target in scripts)
+    (root / "pyproject.toml").write_text(toml, encoding="utf-8")
+
+
+def percentiles(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    values = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    if resource is None:
+        return {"self": None, "children": None}
+    # Linux отдает ru_maxrss в КБ
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return percentiles(samples)
+
+
+def bench_static(repo: Path, cache_dir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    """Функции сканера напрямую, без HTTP."""
+    from ..scanner import scan_repo, module_call_map, detect_entrypoints
+    from ..scan_cache import ScanCache
+
+    res: Dict[str, Any] = {}
+    res["scan_repo_cold"] = timed(lambda: scan_repo(repo, workers=args.workers, max_files=args.files), args.repeat)
+    cache = ScanCache(cache_dir / "scan-bench.json", repo)
+    scan = scan_repo(repo, cache=cache, workers=args.workers, max_files=args.files)
+    res["scan_repo_cached"] = timed(lambda: scan_repo(repo, cache=cache, workers=args.workers, max_files=args.files), args.repeat)
+    res["scan_repo_cached"]["modules"] = len(scan["modules"])
+
+    selected = sorted(scan["modules"])[: args.call_map_modules]
+    res["module_call_map"] = timed(lambda: module_call_map(repo, selected, cache=cache), args.repeat)
+    res["module_call_map"]["modules"] = len(selected)
+    res["detect_entrypoints"] = timed(lambda: detect_entrypoints(repo), args.repeat)
+    res["detect_entrypoints"]["groups"] = len(detect_entrypoints(repo))
+    return res
+
+
+async def load(total: int, concurrency: int, request: Callable[[int], Awaitable[bool]]) -> Dict[str, Any]:
+    """total запросов не больше concurrency одновременно; request(i) -> успех."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                ok = await request(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - t0)
+            errors += 0 if ok else 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - t0
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "latency": percentiles(latencies),
+    }
+
+
+async def bench_http(args: argparse.Namespace) -> Dict[str, Any]:
+    """/api/run и /api/uc/infer через httpx.ASGITransport — тот же процесс, без сети, с lifespan приложения."""
+    import httpx
+    from .. import app as web_app
+
+    app = web_app.app
+    res: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            submit: List[float] = []
+
+            async def run(i: int) -> bool:
+                t0 = time.perf_counter()
+                r = await client.post("/api/run", json={"args": ["--n", str(i)]})
+                submit.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    return False
+                job_id = r.json()["job_id"]
+                while True:
+                    job = (await client.get(f"/api/jobs/{job_id}")).json()["job"]
+                    if job["status"] not in ("queued", "running"):
+                        return job["status"] == "done" and job["returncode"] == 0
+                    await asyncio.sleep(args.poll_ms / 1000)
+
+            res["api_run"] = await load(args.runs, args.concurrency, run)
+            res["api_run"]["submit"] = percentiles(submit)
+            res["api_run"]["max_running_jobs"] = web_app.jobs.max_concurrent
+
+            cfg = {"model": {"name": "UCModel", "hidden_size": 256}, "runtime": {"device": "cpu"}}
+
+            async def infer(i: int) -> bool:
+                r = await client.post("/api/uc/infer", json={"cfg": cfg, "input_data": {"text": f"sample {i}"}})
+                return r.status_code == 200 and bool(r.json().get("ok"))
+
+            await infer(-1)  # загрузка модели в реестр — не часть замера
+            res["api_uc_infer"] = await load(args.infer, args.concurrency, infer)
+            from ..uc_api import batcher
+            res["api_uc_infer"]["max_batch_size"] = batcher.max_batch_size
+    return res
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Отношение новых значений к базовым: p50/p99 (меньше — лучше) и throughput (больше — лучше)."""
+    diff: Dict[str, Any] = {"baseline_commit": baseline.get("commit")}
+    for name, stage in report["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        lat, base_lat = stage.get("latency", stage), base.get("latency", base)
+        row = {}
+        for key in ("p50_ms", "p99_ms"):
+            if lat.get(key) and base_lat.get(key):
+                row[key] = round(lat[key] / base_lat[key], 3)
+        if stage.get("throughput_rps") and base.get("throughput_rps"):
+            row["throughput"] = round(stage["throughput_rps"] / base["throughput_rps"], 3)
+        diff[name] = row
+    return diff
+
+
+def main() -> Dict[str, Any]:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=2000, help="модулей в синтетическом репозитории")
+    ap.add_argument("--entrypoints", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=0, help="процессы scan_repo (0 — последовательно)")
+    ap.add_argument("--repeat", type=int, default=5, help="повторов для функций сканера")
+    ap.add_argument("--call-map-modules", type=int, default=20)
+    ap.add_argument("--runs", type=int, default=50, help="запусков /api/run")
+    ap.add_argument("--run-slots", type=int, default=4, help="UC_MAX_RUNNING_JOBS")
+    ap.add_argument("--infer", type=int, default=2000, help="запросов /api/uc/infer")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--poll-ms", type=float, default=10)
+    ap.add_argument("--skip", default="", help="через запятую: static, http")
+    ap.add_argument("--out", help="сохранить отчет в файл")
+    ap.add_argument("--compare", help="отчет другого коммита для сравнения")
+    args = ap.parse_args()
+    skip = {s.strip() for s in args.skip.split(",") if s.strip()}
+
+    with tempfile.TemporaryDirectory(prefix="uc-bench-") as tmp:
+        data_dir = Path(tmp)
+        repo = data_dir / "repos" / "UC"
+        repo.mkdir(parents=True)
+        t0 = time.perf_counter()
+        make_repo(repo, args.files, args.entrypoints)
+        generate_s = time.perf_counter() - t0
+
+        # web.app читает окружение при импорте: все данные — во временном каталоге
+        os.environ.update({
+            "UC_DATA_DIR": str(data_dir),
+            "UC_WARMUP": "off",
+            "UC_MAX_RUNNING_JOBS": str(args.run_slots),
+            "UC_MAX_QUEUED_JOBS": str(max(32, args.runs)),
+            "UC_SPILL_LOGS": "0",
+            "PYTHON": sys.executable,
+        })
+        stages: Dict[str, Any] = {}
+        rss: Dict[str, Any] = {}
+        if "static" not in skip:
+            stages.update(bench_static(repo, data_dir / "cache", args))
+            rss["after_static"] = peak_rss_mb()
+        if "http" not in skip:
+            stages.update(asyncio.run(bench_http(args)))
+            rss["after_http"] = peak_rss_mb()
+
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "generate_s": round(generate_s, 3),
+        "stages": stages,
+        "peak_rss_mb": {**rss, "final": peak_rss_mb()},
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["compare"] = compare(report, json.load(f))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# =========================
+# Файл: web/bench/bench_parse.py
+# =========================
+"""
+Микро-бенчмарк извлечения определений: прежний ast.walk + isinstance против
+DefinitionVisitor на крупных модулях стандартной библиотеки.
+Запуск из корня репозитория:
+    python -m web.bench.bench_parse --repeat 20
+"""
+import ast
+import json
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ..scanner import extract_definitions, safe_eval_node_name
+
+DEFAULT_MODULES = [
+    "typing", "argparse", "inspect", "pydoc", "tkinter", "_pydecimal",
+    "email._header_value_parser", "unittest.mock", "asyncio.base_events", "dataclasses",
+]
+
+
+def legacy_extract(tree: ast.AST) -> Dict[str, Any]:
+    """Исходная реализация parse_definitions (до DefinitionVisitor) — эталон для сравнения."""
+    classes: List[str] = []
+    functions: List[str] = []
+    imports: List[str] = []
+    uses_argparse = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            classes.append(node.name)
+        if isinstance(node, ast.FunctionDef):
+            functions.append(node.name)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if isinstance(node, ast.Import):
+                for a in node.names:
+                    imports.append(a.name)
+            else:
+                module = node.module or ""
+                imports.append(module.split(".")[0])
+        if isinstance(node, ast.Call):
+            callee = safe_eval_node_name(node.func)
+            if callee in ("argparse.ArgumentParser", "ArgumentParser"):
+                uses_argparse = True
+    return {"classes": classes, "functions": functions, "imports": imports, "uses_argparse": uses_argparse}
+
+
+def module_path(name: str) -> Path:
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin:
+        raise SystemExit(f"module not found: {name}")
+    return Path(spec.origin)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> Dict[str, Any]:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--modules", nargs="*", default=DEFAULT_MODULES)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    trees = []
+    total_lines = 0
+    for name in args.modules:
+        path = module_path(name)
+        content = path.read_text(encoding="utf-8")
+        total_lines += content.count("\n")
+        tree = ast.parse(content, filename=str(path))
+        old, new = legacy_extract(tree), extract_definitions(tree)
+        for key in ("classes", "functions", "imports"):
+            assert sorted(old[key]) == sorted(new[key]), f"{name}: {key} mismatch"
+        assert old["uses_argparse"] == new["uses_argparse"], f"{name}: uses_argparse mismatch"
+        trees.append(tree)
+
+    t_legacy = best_of(lambda: [legacy_extract(t) for t in trees], args.repeat)
+    t_visitor = best_of(lambda: [extract_definitions(t) for t in trees], args.repeat)
+    report = {
+        "modules": len(trees),
+        "lines": total_lines,
+        "legacy_walk_ms": round(t_legacy * 1000, 2),
+        "visitor_ms": round(t_visitor * 1000, 2),
+        "speedup": round(t_legacy / t_visitor, 2) if t_visitor else None,
+        "visitor_klines_per_s": round(total_lines / t_visitor / 1000, 1) if t_visitor else None,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
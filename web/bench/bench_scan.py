@@ -0,0 +1,102 @@
+# =========================
+# Файл: web/bench/bench_scan.py
+# =========================
+"""
+Сравнение последовательного и параллельного scan_repo на синтетическом дереве.
+Запуск из корня репозитория:
+    python -m web.bench.bench_scan --files 5000 --workers 4 --chunksize 64
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from ..scanner import scan_repo
+
+MODULE_TEMPLATE = '''import os
+import sys
+import argparse
+from collections import OrderedDict
+
+
+class Model{i}:
+    """Синтетический модуль #{i}."""
+
+    def __init__(self, hidden_size: int = 256):
+        self.hidden_size = hidden_size
+
+    def forward(self, x):
+        return [v * self.hidden_size for v in x]
+
+
+def helper_{i}(a, b):
+    return OrderedDict(a=a, b=b)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epochs", type=int, default={i})
+    args = parser.parse_args()
+    print(Model{i}().forward([args.epochs]))
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+def make_tree(root: Path, files: int, per_dir: int = 100) -> None:
+    for i in range(files):
+        d = root / f"pkg{i // per_dir}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"mod{i}.py").write_text(MODULE_TEMPLATE.format(i=i), encoding="utf-8")
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> Dict[str, Any]:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--chunksize", type=int, default=64)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root, args.files)
+        serial = scan_repo(root, max_files=args.files)
+        parallel = scan_repo(root, workers=args.workers, chunksize=args.chunksize, max_files=args.files)
+        assert list(serial["modules"].items()) == list(parallel["modules"].items()), "parallel output differs from serial"
+
+        t_serial = timed(lambda: scan_repo(root, max_files=args.files), args.repeat)
+        t_parallel = timed(
+            lambda: scan_repo(root, workers=args.workers, chunksize=args.chunksize, max_files=args.files),
+            args.repeat,
+        )
+
+    report = {
+        "files": args.files,
+        "workers": args.workers,
+        "chunksize": args.chunksize,
+        "cpu_count": os.cpu_count(),
+        "serial_s": round(t_serial, 4),
+        "parallel_s": round(t_parallel, 4),
+        "speedup": round(t_serial / t_parallel, 2) if t_parallel else None,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# =========================
+# Файл: web/bench/bench_startup.py
+# =========================
+"""
+Время старта web.app в новом интерпретаторе: импорт приложения, первый ответ /health
+и готовность /ready для каждого режима прогрева UC_WARMUP (background, eager, off).
+Запуск из корня репозитория:
+    python -m web.bench.bench_startup --repeat 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Выполняется в дочернем процессе: lifespan и запросы идут через TestClient без сети
+CHILD = r'''
+import sys, json, time
+t0 = time.perf_counter()
+import web.app as m
+t_import = time.perf_counter() - t0
+from fastapi.testclient import TestClient
+with TestClient(m.app) as c:
+    assert c.get("/health").status_code == 200
+    t_health = time.perf_counter() - t0
+    while c.get("/ready").status_code != 200:
+        time.sleep(0.002)
+    t_ready = time.perf_counter() - t0
+heavy = [n for n in ("numpy", "jinja2", "yaml", "web.scanner", "web.uc_api") if n in sys.modules]
+print(json.dumps({"import_s": t_import, "health_s": t_health, "ready_s": t_ready, "heavy": heavy}))
+'''
+
+HEAVY_AT_IMPORT = r'''
+import sys, json
+import web.app
+print(json.dumps([n for n in ("numpy", "jinja2", "yaml", "web.scanner", "web.uc_api") if n in sys.modules]))
+'''
+
+
+def run_child(code: str, env_add: Dict[str, str]) -> Any:
+    env = {**os.environ, **env_add}
+    proc = subprocess.run([sys.executable, "-c", code], cwd=str(ROOT), env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    values = [s[key] for s in samples]
+    return {"median_ms": round(statistics.median(values) * 1000, 1), "min_ms": round(min(values) * 1000, 1)}
+
+
+def main() -> Dict[str, Any]:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--modes", default="background,eager,off")
+    args = ap.parse_args()
+
+    report: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "loaded_at_import": run_child(HEAVY_AT_IMPORT, {}),
+        "modes": {},
+    }
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        samples = [run_child(CHILD, {"UC_WARMUP": mode}) for _ in range(args.repeat)]
+        report["modes"][mode] = {
+            "import": summarize(samples, "import_s"),
+            "health": summarize(samples, "health_s"),
+            "ready": summarize(samples, "ready_s"),
+            "loaded_when_ready": samples[-1]["heavy"],
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
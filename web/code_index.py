@@ -0,0 +1,620 @@
+# =========================
+# Файл: web/code_index.py
+# =========================
+import ast
+import time
+import hashlib
+import builtins
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .scan_cache import ScanCache, file_digest
+from .scanner import iter_python_files, _LEAF_NODES
+from .help_cache import module_name
+
+# Поднимайте при изменении формата записи index_source — имя файла индекса изменится
+CODE_INDEX_VERSION = 1
+_BUILTINS = frozenset(dir(builtins))
+
+
+def package_of(module: str, is_package: bool) -> str:
+    return module if is_package else module.rpartition(".")[0]
+
+
+def resolve_relative(package: str, level: int, name: Optional[str]) -> str:
+    """from ..x import y в модуле пакета a.b.c -> a.x (level=2, name="x")."""
+    parts = package.split(".") if package else []
+    if level > 1:
+        parts = parts[: max(0, len(parts) - (level - 1))]
+    if name:
+        parts.append(name)
+    return ".".join(parts)
+
+
+def name_prefixes(name: str) -> List[str]:
+    """"a.b.c" -> ["a", "a.b", "a.b.c"]."""
+    parts = name.split(".")
+    return [".".join(parts[: i + 1]) for i in range(len(parts))]
+
+
+def dotted(node: ast.AST) -> Optional[str]:
+    """a.b.c для цепочки Name/Attribute, иначе None (вызовы на результатах вызовов, индексах и т.п.)."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+class IndexVisitor(ast.NodeVisitor):
+    """
+    Символы, импорты и места вызовов одного модуля. Имена в вызовах разрешаются по импортам
+    и определениям этого же файла; межмодульные ссылки (реэкспорт через __init__) —
+    уже в CodeIndex при запросе.
+    """
+
+    def __init__(self, module: str, is_package: bool):
+        self.module = module
+        self.package = package_of(module, is_package)
+        self.defs: List[List[Any]] = []       # [qualname, kind, line]
+        self.imports: List[str] = []          # абсолютные имена модулей (или модуль.имя для from-импортов)
+        self.bindings: Dict[str, str] = {}    # локальное имя -> полное имя
+        self.raw_calls: List[Tuple[str, Optional[str], str, int]] = []  # (вызывающий, класс, выражение, строка)
+        self._stack: List[str] = []
+        self._classes: List[Optional[str]] = [None]
+        self._dispatch = {
+            ast.ClassDef: self.visit_ClassDef,
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.AsyncFunctionDef: self.visit_FunctionDef,
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom,
+            ast.Call: self.visit_Call,
+        }
+
+    def visit(self, node: ast.AST) -> None:
+        handler = self._dispatch.get(type(node))
+        if handler is not None:
+            handler(node)
+        else:
+            self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, _LEAF_NODES):
+                        self.visit(item)
+            elif isinstance(value, ast.AST) and not isinstance(value, _LEAF_NODES):
+                self.visit(value)
+
+    def _qual(self, name: str) -> str:
+        return ".".join([self.module] + self._stack + [name])
+
+    def _caller(self) -> str:
+        return ".".join([self.module] + self._stack)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.defs.append([self._qual(node.name), "class", node.lineno])
+        for base in node.bases + node.decorator_list:
+            self.visit(base)
+        self._stack.append(node.name)
+        self._classes.append(".".join(self._stack))
+        for stmt in node.body:
+            self.visit(stmt)
+        self._classes.pop()
+        self._stack.pop()
+
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        kind = "method" if self._classes[-1] is not None and self._classes[-1] == ".".join(self._stack) else "function"
+        self.defs.append([self._qual(node.name), kind, node.lineno])
+        for d in node.decorator_list:
+            self.visit(d)
+        self.visit(node.args)
+        self._stack.append(node.name)
+        # внутри метода self.x() относится к классу метода, а не к вложенной функции
+        self._classes.append(self._classes[-1] if kind == "method" else None)
+        for stmt in node.body:
+            self.visit(stmt)
+        self._classes.pop()
+        self._stack.pop()
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for a in node.names:
+            self.imports.append(a.name)
+            if a.asname:
+                self.bindings[a.asname] = a.name
+            else:
+                top = a.name.split(".")[0]
+                self.bindings[top] = top
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        base = resolve_relative(self.package, node.level, node.module) if node.level else (node.module or "")
+        for a in node.names:
+            if a.name == "*":
+                self.imports.append(base)
+                continue
+            target = f"{base}.{a.name}" if base else a.name
+            self.imports.append(target)
+            self.bindings[a.asname or a.name] = target
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        expr = dotted(func)
+        if expr is None and isinstance(func, ast.Attribute) and isinstance(func.value, ast.Call):
+            # Model(cfg).fit() — считаем вызовом метода класса Model
+            inner = dotted(func.value.func)
+            if inner is not None:
+                expr = f"{inner}.{func.attr}"
+        if expr is not None:
+            self.raw_calls.append((self._caller(), self._classes[-1], expr, node.lineno))
+        self.generic_visit(node)
+
+    def resolve(self, expr: str, cls: Optional[str], local: Set[str]) -> Optional[str]:
+        head, _, rest = expr.partition(".")
+        if head in ("self", "cls") and cls is not None and rest:
+            return f"{self.module}.{cls}.{rest}"
+        if head in self.bindings:
+            target = self.bindings[head]
+        elif head in local:
+            target = f"{self.module}.{head}"
+        else:
+            return None
+        return f"{target}.{rest}" if rest else target
+
+    def result(self) -> Dict[str, Any]:
+        # имена верхнего уровня модуля — для разрешения вызовов до их определения в файле
+        local = {q.rsplit(".", 1)[1] for q, _, _ in self.defs if q.count(".") == self.module.count(".") + 1}
+        calls = []
+        for caller, cls, expr, line in self.raw_calls:
+            name = expr.rsplit(".", 1)[-1]
+            target = self.resolve(expr, cls, local)
+            if target is None and "." not in expr and name in _BUILTINS:
+                continue  # print(), len() и т.п. в граф не попадают
+            calls.append([caller, target or "", name, line])
+        return {
+            "module": self.module,
+            "defs": self.defs,
+            "imports": sorted(set(self.imports)),
+            "bindings": self.bindings,
+            "calls": calls,
+        }
+
+
+def index_source(content: str, module: str, is_package: bool) -> Dict[str, Any]:
+    visitor = IndexVisitor(module, is_package)
+    visitor.visit(ast.parse(content))
+    return visitor.result()
+
+
+def index_file_job(job: Tuple[str, str, bool, Optional[str]]) -> Dict[str, Any]:
+    """Задача для пула процессов: (путь, модуль, пакет ли, содержимое или None)."""
+    fname, module, is_package, content = job
+    try:
+        if content is None:
+            with open(fname, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+        return index_source(content, module, is_package)
+    except Exception as e:
+        return {"module": module, "defs": [], "imports": [], "bindings": {}, "calls": [], "error": str(e)}
+
+
+class CodeIndex:
+    """
+    Персистентный индекс символов, импортов и вызовов репозитория.
+    Записи по файлам хранятся в ScanCache (stat -> sha1 -> повторный разбор только изменившихся),
+    производные структуры для запросов (определения, граф импортов, вызывающие по имени)
+    обновляются только для изменившихся файлов. Запросы — словари и обход в ширину, без чтения файлов.
+    """
+
+    def __init__(self, store: ScanCache, repo_root: Path, max_files: int = 100000):
+        self.store = store
+        self.repo_root = Path(repo_root)
+        self.max_files = max_files
+        self.lock = threading.RLock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.modules: Dict[str, str] = {}                          # модуль -> rel
+        self.defs: Dict[str, Tuple[str, str, int]] = {}            # qualname -> (rel, kind, line)
+        self.calls_out: Dict[str, List[Tuple[str, str, int]]] = {}  # caller -> [(target, name, line)]
+        self.callers_by_name: Dict[str, Dict[str, List[Tuple[str, str, int]]]] = {}  # name -> rel -> [(caller, target, line)]
+        self.updated_at: Optional[float] = None
+        self.last_update: Dict[str, Any] = {}
+        # префикс имени импорта -> модули с таким импортом: чьи ребра меняются, когда появляется
+        # или исчезает модуль с этим именем (resolve_module берет самый длинный префикс-модуль)
+        self.importers_by_prefix: Dict[str, Set[str]] = {}
+        # граф импортов между модулями репозитория (прямой и обратный)
+        self._graph: Optional[Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]] = None
+        # канонический вызываемый -> [(caller, target, rel, line)] — для запросов по полному имени
+        self._callers: Optional[Dict[str, List[Tuple[str, str, str, int]]]] = None
+        self._callers_keys: Dict[str, Set[str]] = {}   # rel -> канонические имена его вызовов
+        self._callers_hops: Dict[str, Set[str]] = {}   # rel -> префиксы имен, прочитанных canonical()
+        self._hop_rels: Dict[str, Set[str]] = {}       # префикс -> файлы, чьи вызовы от него зависят
+        # изменившиеся с последней синхронизации модули и файлы: граф и индекс вызывающих
+        # пересчитываются только для них и их зависимых
+        self._dirty_modules: Set[str] = set()
+        self._dirty_rels: Set[str] = set()
+
+    # ---- обновление ----
+
+    def update(self, workers: int = 0, chunksize: int = 256) -> Dict[str, Any]:
+        """Проход по дереву: неизменные файлы — по stat, изменившиеся — разбираются заново (в пуле при workers > 1)."""
+        t0 = time.perf_counter()
+        with self.lock:
+            verify = self.store.begin_scan()
+            seen: Dict[str, Dict[str, Any]] = {}
+            pending: List[Tuple[str, Any, str, Tuple[str, str, bool, Optional[str]]]] = []
+            for p in iter_python_files(self.repo_root, max_files=self.max_files):
+                rel = str(p.relative_to(self.repo_root))
+                try:
+                    st = p.stat()
+                    record = self.store.lookup(rel, st, verify)
+                    if record is None:
+                        with open(p, "rb") as f:
+                            raw = f.read()
+                        digest = file_digest(raw)
+                        record = self.store.lookup_digest(rel, st, digest)
+                        if record is None:
+                            job = (str(p), module_name(rel), p.name == "__init__.py", raw.decode("utf-8", errors="ignore"))
+                            pending.append((rel, st, digest, job))
+                            continue
+                except OSError:
+                    continue
+                seen[rel] = record
+
+            jobs = [job for _, _, _, job in pending]
+            if workers > 1 and len(jobs) > chunksize:
+                with ProcessPoolExecutor(max_workers=workers) as ex:
+                    results = list(ex.map(index_file_job, jobs, chunksize=chunksize))
+            else:
+                results = [index_file_job(job) for job in jobs]
+            for (rel, st, digest, _), record in zip(pending, results):
+                self.store.store(rel, st, digest, record)
+                seen[rel] = record
+
+            removed = [rel for rel in self.files if rel not in seen]
+            for rel in removed:
+                self._remove(rel)
+            changed = 0
+            for rel, record in seen.items():
+                if self.files.get(rel) is not record:
+                    self._remove(rel)
+                    self._add(rel, record)
+                    changed += 1
+            self.store.end_scan(set(seen), verify)
+            # производные структуры обновляем сразу, чтобы первый запрос не платил за них
+            self._sync()
+            self.updated_at = time.time()
+            self.last_update = {
+                "files": len(seen),
+                "parsed": len(pending),
+                "changed": changed,
+                "removed": len(removed),
+                "seconds": round(time.perf_counter() - t0, 4),
+            }
+            return dict(self.last_update)
+
+    def ensure(self) -> None:
+        """Перед запросом: проход по stat подхватывает правки на диске, разбираются только изменившиеся файлы."""
+        self.update()
+
+    def _add(self, rel: str, record: Dict[str, Any]) -> None:
+        self._dirty_modules.add(record["module"])
+        self._dirty_rels.add(rel)
+        self.files[rel] = record
+        self.modules[record["module"]] = rel
+        for name in record["imports"]:
+            for p in name_prefixes(name):
+                self.importers_by_prefix.setdefault(p, set()).add(record["module"])
+        for qual, kind, line in record["defs"]:
+            self.defs[qual] = (rel, kind, line)
+        for caller, target, name, line in record["calls"]:
+            self.calls_out.setdefault(caller, []).append((target, name, line))
+            self.callers_by_name.setdefault(name, {}).setdefault(rel, []).append((caller, target, line))
+
+    def _remove(self, rel: str) -> None:
+        record = self.files.pop(rel, None)
+        if record is None:
+            return
+        self._dirty_modules.add(record["module"])
+        self._dirty_rels.add(rel)
+        if self.modules.get(record["module"]) == rel:
+            del self.modules[record["module"]]
+        for name in record["imports"]:
+            for p in name_prefixes(name):
+                importers = self.importers_by_prefix.get(p)
+                if importers is not None:
+                    importers.discard(record["module"])
+                    if not importers:
+                        del self.importers_by_prefix[p]
+        for qual, _, _ in record["defs"]:
+            if self.defs.get(qual, ("",))[0] == rel:
+                del self.defs[qual]
+        for caller, _, name, _ in record["calls"]:
+            self.calls_out.pop(caller, None)
+            by_rel = self.callers_by_name.get(name)
+            if by_rel is not None:
+                by_rel.pop(rel, None)
+                if not by_rel:
+                    del self.callers_by_name[name]
+
+    # ---- разрешение имен ----
+
+    def resolve_module(self, name: str) -> Optional[str]:
+        """Самый длинный префикс name, являющийся модулем репозитория (a.b.func -> a.b)."""
+        while name:
+            if name in self.modules:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def canonical(self, target: str, hops: int = 5, seen: Optional[List[str]] = None) -> str:
+        """
+        Раскрываем реэкспорт: pkg.train -> pkg.core.train, если pkg/__init__ делает from .core import train.
+        seen — сюда добавляются все промежуточные имена: результат зависит только от модулей-префиксов этих имен.
+        """
+        for _ in range(hops):
+            if seen is not None:
+                seen.append(target)
+            if not target or target in self.defs or target in self.modules:
+                return target
+            module = self.resolve_module(target)
+            if module is None:
+                return target
+            rest = target[len(module) + 1:]
+            head, _, tail = rest.partition(".")
+            binding = self.files[self.modules[module]]["bindings"].get(head)
+            if binding is None:
+                return target
+            target = f"{binding}.{tail}" if tail else binding
+        return target
+
+    def import_graph(self) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+        self._sync()
+        return self._graph
+
+    def callers_index(self) -> Dict[str, List[Tuple[str, str, str, int]]]:
+        self._sync()
+        return self._callers
+
+    def _sync(self) -> None:
+        """Первый раз граф и индекс вызывающих строятся целиком, дальше — только для изменившихся модулей."""
+        if self._graph is None or self._callers is None:
+            self._graph = ({}, {})
+            for module in self.modules:
+                self._link(module)
+            self._callers, self._callers_keys, self._callers_hops, self._hop_rels = {}, {}, {}, {}
+            for rel in self.files:
+                self._index_calls(rel)
+        elif self._dirty_modules or self._dirty_rels:
+            # ребра модуля зависят от того, какие префиксы его импортов — модули репозитория
+            relink = set(self._dirty_modules)
+            for module in self._dirty_modules:
+                relink |= self.importers_by_prefix.get(module, set())
+            for module in relink:
+                self._unlink(module)
+                if module in self.modules:
+                    self._link(module)
+            # канонические имена вызовов зависят от модулей-префиксов имен, пройденных canonical()
+            reindex = set(self._dirty_rels)
+            for module in self._dirty_modules:
+                reindex |= self._hop_rels.get(module, set())
+            for rel in reindex:
+                self._unindex_calls(rel)
+                if rel in self.files:
+                    self._index_calls(rel)
+        self._dirty_modules.clear()
+        self._dirty_rels.clear()
+
+    def _link(self, module: str) -> None:
+        forward, reverse = self._graph
+        deps = forward[module] = set()
+        for name in self.files[self.modules[module]]["imports"]:
+            m = self.resolve_module(name)
+            if m is not None and m != module:
+                deps.add(m)
+                reverse.setdefault(m, set()).add(module)
+
+    def _unlink(self, module: str) -> None:
+        forward, reverse = self._graph
+        for dep in forward.pop(module, ()):
+            importers = reverse.get(dep)
+            if importers is not None:
+                importers.discard(module)
+                if not importers:
+                    del reverse[dep]
+
+    def _index_calls(self, rel: str) -> None:
+        keys: Set[str] = set()
+        seen: List[str] = []
+        memo: Dict[str, str] = {}
+        for caller, target, _, line in self.files[rel]["calls"]:
+            if not target:
+                continue
+            canon = memo.get(target)
+            if canon is None:
+                canon = memo[target] = self.canonical(target, seen=seen)
+            self._callers.setdefault(canon, []).append((caller, target, rel, line))
+            keys.add(canon)
+        hops = {p for name in seen if name for p in name_prefixes(name)}
+        self._callers_keys[rel] = keys
+        self._callers_hops[rel] = hops
+        for p in hops:
+            self._hop_rels.setdefault(p, set()).add(rel)
+
+    def _unindex_calls(self, rel: str) -> None:
+        for canon in self._callers_keys.pop(rel, ()):
+            rows = [row for row in self._callers.get(canon, ()) if row[2] != rel]
+            if rows:
+                self._callers[canon] = rows
+            else:
+                self._callers.pop(canon, None)
+        for p in self._callers_hops.pop(rel, ()):
+            rels = self._hop_rels.get(p)
+            if rels is not None:
+                rels.discard(rel)
+                if not rels:
+                    del self._hop_rels[p]
+
+    def imports_of(self, module: str) -> Set[str]:
+        return self.import_graph()[0].get(module, set())
+
+    def importers_of(self, module: str) -> Set[str]:
+        return self.import_graph()[1].get(module, set())
+
+    # ---- запросы ----
+
+    def callers(self, symbol: str, depth: int = 1, include_unresolved: bool = False, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Кто вызывает symbol (полное имя pkg.mod.func или просто имя). depth > 1 — вызывающие
+        вызывающих. include_unresolved — добавить вызовы obj.name(), тип obj которых неизвестен.
+        """
+        with self.lock:
+            self.ensure()
+            frontier = [symbol]
+            seen = {symbol}
+            sites: List[Dict[str, Any]] = []
+            for level in range(1, max(1, depth) + 1):
+                nxt = []
+                for sym in frontier:
+                    rows: List[Tuple[str, str, str, int, bool]] = []
+                    name = sym.rsplit(".", 1)[-1]
+                    if "." in sym:
+                        rows.extend((c, t, r, ln, True) for c, t, r, ln in self.callers_index().get(self.canonical(sym), ()))
+                    else:
+                        # просто имя — все разрешенные вызовы с таким последним звеном
+                        for rel, by_rel in self.callers_by_name.get(name, {}).items():
+                            rows.extend((c, t, rel, ln, True) for c, t, ln in by_rel if t)
+                    if include_unresolved:
+                        for rel, by_rel in self.callers_by_name.get(name, {}).items():
+                            rows.extend((c, f"?.{name}", rel, ln, False) for c, t, ln in by_rel if not t)
+                    for caller, target, rel, line, resolved in rows:
+                        sites.append({"caller": caller, "target": target, "file": rel, "line": line, "depth": level, "resolved": resolved})
+                        if caller not in seen:
+                            seen.add(caller)
+                            nxt.append(caller)
+                        if len(sites) >= limit:
+                            return {"symbol": symbol, "callers": sites, "truncated": True}
+                frontier = nxt
+                if not frontier:
+                    break
+            return {"symbol": symbol, "callers": sites, "truncated": False}
+
+    def imports(self, module: str, transitive: bool = True, reverse: bool = False) -> Dict[str, Any]:
+        """Модули репозитория, которые импортирует module (reverse=True — которые импортируют его)."""
+        with self.lock:
+            self.ensure()
+            if module not in self.modules:
+                return {"module": module, "found": False, "modules": []}
+            order = self._bfs([module], self.importers_of if reverse else self.imports_of, transitive)
+            return {"module": module, "found": True, "modules": order}
+
+    def reachability(self, entry: str) -> Dict[str, Any]:
+        """
+        Что достижимо из entrypoint ("name = pkg.mod:func", "pkg.mod:func" или модуль):
+        модули — по транзитивным импортам, функции — по графу вызовов от func (или кода модуля).
+        """
+        with self.lock:
+            self.ensure()
+            spec = entry.split("=", 1)[1].strip() if "=" in entry else entry.strip()
+            module, _, func = spec.partition(":")
+            module = module.strip()
+            if module not in self.modules:
+                return {"entry": entry, "found": False}
+            start = f"{module}.{func.strip()}" if func else module
+            modules = self._bfs([module], self.imports_of, True)
+            functions = [f for f in self._bfs([start], self._callees, True) if f in self.defs]
+            return {
+                "entry": entry,
+                "found": True,
+                "start": start,
+                "modules": modules,
+                "functions": functions,
+                "unreachable_modules": len(self.modules) - len(modules),
+            }
+
+    def _callees(self, caller: str) -> Set[str]:
+        out = set()
+        for target, _, _ in self.calls_out.get(caller, ()):
+            if not target:
+                continue
+            t = self.canonical(target)
+            if t in self.defs:
+                out.add(t)
+                if self.defs[t][1] == "class" and f"{t}.__init__" in self.defs:
+                    out.add(f"{t}.__init__")
+        return out
+
+    @staticmethod
+    def _bfs(start: Iterable[str], edges: Any, transitive: bool) -> List[str]:
+        order: List[str] = []
+        seen = set(start)
+        queue: Deque[str] = deque(start)
+        while queue:
+            node = queue.popleft()
+            for nxt in sorted(edges(node)):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    order.append(nxt)
+                    if transitive:
+                        queue.append(nxt)
+        return order
+
+    def module_graph(self, module: str) -> Dict[str, Any]:
+        """Связи одного модуля для /api/module-map: импорты, импортирующие, исходящие и входящие вызовы."""
+        with self.lock:
+            self.ensure()
+            rel = self.modules.get(module)
+            if rel is None:
+                return {}
+            prefix = module + "."
+            targets = {self.canonical(t) for _, t, _, _ in self.files[rel]["calls"] if t}
+            calls_out = sorted(t for t in targets if t in self.defs and not t.startswith(prefix))
+            index = self.callers_index()
+            called_by = sorted({
+                caller
+                for qual, _, _ in self.files[rel]["defs"]
+                for caller, _, r, _ in index.get(qual, ()) if r != rel
+            })
+            return {
+                "module": module,
+                "imports": sorted(self.imports_of(module)),
+                "imported_by": sorted(self.importers_of(module)),
+                "calls": calls_out,
+                "called_by": called_by,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "files": len(self.files),
+                "modules": len(self.modules),
+                "definitions": len(self.defs),
+                "call_sites": sum(len(v) for v in self.calls_out.values()),
+                "updated_at": self.updated_at,
+                "last_update": self.last_update,
+                "store": self.store.stats(),
+            }
+
+
+_indexes: Dict[str, CodeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_code_index(repo_root: Path, cache_dir: Path) -> CodeIndex:
+    """Один CodeIndex на репозиторий в рамках процесса; записи по файлам — в cache_dir."""
+    repo_root = Path(repo_root).resolve()
+    key = str(repo_root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            store = ScanCache(Path(cache_dir) / f"index-v{CODE_INDEX_VERSION}-{name}.json", repo_root)
+            index = CodeIndex(store, repo_root)
+            _indexes[key] = index
+        return index
@@ -0,0 +1,174 @@
+# =========================
+# Файл: web/config_store.py
+# =========================
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .result_cache import canonical_hash
+
+CONFIG_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+def config_name(name: str) -> str:
+    """Имя конфига как в write_configs: без расширения — .json."""
+    return name if name.endswith(CONFIG_SUFFIXES) else f"{name}.json"
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, indent=2, default=str).encode("utf-8")
+
+
+def _digest(suffix: str, data: bytes) -> str:
+    return hashlib.sha256(suffix.encode("utf-8") + b"\0" + data).hexdigest()
+
+
+def serialize_config(name: str, content: Any) -> Tuple[str, bytes]:
+    """
+    (хеш, байты файла). dict/list пишутся каноническим JSON (он же валидный YAML), поэтому порядок
+    ключей не влияет ни на хеш, ни на файл. Текст JSON/YAML хешируется по разобранному значению —
+    разное форматирование одного конфига дает один файл; неразбираемый текст — по байтам.
+    """
+    suffix = Path(name).suffix
+    if isinstance(content, (dict, list)):
+        data = _canonical(content)
+        return _digest(suffix, data), data
+    text = str(content)
+    data = text.encode("utf-8")
+    try:
+        if suffix == ".json":
+            parsed = json.loads(text)
+        else:
+            import yaml  # только для текстовых YAML-конфигов
+            parsed = yaml.safe_load(text)
+        return _digest(suffix, _canonical(parsed)), data
+    except Exception:
+        return _digest(suffix, data), data
+
+
+class ConfigStore:
+    """
+    Хранилище конфигов по содержимому: objects/<sha256><suffix> пишется один раз (временный файл +
+    os.replace) и больше не меняется. Набор конфигов запуска — sets/<sha256 набора>/<имя> (жесткие
+    ссылки на объекты) — тоже неизменяем: одинаковые наборы получают один каталог, поэтому повторный
+    запуск не пишет на диск ничего, а параллельные запуски не видят чужих конфигов посреди чтения.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.sets = self.root / "sets"
+        self.known: set = set()  # уже существующие объекты и наборы — без stat() на повторных запусках
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.dedup = 0
+
+    def _exists(self, path: Path) -> bool:
+        key = str(path)
+        if key in self.known:
+            return True
+        if path.exists():
+            with self.lock:
+                self.known.add(key)
+            return True
+        return False
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+
+    def put(self, name: str, content: Any) -> Path:
+        """Путь к неизменяемому файлу с этим содержимым; существующий объект не переписывается."""
+        name = config_name(name)
+        digest, data = serialize_config(name, content)
+        path = self.objects / digest[:2] / f"{digest}{Path(name).suffix}"
+        if self._exists(path):
+            with self.lock:
+                self.dedup += 1
+            return path
+        self._write_atomic(path, data)
+        with self.lock:
+            self.known.add(str(path))
+            self.writes += 1
+        return path
+
+    def put_set(self, config_files: Dict[str, Any]) -> Tuple[Path, Dict[str, str]]:
+        """
+        Каталог набора (имя -> объект) и пути конфигов в нем. Каталог собирается во временном
+        и переименовывается целиком, так что читатель видит либо полный набор, либо никакого.
+        """
+        objects: Dict[str, Path] = {}
+        for name, content in config_files.items():
+            if content is None:
+                continue
+            objects[Path(config_name(name)).name] = self.put(name, content)
+        set_id = canonical_hash({name: path.name for name, path in objects.items()})
+        set_dir = self.sets / set_id
+        if not self._exists(set_dir):
+            self.sets.mkdir(parents=True, exist_ok=True)
+            tmp = self.sets / f".{set_id}.{os.getpid()}.{threading.get_ident()}.tmp"
+            tmp.mkdir()
+            for name, path in objects.items():
+                try:
+                    os.link(path, tmp / name)
+                except OSError:
+                    # ФС без жестких ссылок — копия (набор все равно неизменяем)
+                    shutil.copyfile(path, tmp / name)
+            try:
+                os.rename(tmp, set_dir)
+            except OSError:
+                # тот же набор уже собран параллельным запуском
+                shutil.rmtree(tmp, ignore_errors=True)
+            with self.lock:
+                self.known.add(str(set_dir))
+        return set_dir, {name: str(set_dir / name) for name in objects}
+
+    def stats(self) -> Dict[str, Any]:
+        objects = list(self.objects.glob("*/*")) if self.objects.exists() else []
+        sets = [p for p in self.sets.iterdir() if not p.name.startswith(".")] if self.sets.exists() else []
+        with self.lock:
+            return {
+                "objects": len(objects),
+                "bytes": sum(p.stat().st_size for p in objects),
+                "sets": len(sets),
+                "writes": self.writes,
+                "dedup": self.dedup,
+                "dir": str(self.root),
+            }
+
+
+def bind_config_args(args: List[str], paths: Dict[str, str]) -> List[str]:
+    """
+    Аргументы, ссылающиеся на переданные конфиги ("config.json", "data/configs/config.json",
+    "--config=data/configs/config.json"), переписываются на неизменяемые пути набора запуска.
+    """
+    res = []
+    for arg in args:
+        prefix, _, value = arg.partition("=") if arg.startswith("-") and "=" in arg else ("", "", arg)
+        p = Path(value)
+        if p.name in paths and (str(p.parent) == "." or p.parent.name == "configs"):
+            value = paths[p.name]
+        res.append(f"{prefix}={value}" if prefix else value)
+    return res
+
+
+_stores: Dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_config_store(root: Path) -> ConfigStore:
+    """Один экземпляр ConfigStore на каталог в рамках процесса (общий набор known)."""
+    key = str(Path(root).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ConfigStore(Path(root))
+        return store
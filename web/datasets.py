@@ -0,0 +1,258 @@
+# =========================
+# Файл: web/datasets.py
+# =========================
+import io
+import os
+import csv
+import json
+import mmap
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_np: Any = False
+
+
+def numpy_module() -> Any:
+    """
+    numpy импортируется при первом обращении, а не при импорте модуля (~0.1 с на старте).
+    Без numpy — None: батчи отдаются словарями списков, колоночный кеш недоступен.
+    """
+    global _np
+    if _np is False:
+        try:
+            import numpy
+            _np = numpy
+        except Exception:
+            _np = None
+    return _np
+
+# Сколько строк смотрим, чтобы решить, числовая ли колонка
+DTYPE_SAMPLE_ROWS = 1000
+
+
+def build_row_offsets(mm: mmap.mmap) -> Tuple[List[str], array]:
+    """
+    Один проход по файлу: заголовок и смещения начала каждой строки данных + конец файла.
+    Перевод строки внутри кавычек не считается концом записи; пустые строки пропускаются.
+    """
+    n = len(mm)
+    nl = mm.find(b"\n")
+    header_end = n if nl < 0 else nl + 1
+    header = next(csv.reader([mm[:header_end].decode("utf-8-sig", errors="replace")]), [])
+
+    starts = array("Q")
+    rec_start = header_end
+    quoted = False
+    pos = header_end
+    while pos < n:
+        nl = mm.find(b"\n", pos)
+        end = n if nl < 0 else nl + 1
+        seg = mm[pos:end]
+        if not quoted and not seg.strip():
+            rec_start = end
+        else:
+            if seg.count(b'"') % 2:
+                quoted = not quoted
+            if not quoted:
+                starts.append(rec_start)
+                rec_start = end
+        pos = end
+    starts.append(n)
+    return header, starts
+
+
+def _to_float(v: str) -> float:
+    v = v.strip()
+    return float(v) if v else float("nan")
+
+
+def _to_float_or_nan(v: str) -> float:
+    try:
+        return _to_float(v)
+    except ValueError:
+        return float("nan")
+
+
+class MmapCsvDataset:
+    """
+    CSV-датасет поверх mmap. Индекс смещений строк строится один раз и сохраняется рядом
+    в cache_dir (ключ — путь, размер и mtime файла), поэтому len() и доступ к любому
+    диапазону строк не требуют чтения всего файла. Батчи — словари колонка -> np.ndarray.
+    """
+
+    def __init__(self, path: Path, cache_dir: Path):
+        self.path = Path(path)
+        st = self.path.stat()
+        key_src = f"{self.path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+        self.key = hashlib.sha1(key_src.encode("utf-8")).hexdigest()[:16]
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / f"{self.key}.idx.json"
+        self.offsets_path = self.cache_dir / f"{self.key}.offsets"
+        self.columnar_dir = self.cache_dir / f"{self.key}.columns"
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else None
+        self.header: List[str] = []
+        self.offsets = array("Q")
+        self.dtypes: Dict[str, str] = {}
+        self._load_or_build_index()
+
+    def _load_or_build_index(self) -> None:
+        if self.index_path.exists() and self.offsets_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.header = meta["header"]
+            self.dtypes = meta["dtypes"]
+            with open(self.offsets_path, "rb") as f:
+                self.offsets.frombytes(f.read())
+            return
+        if self._mm is None:
+            self.offsets = array("Q", [0])
+            return
+        self.header, self.offsets = build_row_offsets(self._mm)
+        self.dtypes = self._infer_dtypes()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.offsets_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            self.offsets.tofile(f)
+        os.replace(tmp, self.offsets_path)
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"path": str(self.path), "header": self.header, "dtypes": self.dtypes, "rows": len(self)}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def _infer_dtypes(self) -> Dict[str, str]:
+        rows = self.rows(0, min(len(self), DTYPE_SAMPLE_ROWS))
+        dtypes: Dict[str, str] = {}
+        for i, name in enumerate(self.header):
+            try:
+                for r in rows:
+                    _to_float(r[i])
+                dtypes[name] = "float"
+            except (ValueError, IndexError):
+                dtypes[name] = "str"
+        return dtypes
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def rows(self, start: int, stop: int) -> List[List[str]]:
+        """Сырые строки [start, stop) — читается только нужный кусок файла."""
+        stop = min(stop, len(self))
+        if start >= stop or self._mm is None:
+            return []
+        text = self._mm[self.offsets[start]:self.offsets[stop]].decode("utf-8", errors="replace")
+        return [r for r in csv.reader(io.StringIO(text)) if r]
+
+    def _columns(self, rows: List[List[str]]) -> Dict[str, Any]:
+        np = numpy_module()
+        out: Dict[str, Any] = {}
+        for i, name in enumerate(self.header):
+            values = [r[i] if i < len(r) else "" for r in rows]
+            if self.dtypes.get(name) == "float":
+                try:
+                    values = [_to_float(v) for v in values]
+                except ValueError:
+                    pass  # тип угадан по выборке; нечисловое значение дальше — оставляем строки
+            if np is not None:
+                out[name] = np.asarray(values, dtype=np.float64 if isinstance(values[0], float) else object) if values else np.empty(0)
+            else:
+                out[name] = values
+        return out
+
+    def iter_batches(self, batch_size: int, columnar: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Батчи по batch_size строк. columnar=True — при первом обращении файл конвертируется
+        в .npy по колонкам, дальше батчи — срезы np.memmap без разбора CSV.
+        """
+        if columnar and numpy_module() is not None:
+            cols = self.load_columnar(build=True)
+            for start in range(0, len(self), batch_size):
+                yield {name: arr[start:start + batch_size] for name, arr in cols.items()}
+            return
+        for start in range(0, len(self), batch_size):
+            yield self._columns(self.rows(start, start + batch_size))
+
+    def load_columnar(self, build: bool = False) -> Optional[Dict[str, Any]]:
+        """Колоночный кеш (np.memmap на колонку); build=True — создать, если его еще нет."""
+        np = numpy_module()
+        if np is None:
+            return None
+        meta_path = self.columnar_dir / "meta.json"
+        if not meta_path.exists():
+            if not build:
+                return None
+            self._build_columnar(meta_path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return {name: np.load(self.columnar_dir / f"{i}.npy", mmap_mode="r") for i, name in enumerate(meta["columns"])}
+
+    def _build_columnar(self, meta_path: Path, chunk_rows: int = 65536) -> None:
+        np = numpy_module()
+        n = len(self)
+        # ширина строковых колонок нужна заранее — отдельный проход по строкам
+        widths = {name: 1 for name, dt in self.dtypes.items() if dt != "float"}
+        if widths:
+            for start in range(0, n, chunk_rows):
+                for r in self.rows(start, start + chunk_rows):
+                    for i, name in enumerate(self.header):
+                        if name in widths and i < len(r):
+                            widths[name] = max(widths[name], len(r[i]))
+        self.columnar_dir.mkdir(parents=True, exist_ok=True)
+        arrays = []
+        for i, name in enumerate(self.header):
+            dtype = np.float64 if self.dtypes.get(name) == "float" else f"<U{widths[name]}"
+            arrays.append(np.lib.format.open_memmap(self.columnar_dir / f"{i}.npy", mode="w+", dtype=dtype, shape=(n,)))
+        for start in range(0, n, chunk_rows):
+            rows = self.rows(start, start + chunk_rows)
+            for i, name in enumerate(self.header):
+                values = [r[i] if i < len(r) else "" for r in rows]
+                if self.dtypes.get(name) == "float":
+                    values = [_to_float_or_nan(v) for v in values]
+                arrays[i][start:start + len(rows)] = values
+        for arr in arrays:
+            arr.flush()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"columns": self.header, "dtypes": self.dtypes, "rows": n}, f, ensure_ascii=False)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "rows": len(self),
+            "columns": self.header,
+            "dtypes": self.dtypes,
+            "index": str(self.index_path),
+            "columnar": (self.columnar_dir / "meta.json").exists(),
+            "numpy": numpy_module() is not None,
+        }
+
+
+_datasets: Dict[Tuple[str, int, int], MmapCsvDataset] = {}
+_datasets_lock = threading.Lock()
+
+
+def open_dataset(path: Path, cache_dir: Path) -> MmapCsvDataset:
+    """
+    Открытые датасеты переиспользуются, пока файл не изменился (размер и mtime). Устаревший
+    экземпляр только убирается из реестра, но не закрывается: его еще может читать идущий
+    iter_batches или запрос — mmap и файл закроет сборщик мусора, когда ссылок не останется.
+    """
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _datasets_lock:
+        ds = _datasets.get(key)
+        if ds is None:
+            for old in [k for k in _datasets if k[0] == key[0]]:
+                del _datasets[old]
+            ds = MmapCsvDataset(path, cache_dir)
+            _datasets[key] = ds
+        return ds
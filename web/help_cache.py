@@ -0,0 +1,253 @@
+# =========================
+# Файл: web/help_cache.py
+# =========================
+import os
+import ast
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .result_cache import ResultCache, canonical_hash, dataset_fingerprint
+from .scan_cache import git_head
+from .metrics import subprocess_outcome, track_subprocess
+
+HELP_TIMEOUT = 20
+
+
+def module_name(rel: str) -> str:
+    """"tools/train.py" -> "tools.train", "pkg/__init__.py" -> "pkg"."""
+    parts = list(Path(rel).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def module_file(repo_root: Path, module: str) -> Optional[Path]:
+    """Файл, который выполнит python -m module: module.py или module/__main__.py."""
+    base = Path(repo_root).joinpath(*module.split("."))
+    for p in (base.with_suffix(".py"), base / "__main__.py"):
+        if p.is_file():
+            return p
+    return None
+
+
+def entry_module(entry: str) -> str:
+    """"uc-train = tools.train:main" -> "tools.train"."""
+    return entry.split("=", 1)[1].strip().split(":", 1)[0].strip() if "=" in entry else ""
+
+
+def help_cmd(python: str, module: str, entry: str = "") -> List[str]:
+    # как в run_help_for_module: entry "key = value" запускается через UC_wrapper
+    if entry and "=" in entry:
+        return [python, "-m", "UC_wrapper", entry.split("=", 1)[0].strip(), "--help"]
+    return [python, "-m", module, "--help"]
+
+
+def _literal(node: ast.AST) -> Any:
+    # argparse.SUPPRESS в исходнике — атрибут, а не литерал
+    if isinstance(node, ast.Attribute) and node.attr == "SUPPRESS":
+        return argparse.SUPPRESS
+    return ast.literal_eval(node)
+
+
+def _kwargs(call: ast.Call, allowed: tuple) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {}
+    for kw in call.keywords:
+        if kw.arg in allowed:
+            try:
+                kwargs[kw.arg] = _literal(kw.value)
+            except (ValueError, SyntaxError, TypeError):
+                # type=int, choices=range(...), action=CustomAction — на текст справки почти не влияют
+                pass
+    return kwargs
+
+
+PARSER_KWARGS = ("prog", "description", "epilog", "usage", "add_help", "prefix_chars")
+ARGUMENT_KWARGS = ("action", "nargs", "default", "choices", "required", "help", "metavar", "dest", "const")
+
+
+def static_help(source: str, prog: str) -> str:
+    """
+    Справка без запуска интерпретатора: из AST берутся ArgumentParser(...) и все вызовы
+    add_argument(...) с литеральными аргументами, по ним собирается настоящий argparse.ArgumentParser
+    и возвращается его format_help(). Группы и подкоманды сворачиваются в один парсер.
+    """
+    tree = ast.parse(source)
+    parser_kwargs: Dict[str, Any] = {}
+    arguments = []
+    subcommands: List[str] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else func.id if isinstance(func, ast.Name) else None
+        if name == "ArgumentParser" and not parser_kwargs:
+            parser_kwargs = _kwargs(node, PARSER_KWARGS)
+        elif name == "add_argument":
+            try:
+                flags = [_literal(a) for a in node.args]
+            except (ValueError, SyntaxError, TypeError):
+                continue
+            arguments.append((node.lineno, flags, _kwargs(node, ARGUMENT_KWARGS)))
+        elif name == "add_parser" and node.args:
+            try:
+                subcommands.append(str(_literal(node.args[0])))
+            except (ValueError, SyntaxError, TypeError):
+                pass
+
+    parser_kwargs.setdefault("prog", prog)
+    try:
+        parser = argparse.ArgumentParser(**parser_kwargs)
+    except TypeError:
+        parser = argparse.ArgumentParser(prog=prog)
+    for _, flags, kwargs in sorted(arguments, key=lambda a: a[0]):
+        try:
+            parser.add_argument(*flags, **kwargs)
+        except (ValueError, TypeError, argparse.ArgumentError):
+            # конфликт флагов между подкомандами или неподдержанная комбинация — пропускаем
+            try:
+                parser.add_argument(*flags, help=kwargs.get("help"))
+            except (ValueError, TypeError, argparse.ArgumentError):
+                pass
+    if subcommands:
+        parser.add_argument("command", choices=subcommands, help="subcommand")
+    return parser.format_help()
+
+
+class HelpCache:
+    """
+    Кеш вывода --help на диске (ResultCache). Ключ — модуль (или entry), режим (run/static),
+    sha256 файла модуля и HEAD репозитория: после правки файла или git pull справка
+    пересчитывается, иначе отдается без запуска интерпретатора.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = 30 * 86400):
+        self.results = ResultCache(cache_dir, ttl=ttl, max_bytes=64 << 20)
+
+    def key(self, repo_root: Path, module: str, entry: str, mode: str, head: Optional[str]) -> str:
+        target = module or entry_module(entry)
+        path = module_file(repo_root, target) if target else None
+        return canonical_hash({
+            "repo": str(Path(repo_root).resolve()),
+            "module": module,
+            "entry": entry,
+            "mode": mode,
+            "file": dataset_fingerprint(str(path) if path else None).get("sha256"),
+            "head": head,
+        })
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.results.get(key)
+
+    def put(self, key: str, res: Dict[str, Any], module: str, entry: str) -> None:
+        # таймаут — скорее всего временная проблема, такой результат не запоминаем
+        if res.get("returncode") != 124:
+            self.results.put(key, res, meta={"module": module, "entry": entry})
+
+    def invalidate(self) -> int:
+        return self.results.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.results.stats()
+
+
+def build_static(repo_root: Path, module: str, entry: str = "") -> Dict[str, Any]:
+    target = module or entry_module(entry)
+    path = module_file(repo_root, target) if target else None
+    if path is None:
+        return {"returncode": 2, "stdout": "", "stderr": f"Module file not found: {target}", "mode": "static"}
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = static_help(f.read(), path.name)  # как prog у python -m: имя файла
+    except SyntaxError as e:
+        return {"returncode": 2, "stdout": "", "stderr": f"Cannot parse {path.name}: {e}", "mode": "static"}
+    return {"returncode": 0, "stdout": text, "stderr": "", "mode": "static"}
+
+
+async def run_help_async(repo_root: Path, module: str, entry: str, python: str, timeout: float = HELP_TIMEOUT) -> Dict[str, Any]:
+    """Асинхронный аналог run_help_for_module: процесс не занимает поток пула на время ожидания."""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(repo_root)
+    with track_subprocess("help") as t:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *help_cmd(python, module, entry),
+                cwd=str(repo_root),
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                out, err = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                t.outcome = "timeout"
+                return {"returncode": 124, "stdout": "", "stderr": f"Help run failed: timeout {timeout}s", "mode": "run"}
+            t.outcome = subprocess_outcome(proc.returncode)
+            return {
+                "returncode": proc.returncode,
+                "stdout": out.decode("utf-8", errors="replace"),
+                "stderr": err.decode("utf-8", errors="replace"),
+                "mode": "run",
+            }
+        except Exception as e:
+            return {"returncode": 2, "stdout": "", "stderr": f"Help run failed: {e}", "mode": "run"}
+
+
+async def _build_help(repo_root: Path, module: str, entry: str, python: str, mode: str) -> Dict[str, Any]:
+    if mode == "static":
+        return await asyncio.get_running_loop().run_in_executor(None, build_static, repo_root, module, entry)
+    return await run_help_async(repo_root, module, entry, python)
+
+
+async def get_help(
+    cache: HelpCache,
+    repo_root: Path,
+    module: str = "",
+    entry: str = "",
+    python: str = "python",
+    mode: str = "run",
+    refresh: bool = False,
+    head: Optional[str] = None,
+    slots: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, Any]:
+    """Справка из кеша или (refresh=True / промах) заново; slots ограничивает число одновременных процессов."""
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    if head is None:
+        head = await loop.run_in_executor(None, git_head, repo_root)
+    # все, что читает или пишет файлы (ключ — sha256 модуля, кеш на диске, разбор AST), —
+    # в пуле потоков, не в цикле событий
+    key = await loop.run_in_executor(None, cache.key, repo_root, module, entry, mode, head)
+    res = None if refresh else await loop.run_in_executor(None, cache.get, key)
+    cached = res is not None
+    if res is None:
+        if slots is not None:
+            async with slots:
+                res = await _build_help(repo_root, module, entry, python, mode)
+        else:
+            res = await _build_help(repo_root, module, entry, python, mode)
+        await loop.run_in_executor(None, cache.put, key, res, module, entry)
+    return {**res, "module": module, "entry": entry, "cached": cached, "seconds": round(time.perf_counter() - t0, 4)}
+
+
+async def prefetch_help(
+    cache: HelpCache,
+    repo_root: Path,
+    modules: List[str],
+    python: str,
+    mode: str = "run",
+    concurrency: int = 4,
+    refresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """Справка для всех modules: не больше concurrency интерпретаторов (или разборов static) одновременно, HEAD берется один раз."""
+    head = await asyncio.get_running_loop().run_in_executor(None, git_head, repo_root)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    return list(await asyncio.gather(*(
+        get_help(cache, repo_root, module=m, python=python, mode=mode, refresh=refresh, head=head, slots=slots)
+        for m in modules
+    )))
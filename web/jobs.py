@@ -0,0 +1,382 @@
+# =========================
+# Файл: web/jobs.py
+# =========================
+import os
+import time
+import uuid
+import signal
+import asyncio
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO, Tuple
+
+from .metrics import JOB_CPU_SECONDS, JOB_MAX_RSS_BYTES, SUBPROCESSES, SUBPROCESSES_RUNNING, SUBPROCESS_SECONDS
+from .sandbox import SandboxPolicy, read_usage
+
+# Статусы задачи: queued -> running -> done | failed | timeout | cancelled
+FINAL_STATUSES = ("done", "failed", "timeout", "cancelled")
+# Лимит StreamReader на одну строку вывода и обрезка строки в кольцевом буфере
+READ_LIMIT = 1 << 20
+MAX_LINE_CHARS = 8192
+# Полный лог на диск пишется пачками в пуле потоков: при накоплении SPILL_CHUNK символов
+# или не реже раза в SPILL_INTERVAL секунд
+SPILL_CHUNK = 64 << 10
+SPILL_INTERVAL = 1.0
+
+
+class QueueFull(Exception):
+    pass
+
+
+class LogBuffer:
+    """
+    Кольцевой буфер последних строк вывода: (seq, stream, text).
+    Память ограничена max_lines * MAX_LINE_CHARS независимо от длительности запуска;
+    полный лог (если задан log_path) дописывается на диск пачками (см. SPILL_CHUNK) вне цикла событий.
+    """
+
+    def __init__(self, max_lines: int = 1000, log_path: Optional[Path] = None):
+        self.lines: "deque[Tuple[int, str, str]]" = deque(maxlen=max_lines)
+        self.seq = 0
+        self.closed = False
+        self.log_path = log_path
+        self._log: Optional[TextIO] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._flushed_at = time.monotonic()
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _flush(self) -> None:
+        """Отдать накопленный хвост лога в пул потоков; замок сохраняет порядок пачек stdout и stderr."""
+        if not self._pending or self._log is None:
+            return
+        data = "".join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        self._flushed_at = time.monotonic()
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self._log.write, data)
+
+    def open(self) -> None:
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, "w", encoding="utf-8")
+
+    async def append(self, stream: str, text: str) -> None:
+        if self._log is not None:
+            self._pending.append(text if stream == "stdout" else f"[stderr] {text}")
+            self._pending_chars += len(text)
+            if self._pending_chars >= SPILL_CHUNK or time.monotonic() - self._flushed_at >= SPILL_INTERVAL:
+                await self._flush()
+        text = text.rstrip("\n")
+        if len(text) > MAX_LINE_CHARS:
+            text = text[:MAX_LINE_CHARS] + " …[truncated]"
+        self.seq += 1
+        self.lines.append((self.seq, stream, text))
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+    async def close(self) -> None:
+        if self._log is not None:
+            await self._flush()
+            log, self._log = self._log, None
+            await asyncio.get_running_loop().run_in_executor(None, log.close)
+        self.closed = True
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+    def since(self, seq: int) -> List[Dict[str, Any]]:
+        return [{"seq": n, "stream": st, "text": t} for n, st, t in self.lines if n > seq]
+
+    def tail(self, stream: str) -> str:
+        return "\n".join(t for _, st, t in self.lines if st == stream)
+
+    async def follow(self, seq: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Отдаем строки после seq, затем ждем новые до закрытия буфера."""
+        cond = self._condition()
+        while True:
+            for rec in self.since(seq):
+                seq = rec["seq"]
+                yield rec
+            if self.closed:
+                return
+            async with cond:
+                await cond.wait_for(lambda: self.seq > seq or self.closed)
+
+
+class Job:
+    def __init__(self, cmd: List[str], cwd: Path, env: Dict[str, str], timeout: Optional[int], log: LogBuffer):
+        self.id = uuid.uuid4().hex[:12]
+        self.cmd = cmd
+        self.cwd = cwd
+        self.env = env
+        self.timeout = timeout
+        self.status = "queued"
+        self.returncode: Optional[int] = None
+        self.log = log
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.task: Optional[asyncio.Task] = None
+        # песочница: выделенные ядра и отчет запускателя (пиковая память, CPU-время)
+        self.cpus: List[int] = []
+        self.usage: Optional[Dict[str, Any]] = None
+        self.sandboxed = False
+
+    def to_dict(self, with_output: bool = True) -> Dict[str, Any]:
+        res: Dict[str, Any] = {
+            "id": self.id,
+            "cmd": self.cmd,
+            "status": self.status,
+            "returncode": self.returncode,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "log_lines": self.log.seq,
+            "log_file": str(self.log.log_path) if self.log.log_path else None,
+            "sandboxed": self.sandboxed,
+            "cpus": self.cpus,
+            "usage": self.usage,
+        }
+        if with_output:
+            # только хвост из кольцевого буфера; полный вывод — в log_file
+            res["stdout"] = self.log.tail("stdout")
+            res["stderr"] = self.log.tail("stderr")
+        return res
+
+
+class JobManager:
+    """
+    Неблокирующий запуск команд через asyncio.create_subprocess_exec.
+    Одновременно выполняется не больше max_concurrent задач, остальные ждут в очереди
+    (не больше max_queued); завершенные хранятся в истории (последние max_history).
+    Каждый запуск — в отдельной группе процессов: сигнал остановки получают и потомки команды.
+    С sandbox запуск идет через запускатель web/sandbox.py: rlimit-ы, nice и привязка к ядрам,
+    с отчетом о ресурсах в job.usage.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_queued: int = 32,
+        max_history: int = 200,
+        kill_grace: float = 5.0,
+        log_lines: int = 1000,
+        log_dir: Optional[Path] = None,
+        sandbox: Optional[SandboxPolicy] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_history = max_history
+        self.kill_grace = kill_grace
+        self.log_lines = log_lines
+        self.log_dir = log_dir
+        self.sandbox = sandbox if sandbox is not None and sandbox.enabled else None
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # создаем в работающем цикле событий
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return self._slots
+
+    def counts(self) -> Dict[str, int]:
+        res = {"queued": 0, "running": 0, "finished": 0}
+        for job in self.jobs.values():
+            if job.status in FINAL_STATUSES:
+                res["finished"] += 1
+            else:
+                res[job.status] += 1
+        return res
+
+    def submit(self, cmd: List[str], cwd: Path, env: Dict[str, str], timeout: Optional[int] = 600) -> Job:
+        if self.counts()["queued"] >= self.max_queued:
+            raise QueueFull(f"Too many queued jobs (max {self.max_queued})")
+        job = Job(cmd, cwd, env, timeout, LogBuffer(self.log_lines))
+        if self.log_dir is not None:
+            job.log.log_path = Path(self.log_dir) / f"{job.id}.log"
+        self.jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [job.to_dict(with_output=False) for job in self.jobs.values()]
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINAL_STATUSES:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        return job
+
+    async def cancel_all(self) -> int:
+        """Отменить все задачи в очереди и выполняющиеся, дождаться их остановки; возвращает их число."""
+        active = [job_id for job_id, job in list(self.jobs.items()) if job.status not in FINAL_STATUSES]
+        await asyncio.gather(*(self.cancel(job_id) for job_id in active))
+        return len(active)
+
+    async def _spawn(self, job: Job) -> Optional[int]:
+        """Запуск процесса; с песочницей возвращает конец канала, из которого читается отчет запускателя."""
+        # своя группа процессов (POSIX): _signal шлет сигнал всей группе, а не только прямому потомку
+        kwargs: Dict[str, Any] = {"start_new_session": True}
+        cmd, usage_r = job.cmd, None
+        if self.sandbox is not None:
+            if self.sandbox.allocator is not None:
+                job.cpus = self.sandbox.allocator.acquire()
+            usage_r, usage_w = os.pipe()
+            cmd = self.sandbox.wrap(job.cmd, usage_w, job.cpus)
+            kwargs["pass_fds"] = (usage_w,)
+            job.sandboxed = True
+        try:
+            job.proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=str(job.cwd),
+                env=job.env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=READ_LIMIT,
+                **kwargs,
+            )
+        except BaseException:
+            if usage_r is not None:
+                os.close(usage_r)
+            raise
+        finally:
+            if usage_r is not None:
+                os.close(usage_w)
+        return usage_r
+
+    def _finish_sandbox(self, job: Job, usage_r: Optional[int]) -> None:
+        if usage_r is not None:
+            # процесс уже завершен — писателей у канала нет, чтение не блокируется
+            job.usage = read_usage(usage_r)
+            if job.usage is not None:
+                JOB_MAX_RSS_BYTES.labels().observe(job.usage["max_rss_bytes"])
+                JOB_CPU_SECONDS.labels().inc(job.usage["cpu_s"])
+        if job.cpus and self.sandbox is not None and self.sandbox.allocator is not None:
+            self.sandbox.allocator.release(job.cpus)
+
+    async def _run(self, job: Job) -> None:
+        usage_r: Optional[int] = None
+        pumps: Optional[asyncio.Future] = None
+        try:
+            async with self._semaphore():
+                job.status = "running"
+                job.started_at = time.time()
+                SUBPROCESSES_RUNNING.labels("job").inc()
+                job.log.open()
+                usage_r = await self._spawn(job)
+                pumps = asyncio.gather(
+                    self._pump(job, job.proc.stdout, "stdout"),
+                    self._pump(job, job.proc.stderr, "stderr"),
+                )
+                try:
+                    await asyncio.wait_for(job.proc.wait(), timeout=job.timeout)
+                except asyncio.TimeoutError:
+                    await self._terminate(job)
+                    await self._drain(job, pumps)
+                    job.status = "timeout"
+                    job.returncode = 124
+                    await job.log.append("stderr", f"Timeout: {job.timeout}s")
+                    return
+                await pumps
+                job.returncode = job.proc.returncode
+                job.status = "done" if job.returncode == 0 else "failed"
+        except asyncio.CancelledError:
+            await self._terminate(job)
+            await self._drain(job, pumps)
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.returncode = 2
+            job.error = f"Run failed: {e}"
+        finally:
+            job.finished_at = time.time()
+            job.proc = None
+            self._finish_sandbox(job, usage_r)
+            if job.started_at is not None:
+                SUBPROCESSES_RUNNING.labels("job").dec()
+                SUBPROCESS_SECONDS.labels("job").observe(job.finished_at - job.started_at)
+                SUBPROCESSES.labels("job", "ok" if job.status == "done" else job.status).inc()
+            await job.log.close()
+
+    async def _drain(self, job: Job, pumps: Optional[asyncio.Future]) -> None:
+        """
+        Дочитать вывод остановленного процесса, но не дольше kill_grace: потомок, ушедший из группы
+        (setsid) и унаследовавший stdout/stderr, иначе держал бы задачу в running до своего выхода.
+        """
+        if pumps is None:
+            return
+        done, _ = await asyncio.wait({pumps}, timeout=self.kill_grace)
+        if not done:
+            pumps.cancel()
+            # каналы держит еще и потомок — закрываем свою сторону, иначе транспорт останется открытым
+            transport = getattr(job.proc, "_transport", None)
+            if transport is not None:
+                transport.close()
+        # забираем результат (и исключение) gather, чтобы он не остался необработанным
+        await asyncio.gather(pumps, return_exceptions=True)
+
+    async def _pump(self, job: Job, reader: asyncio.StreamReader, stream: str) -> None:
+        """Построчно переносим вывод процесса в LogBuffer, не накапливая его целиком."""
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # строка длиннее READ_LIMIT: прочитанное начало отброшено читателем, а еще не
+                # пришедший остаток строки вернется следующим readline как отдельная строка
+                await job.log.append(stream, "…[line exceeds read limit]")
+                continue
+            if not line:
+                return
+            await job.log.append(stream, line.decode("utf-8", errors="replace"))
+
+    async def _terminate(self, job: Job) -> None:
+        proc = job.proc
+        if proc is None or proc.returncode is not None:
+            return
+        # процесс — лидер своей группы: сигнал получают и все потомки команды
+        self._signal(job, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.kill_grace)
+        except asyncio.TimeoutError:
+            self._signal(job, signal.SIGKILL)
+            await proc.wait()
+        job.returncode = proc.returncode
+
+    def _signal(self, job: Job, signum: int) -> None:
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(job.proc.pid, signum)
+            else:
+                job.proc.send_signal(signum)
+        except ProcessLookupError:
+            pass
+
+    def _prune(self) -> None:
+        finished = [jid for jid, job in self.jobs.items() if job.status in FINAL_STATUSES]
+        for jid in finished[: max(0, len(finished) - self.max_history)]:
+            del self.jobs[jid]
@@ -0,0 +1,310 @@
+# =========================
+# Файл: web/metrics.py
+# =========================
+import os
+import time
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Windows: метрики памяти процесса и дочерних процессов недоступны
+    resource = None
+
+# Границы корзин по умолчанию для длительностей в секундах
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (накопительные счетчики считаются при выдаче)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets: List[float] = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя корзина — +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            cumulative = []
+            total = 0
+            for bound, n in zip(self.buckets + [float("inf")], self.counts):
+                total += n
+                cumulative.append({"le": "+Inf" if bound == float("inf") else bound, "count": total})
+            return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Family:
+    """
+    Метрика с метками: labels("GET", "/api/scan") возвращает дочерний Counter/Gauge/Histogram,
+    созданный при первом обращении. Повторные обращения — одно чтение словаря без блокировки.
+    """
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values: str) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+            with self.lock:
+                child = self.children.setdefault(values, self.factory())
+        return child
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self.lock:
+            return list(self.children.items())
+
+
+class FuncFamily:
+    """Метрика, значение которой вычисляется при выдаче: fn() -> число или {метки: число}."""
+
+    def __init__(self, name: str, kind: str, help: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        value = self.fn()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [(tuple(str(v) for v in k), v) for k, v in value.items()]
+        return [((), value)]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    """Реестр метрик процесса и их выдача в текстовом формате Prometheus (text/plain; version=0.0.4)."""
+
+    def __init__(self):
+        self.families: "OrderedDict[str, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _family(self, name: str, kind: str, help: str, labelnames: Sequence[str], factory: Callable[[], Any]) -> Family:
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = Family(name, kind, help, labelnames, factory)
+            return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Family:
+        return self._family(name, "counter", help, labelnames, Counter)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Family:
+        return self._family(name, "gauge", help, labelnames, Gauge)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Family:
+        return self._family(name, "histogram", help, labelnames, lambda: Histogram(buckets))
+
+    def register(self, name: str, kind: str, help: str, metric: Any) -> None:
+        """Выдавать уже существующий Counter/Gauge/Histogram (например, гистограммы BatchScheduler)."""
+        family = Family(name, kind, help, (), lambda: metric)
+        family.children[()] = metric
+        with self.lock:
+            self.families[name] = family
+
+    def func(self, name: str, kind: str, help: str, fn: Callable[[], Any], labelnames: Sequence[str] = ()) -> None:
+        with self.lock:
+            self.families[name] = FuncFamily(name, kind, help, fn, labelnames)
+
+    def render(self) -> str:
+        with self.lock:
+            families = list(self.families.values())
+        lines: List[str] = []
+        for family in families:
+            try:
+                samples = family.samples()
+            except Exception:
+                # сломанная функция-метрика не должна ронять весь /metrics
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, metric in samples:
+                if isinstance(metric, Histogram):
+                    snap = metric.snapshot()
+                    for b in snap["buckets"]:
+                        le = "+Inf" if b["le"] == "+Inf" else _num(b["le"])
+                        lines.append(f"{family.name}_bucket{_labels(family.labelnames, values, ('le', le))} {b['count']}")
+                    lines.append(f"{family.name}_sum{_labels(family.labelnames, values)} {_num(snap['sum'])}")
+                    lines.append(f"{family.name}_count{_labels(family.labelnames, values)} {snap['count']}")
+                else:
+                    value = metric.value if isinstance(metric, (Counter, Gauge)) else metric
+                    lines.append(f"{family.name}{_labels(family.labelnames, values)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP: длительность запроса по шаблону маршрута (а не фактическому пути — иначе метки разрастаются)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "uc_http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.gauge("uc_http_requests_in_progress", "HTTP requests being served")
+
+# Дочерние процессы: run_command_cwd (source=run_command), --help (source=help) и очередь /api/run (source=job)
+SUBPROCESSES = REGISTRY.counter("uc_subprocesses_total", "Finished subprocesses by outcome", ("source", "outcome"))
+SUBPROCESS_SECONDS = REGISTRY.histogram("uc_subprocess_duration_seconds", "Subprocess wall time", ("source",))
+SUBPROCESSES_RUNNING = REGISTRY.gauge("uc_subprocesses_running", "Subprocesses currently running", ("source",))
+# Ресурсы запусков /api/run в песочнице (отчет wait4 запускателя web/sandbox.py)
+JOB_MAX_RSS_BYTES = REGISTRY.histogram(
+    "uc_job_max_rss_bytes", "Peak resident memory of a sandboxed run", buckets=[float(1 << n) for n in range(24, 37)]
+)
+JOB_CPU_SECONDS = REGISTRY.counter("uc_job_cpu_seconds_total", "User+system CPU time of sandboxed runs")
+
+# Скан репозитория
+SCAN_SECONDS = REGISTRY.histogram("uc_scan_duration_seconds", "Whole scan_repo / iter_scan_repo time", ("mode",))
+SCAN_PARSE_SECONDS = REGISTRY.histogram("uc_scan_parse_seconds", "Time spent parsing changed files in one scan", ("mode",))
+SCAN_FILES = REGISTRY.counter("uc_scan_files_total", "Scanned files by result", ("result",))
+
+# Инференс: время вызова модели (одиночный и пакетный) и число обработанных входов
+INFER_SECONDS = REGISTRY.histogram("uc_infer_duration_seconds", "Model call latency", ("kind",))
+INFER_ITEMS = REGISTRY.counter("uc_infer_items_total", "Inference inputs processed", ("kind", "outcome"))
+
+
+def subprocess_outcome(returncode: int) -> str:
+    if returncode == 0:
+        return "ok"
+    return "timeout" if returncode == 124 else "error"
+
+
+class track_subprocess:
+    """
+    with track_subprocess("help") as t: ...; t.outcome = subprocess_outcome(rc) —
+    число запущенных, длительность и исход дочернего процесса (по умолчанию outcome="failed").
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.outcome = "failed"
+
+    def __enter__(self) -> "track_subprocess":
+        SUBPROCESSES_RUNNING.labels(self.source).inc()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        SUBPROCESSES_RUNNING.labels(self.source).dec()
+        SUBPROCESS_SECONDS.labels(self.source).observe(time.perf_counter() - self.t0)
+        SUBPROCESSES.labels(self.source, self.outcome).inc()
+
+
+def _rss_bytes() -> Optional[float]:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _children_max_rss_bytes() -> Optional[float]:
+    if resource is None:
+        return None
+    # Linux отдает ru_maxrss в КБ (macOS — в байтах, там значение будет завышено)
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+
+
+_START_TIME = time.time()
+REGISTRY.func("process_resident_memory_bytes", "gauge", "Resident memory of the server process", _rss_bytes)
+REGISTRY.func("process_cpu_seconds_total", "counter", "CPU time of the server process", time.process_time)
+REGISTRY.func("process_start_time_seconds", "gauge", "Server start time (unix)", lambda: _START_TIME)
+REGISTRY.func("uc_subprocess_max_rss_bytes", "gauge", "Peak resident memory of any reaped subprocess", _children_max_rss_bytes)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность каждого запроса (до конца тела ответа, включая потоковые)
+    в uc_http_request_duration_seconds. Маршрут берется из scope["route"] после маршрутизации;
+    запросы вне маршрутов (404, /static) попадают в route="<other>".
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.labels().inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_REQUESTS_IN_PROGRESS.labels().dec()
+            route = getattr(scope.get("route"), "path", None) or "<other>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(elapsed)
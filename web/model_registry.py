@@ -0,0 +1,147 @@
+# =========================
+# Файл: web/model_registry.py
+# =========================
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def model_key(config: Dict[str, Any]) -> str:
+    """Ключ модели: секция model + runtime.device в каноническом JSON."""
+    model_cfg = config.get("model", {}) or {}
+    device = (config.get("runtime", {}) or {}).get("device", "cpu")
+    return json.dumps({"model": model_cfg, "device": device}, sort_keys=True, ensure_ascii=False)
+
+
+def estimate_nbytes(model: Any) -> int:
+    """Грубая оценка памяти модели: torch-параметры, nbytes или 0, если неизвестно."""
+    params = getattr(model, "parameters", None)
+    if callable(params):
+        try:
+            return sum(p.numel() * p.element_size() for p in params())
+        except Exception:
+            pass
+    nbytes = getattr(model, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return 0
+
+
+class ModelEntry:
+    def __init__(self, key: str, model: Any, nbytes: int, load_seconds: float):
+        self.key = key
+        self.model = model
+        self.nbytes = nbytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": json.loads(self.key),
+            "nbytes": self.nbytes,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used,
+            "hits": self.hits,
+        }
+
+
+class ModelRegistry:
+    """
+    Резидентные модели в памяти процесса. Каждая конфигурация загружается один раз
+    (параллельные запросы ждут одну загрузку), дальше отдается из памяти.
+    При превышении memory_budget байт или max_models вытесняются давно не использованные (LRU).
+    Размер модели — sizeof(model); модели с неизвестным размером (0) ограничивает только max_models.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Dict[str, Any]], Any],
+        memory_budget: int = 2 << 30,
+        max_models: int = 4,
+        sizeof: Callable[[Any], int] = estimate_nbytes,
+    ):
+        self.loader = loader
+        self.memory_budget = memory_budget
+        self.max_models = max_models
+        self.sizeof = sizeof
+        self.entries: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, config: Dict[str, Any]) -> Any:
+        key = model_key(config)
+        entry = self._touch(key)
+        if entry is not None:
+            return entry.model
+        with self.lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            # пока ждали, модель мог загрузить соседний запрос
+            entry = self._touch(key)
+            if entry is not None:
+                return entry.model
+            try:
+                t0 = time.perf_counter()
+                model = self.loader(config)
+                entry = ModelEntry(key, model, self.sizeof(model), time.perf_counter() - t0)
+                with self.lock:
+                    self.entries[key] = entry
+                    self.loads += 1
+                    self._evict(keep=key)
+                return model
+            finally:
+                # и после ошибки загрузчика: иначе замки неудачных ключей копятся в _loading
+                with self.lock:
+                    self._loading.pop(key, None)
+
+    def _touch(self, key: str) -> Optional[ModelEntry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            entry.last_used = time.time()
+            entry.hits += 1
+            return entry
+
+    def _evict(self, keep: str) -> None:
+        # вызывается под self.lock; только что загруженную модель не трогаем
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.max_models or self.used_bytes() > self.memory_budget
+        ):
+            oldest = next(iter(self.entries))
+            if oldest == keep:
+                break
+            del self.entries[oldest]
+            self.evictions += 1
+
+    def used_bytes(self) -> int:
+        return sum(e.nbytes for e in self.entries.values())
+
+    def evict(self, config: Optional[Dict[str, Any]] = None) -> int:
+        """Выгрузить одну модель (по конфигу) или все; возвращает число выгруженных."""
+        with self.lock:
+            if config is None:
+                n = len(self.entries)
+                self.entries.clear()
+                return n
+            return 1 if self.entries.pop(model_key(config), None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            models: List[Dict[str, Any]] = [e.to_dict() for e in self.entries.values()]
+            return {
+                "models": models,
+                "used_bytes": self.used_bytes(),
+                "memory_budget": self.memory_budget,
+                "max_models": self.max_models,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,291 @@
+# =========================
+# Файл: web/repo_manager.py
+# =========================
+import re
+import time
+import uuid
+import threading
+import subprocess
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .metrics import subprocess_outcome, track_subprocess
+
+
+class RepoBusy(RuntimeError):
+    """Репозиторий сейчас клонируется или обновляется."""
+
+    def __init__(self, op: Optional["RepoOp"]):
+        super().__init__("Repository is being fetched, retry later.")
+        self.op = op
+
+FINAL_STATUSES = ("done", "failed")
+# "Receiving objects:  45% (9/20)" — фаза и процент из --progress
+PROGRESS_RE = re.compile(r"^(?:remote: )?([A-Za-z][A-Za-z ]+):\s+(\d+)%")
+# Шаблоны sparse-checkout для UC_CLONE_SPARSE=scan: только то, что читает сканер
+SCAN_SPARSE_PATTERNS = ["*.py", "*.cfg", "*.toml", "*.ini", "requirements*.txt", "*.yaml", "*.yml", "*.json", "README*"]
+
+
+class RepoOp:
+    """Одна фоновая операция над репозиторием (clone или update) с прогрессом git --progress."""
+
+    def __init__(self, target: Path, url: str, action: str, log_lines: int = 200):
+        self.id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.url = url
+        self.action = action
+        self.status = "queued"
+        self.phase: Optional[str] = None
+        self.percent: Optional[int] = None
+        self.step: Optional[str] = None
+        self.returncode: Optional[int] = None
+        self.error: Optional[str] = None
+        self.log: Deque[str] = deque(maxlen=log_lines)
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def to_dict(self, with_log: bool = True) -> Dict[str, Any]:
+        res = {
+            "id": self.id,
+            "target": str(self.target),
+            "action": self.action,
+            "status": self.status,
+            "step": self.step,
+            "phase": self.phase,
+            "percent": self.percent,
+            "returncode": self.returncode,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if with_log:
+            res["log"] = "\n".join(self.log)
+        return res
+
+
+class RepoLock:
+    """
+    Замок каталога репозитория: читать (скан, индекс, справка) могут сразу несколько,
+    писать (clone/fetch) — один и только когда читателей нет. Ожидающий писатель не пускает
+    новых читателей. Не привязан к потоку — можно освободить из другого потока
+    (потоковый ответ StreamingResponse отдает чанки из разных потоков пула).
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+
+    def acquire_read(self, blocking: bool = True) -> bool:
+        with self.cond:
+            if not blocking and (self.writer or self.writers_waiting):
+                return False
+            while self.writer or self.writers_waiting:
+                self.cond.wait()
+            self.readers += 1
+            return True
+
+    def release_read(self) -> None:
+        with self.cond:
+            self.readers -= 1
+            if self.readers == 0:
+                self.cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self.cond:
+            self.writers_waiting += 1
+            try:
+                while self.writer or self.readers:
+                    self.cond.wait()
+            finally:
+                self.writers_waiting -= 1
+            self.writer = True
+
+    def release_write(self) -> None:
+        with self.cond:
+            self.writer = False
+            self.cond.notify_all()
+
+
+class RepoManager:
+    """
+    Клонирование и обновление репозиториев в фоне. Новый репозиторий клонируется
+    поверхностно (depth) и без содержимого файлов (filter=blob:none — блобы докачиваются
+    при checkout), опционально со sparse-checkout. На каждый путь — свой замок: пока идет
+    clone/fetch, повторный sync возвращает ту же операцию, а сканер может проверить
+    busy()/lock() и не читать дерево посередине обновления.
+    """
+
+    def __init__(
+        self,
+        depth: Optional[int] = 1,
+        filter: Optional[str] = "blob:none",
+        sparse: Optional[List[str]] = None,
+        sparse_cone: bool = True,
+        timeout: int = 1800,
+        max_history: int = 50,
+    ):
+        self.depth = depth
+        self.filter = filter
+        self.sparse = sparse
+        self.sparse_cone = sparse_cone
+        self.timeout = timeout
+        self.max_history = max_history
+        self.ops: "OrderedDict[str, RepoOp]" = OrderedDict()
+        self.active: Dict[str, RepoOp] = {}
+        self.locks: Dict[str, RepoLock] = {}
+        self.guard = threading.Lock()
+
+    def lock(self, target: Path) -> RepoLock:
+        key = str(Path(target).resolve())
+        with self.guard:
+            return self.locks.setdefault(key, RepoLock())
+
+    @contextmanager
+    def reading(self, target: Path) -> Iterator[None]:
+        """Чтение дерева репозитория; если идет clone/fetch — сразу RepoBusy, без ожидания."""
+        lock = self.lock(target)
+        if not lock.acquire_read(blocking=False):
+            raise RepoBusy(self.busy(target))
+        try:
+            yield
+        finally:
+            lock.release_read()
+
+    def busy(self, target: Path) -> Optional[RepoOp]:
+        with self.guard:
+            return self.active.get(str(Path(target).resolve()))
+
+    def sync(
+        self,
+        url: str,
+        target: Path,
+        branch: Optional[str] = None,
+        sparse: Optional[List[str]] = None,
+    ) -> RepoOp:
+        """Запустить clone (если каталога нет) или update в фоне; идущая операция для того же пути переиспользуется."""
+        target = Path(target)
+        key = str(target.resolve())
+        with self.guard:
+            op = self.active.get(key)
+            if op is not None:
+                return op
+            op = RepoOp(target, url, "update" if (target / ".git").exists() else "clone")
+            self.active[key] = op
+            self.ops[op.id] = op
+            self._prune()
+        sparse = self.sparse if sparse is None else sparse
+        threading.Thread(target=self._run, args=(op, key, branch, sparse), name=f"repo-{op.id}", daemon=True).start()
+        return op
+
+    def get(self, op_id: str) -> Optional[RepoOp]:
+        return self.ops.get(op_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.guard:
+            return [op.to_dict(with_log=False) for op in self.ops.values()]
+
+    def _run(self, op: RepoOp, key: str, branch: Optional[str], sparse: Optional[List[str]]) -> None:
+        lock = self.lock(op.target)
+        try:
+            lock.acquire_write()  # ждет завершения идущих сканов
+            try:
+                op.status = "running"
+                op.started_at = time.time()
+                if op.action == "clone":
+                    self._clone(op, branch, sparse)
+                else:
+                    self._update(op, sparse)
+                op.status = "done"
+            finally:
+                lock.release_write()
+        except Exception as e:
+            op.status = "failed"
+            op.error = str(e)
+        finally:
+            op.finished_at = time.time()
+            with self.guard:
+                self.active.pop(key, None)
+            op.done.set()
+
+    def _clone(self, op: RepoOp, branch: Optional[str], sparse: Optional[List[str]]) -> None:
+        op.target.parent.mkdir(parents=True, exist_ok=True)
+        cmd = ["git", "clone", "--progress", "--no-checkout"]
+        if self.depth:
+            cmd += ["--depth", str(self.depth)]
+        if self.filter:
+            cmd += [f"--filter={self.filter}"]
+        if branch:
+            cmd += ["--branch", branch]
+        self._git(op, "clone", cmd + [op.url, str(op.target)])
+        if sparse:
+            self._sparse(op, sparse)
+        # при filter=blob:none содержимое файлов скачивается здесь — только для sparse-путей
+        self._git(op, "checkout", ["git", "-C", str(op.target), "checkout", "--progress"])
+
+    def _update(self, op: RepoOp, sparse: Optional[List[str]]) -> None:
+        if sparse:
+            self._sparse(op, sparse)
+        # без --depth: у shallow-клона pull докачивает только новые коммиты поверх границы,
+        # а повторный --depth 1 обрезал бы историю и rebase счел бы ее несвязанной
+        self._git(op, "pull", ["git", "-C", str(op.target), "pull", "--rebase", "--progress"])
+
+    def _sparse(self, op: RepoOp, sparse: List[str]) -> None:
+        patterns = SCAN_SPARSE_PATTERNS if sparse == ["scan"] else sparse
+        # шаблоны файлов (*.py) требуют no-cone режима; каталоги — быстрый cone
+        cone = self.sparse_cone and sparse != ["scan"] and not any("*" in p for p in patterns)
+        mode = "--cone" if cone else "--no-cone"
+        self._git(op, "sparse-checkout", ["git", "-C", str(op.target), "sparse-checkout", "set", mode] + list(patterns))
+
+    def _git(self, op: RepoOp, step: str, cmd: List[str]) -> None:
+        """Выполнить git-команду, разбирая прогресс из stderr (строки разделены \\r и \\n)."""
+        op.step = step
+        op.phase = op.percent = None
+        op.log.append("$ " + " ".join(cmd))
+        with track_subprocess("git") as t:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+            timer = threading.Timer(self.timeout, proc.kill)
+            timer.start()
+            try:
+                buf = b""
+                while True:
+                    chunk = proc.stdout.read1(4096) if hasattr(proc.stdout, "read1") else proc.stdout.read(4096)
+                    if not chunk:
+                        break
+                    buf += chunk
+                    parts = re.split(rb"[\r\n]", buf)
+                    buf = parts.pop()
+                    for raw in parts:
+                        self._line(op, raw.decode("utf-8", errors="replace").strip())
+                if buf:
+                    self._line(op, buf.decode("utf-8", errors="replace").strip())
+                proc.wait()
+            finally:
+                timer.cancel()
+            op.returncode = proc.returncode
+            t.outcome = subprocess_outcome(proc.returncode)
+        if proc.returncode != 0:
+            raise RuntimeError(f"git {step} failed with code {proc.returncode}")
+
+    def _line(self, op: RepoOp, line: str) -> None:
+        if not line:
+            return
+        m = PROGRESS_RE.match(line)
+        if m:
+            op.phase, op.percent = m.group(1).strip(), int(m.group(2))
+            # строки прогресса перезаписывают друг друга — в журнал попадает только последняя по фазе
+            if op.log and PROGRESS_RE.match(op.log[-1]) and PROGRESS_RE.match(op.log[-1]).group(1) == m.group(1):
+                op.log[-1] = line
+                return
+        op.log.append(line)
+
+    def _prune(self) -> None:
+        finished = [oid for oid, op in self.ops.items() if op.status in FINAL_STATUSES]
+        for oid in finished[: max(0, len(finished) - self.max_history)]:
+            del self.ops[oid]
@@ -0,0 +1,248 @@
+# =========================
+# Файл: web/repo_registry.py
+# =========================
+import os
+import re
+import json
+import time
+import shutil
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .jobs import JobManager
+from .sandbox import SandboxPolicy
+
+REPO_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+# Состояние процесса репозитория: корень checkout и каталог кешей, задаются инициализатором
+_worker: Dict[str, Any] = {}
+
+
+def init_repo_worker(repo_root: str, cache_dir: str) -> None:
+    """Инициализатор процесса репозитория: UC импортируется только из своего checkout."""
+    from .uc_api import set_repo_root
+    _worker["root"] = Path(repo_root)
+    _worker["cache_dir"] = Path(cache_dir)
+    set_repo_root(_worker["root"])
+
+
+def worker_scan(workers: int, chunksize: int) -> Dict[str, Any]:
+    from .scanner import scan_repo
+    from .scan_cache import get_scan_cache
+    # кеш скана живет в памяти процесса репозитория между запросами и в своем файле на диске
+    cache = get_scan_cache(_worker["root"], _worker["cache_dir"])
+    scan = scan_repo(_worker["root"], cache=cache, workers=workers, chunksize=chunksize)
+    return {"scan": scan, "cache": cache.stats()}
+
+
+def worker_entrypoints() -> Dict[str, Any]:
+    from .scanner import detect_entrypoints
+    return detect_entrypoints(_worker["root"])
+
+
+def worker_uc(op: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    from . import uc_api
+    if op == "train":
+        return uc_api.train(config)
+    if op == "eval":
+        return uc_api.eval_model(config)
+    return {"ok": False, "error": f"Unknown operation: {op}"}
+
+
+class RepoEntry:
+    """
+    Зарегистрированный checkout: свой каталог, своя очередь запусков (JobManager) и свой процесс
+    (spawn, один на репозиторий), в котором выполняются скан, поиск entrypoints и вызовы uc_api.
+    Два checkout разных версий UC поэтому никогда не оказываются в одном sys.path.
+    """
+
+    def __init__(self, id: str, url: str, root: Path, cache_dir: Path, branch: Optional[str], jobs: JobManager):
+        self.id = id
+        self.url = url
+        self.root = root
+        self.cache_dir = cache_dir
+        self.branch = branch
+        self.jobs = jobs
+        self.created_at = time.time()
+        self.builtin = False
+        self.lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_repo_worker,
+                    initargs=(str(self.root), str(self.cache_dir)),
+                )
+            return self._pool
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Выполнить fn в процессе репозитория; упавший процесс пересоздается один раз."""
+        try:
+            return self.pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self.stop()
+            return self.pool().submit(fn, *args)
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """await-вариант submit; если процесс упал во время вызова — он пересоздастся при следующем."""
+        try:
+            return await asyncio.wrap_future(self.submit(fn, *args))
+        except BrokenProcessPool as e:
+            self.stop()
+            raise RuntimeError(f"Repository worker crashed: {e}")
+
+    def stop(self, wait: bool = False) -> None:
+        with self.lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "branch": self.branch,
+            "root": str(self.root),
+            "cloned": (self.root / ".git").exists(),
+            "builtin": self.builtin,
+            "worker": self._pool is not None,
+            "jobs": self.jobs.counts(),
+            "created_at": self.created_at,
+        }
+
+
+class RepoRegistry:
+    """
+    Реестр репозиториев: id -> RepoEntry. Checkout лежит в repos_dir/<id>, кеши — в
+    cache_dir/repos/<id>, логи запусков — в log_dir/<id>; политика sandbox общая для всех очередей. Список (id, url, branch) хранится
+    в state_path и восстанавливается при старте.
+    """
+
+    def __init__(
+        self,
+        repos_dir: Path,
+        cache_dir: Path,
+        state_path: Path,
+        max_concurrent: int = 2,
+        max_queued: int = 32,
+        log_lines: int = 1000,
+        log_dir: Optional[Path] = None,
+        sandbox: Optional[SandboxPolicy] = None,
+    ):
+        self.repos_dir = Path(repos_dir)
+        self.cache_dir = Path(cache_dir)
+        self.state_path = Path(state_path)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.log_lines = log_lines
+        self.log_dir = log_dir
+        self.sandbox = sandbox
+        self.repos: Dict[str, RepoEntry] = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in items:
+            if REPO_ID_RE.match(str(item.get("id", ""))) and item.get("url"):
+                self.repos[item["id"]] = self._entry(item["id"], item["url"], item.get("branch"))
+
+    def _save(self) -> None:
+        # вызывается под self.lock
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        items = [{"id": e.id, "url": e.url, "branch": e.branch} for e in self.repos.values() if not e.builtin]
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(items, ensure_ascii=False, indent=2))
+        os.replace(tmp, self.state_path)
+
+    def _entry(self, repo_id: str, url: str, branch: Optional[str]) -> RepoEntry:
+        jobs = JobManager(
+            max_concurrent=self.max_concurrent,
+            max_queued=self.max_queued,
+            log_lines=self.log_lines,
+            log_dir=Path(self.log_dir) / repo_id if self.log_dir is not None else None,
+            sandbox=self.sandbox,
+        )
+        return RepoEntry(repo_id, url, self.repos_dir / repo_id, self.cache_dir / "repos" / repo_id, branch, jobs)
+
+    def add(self, repo_id: str, url: str, branch: Optional[str] = None) -> RepoEntry:
+        """Зарегистрировать checkout; повторная регистрация с теми же url/branch возвращает существующий."""
+        if not REPO_ID_RE.match(repo_id):
+            raise ValueError("Repository id must match [A-Za-z0-9][A-Za-z0-9._-]* (up to 64 chars)")
+        with self.lock:
+            entry = self.repos.get(repo_id)
+            if entry is not None:
+                if entry.url != url or entry.branch != branch:
+                    raise KeyError(f"Repository {repo_id} is already registered with another url/branch")
+                return entry
+            entry = self.repos[repo_id] = self._entry(repo_id, url, branch)
+            self._save()
+            return entry
+
+    def ensure(self, repo_id: str, url: str, jobs: JobManager) -> RepoEntry:
+        """
+        Встроенный репозиторий (UC_ROOT): общая с /api/run очередь, в state_path не записывается.
+        Кеши процесса — в cache_dir/repos/<id>, как у остальных: файл индекса скана у /api/scan
+        основного процесса свой, два процесса не перезаписывают один и тот же файл.
+        """
+        with self.lock:
+            entry = self.repos.get(repo_id)
+            if entry is None:
+                entry = self.repos[repo_id] = RepoEntry(repo_id, url, self.repos_dir / repo_id, self.cache_dir / "repos" / repo_id, None, jobs)
+                entry.builtin = True
+            return entry
+
+    def get(self, repo_id: str) -> Optional[RepoEntry]:
+        return self.repos.get(repo_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [e.to_dict() for e in self.repos.values()]
+
+    async def remove(self, repo_id: str, purge: bool = False) -> Optional[RepoEntry]:
+        """
+        Снять с регистрации, отменить запуски в очереди и выполняющиеся, остановить процесс;
+        purge=True — затем удалить checkout и кеши (процесс репозитория перед этим дожидаемся,
+        чтобы ни запуск, ни воркер не работали в удаляемом дереве).
+        """
+        with self.lock:
+            entry = self.repos.get(repo_id)
+            if entry is None:
+                return None
+            if entry.builtin:
+                raise KeyError(f"Repository {repo_id} is built in and cannot be removed")
+            del self.repos[repo_id]
+            self._save()
+        # после удаления из реестра новые запуски в этот репозиторий не попадут
+        await entry.jobs.cancel_all()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, entry.stop, purge)
+        if purge:
+            await loop.run_in_executor(None, shutil.rmtree, entry.root, True)
+            await loop.run_in_executor(None, shutil.rmtree, entry.cache_dir, True)
+        return entry
+
+    def job_manager(self, job_id: str) -> Optional[JobManager]:
+        """Очередь репозитория, в которой есть запуск job_id (id запусков уникальны между репозиториями)."""
+        for entry in list(self.repos.values()):
+            if entry.jobs.get(job_id) is not None:
+                return entry.jobs
+        return None
+
+    def shutdown(self) -> None:
+        for entry in list(self.repos.values()):
+            entry.stop()
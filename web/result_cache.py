@@ -0,0 +1,184 @@
+# =========================
+# Файл: web/result_cache.py
+# =========================
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Запомненных хешей датасетов (LRU): по одному на (путь, размер, mtime)
+DIGEST_MEMO_SIZE = 256
+# Вытеснение освобождает место до этой доли max_bytes, чтобы следующие записи не сканировали каталог снова
+EVICT_LOW_WATER = 0.9
+
+
+def canonical_hash(obj: Any) -> str:
+    """sha256 канонического JSON: порядок ключей и пробелы не влияют на хеш."""
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def dataset_fingerprint(path: Optional[str]) -> Dict[str, Any]:
+    """
+    Отпечаток файла датасета: размер, mtime и sha256 содержимого.
+    Хеш запоминается по (путь, размер, mtime_ns) — последние DIGEST_MEMO_SIZE файлов, поэтому
+    неизменный файл обычно читается один раз за процесс.
+    """
+    if not path:
+        return {"path": None}
+    p = Path(path)
+    try:
+        st = p.stat()
+    except OSError:
+        return {"path": str(p), "missing": True}
+    key = (str(p.resolve()), st.st_size, st.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _digests_lock:
+            _digests[key] = digest
+            while len(_digests) > DIGEST_MEMO_SIZE:
+                _digests.popitem(last=False)
+    return {"path": str(p), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+
+class ResultCache:
+    """
+    Персистентный кеш результатов: один JSON-файл на ключ в cache_dir.
+    Записи старше ttl секунд не отдаются; при превышении max_bytes удаляются просроченные и самые
+    старые. Размеры записей учитываются в памяти (каталог читается один раз — при первом обращении),
+    так что put не сканирует каталог; полный проход — только когда сумма перевалила за max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path, ttl: float = 86400, max_bytes: int = 256 << 20):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # имя файла -> (mtime, размер); None — каталог еще не прочитан
+        self._index: Optional[Dict[str, Tuple[float, int]]] = None
+        self._total = 0
+
+    def _ensure_index(self) -> Dict[str, Tuple[float, int]]:
+        # вызывается под self.lock
+        if self._index is None:
+            self._reindex()
+        return self._index
+
+    def _reindex(self) -> None:
+        # вызывается под self.lock; заодно подхватывает записи других процессов с тем же каталогом
+        self._index = {p.name: (mtime, size) for mtime, size, p in self._entries()}
+        self._total = sum(size for _, size in self._index.values())
+
+    def _forget(self, name: str) -> None:
+        # вызывается под self.lock
+        if self._index is not None and name in self._index:
+            self._total -= self._index.pop(name)[1]
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        p = self._path(key)
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            p.unlink(missing_ok=True)
+            with self.lock:
+                self.misses += 1
+                self._forget(p.name)
+            return None
+        with self.lock:
+            self.hits += 1
+        return entry["result"]
+
+    def put(self, key: str, result: Any, meta: Optional[Dict[str, Any]] = None) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        p = self._path(key)
+        tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        data = json.dumps({"created_at": time.time(), "meta": meta or {}, "result": result}, ensure_ascii=False).encode("utf-8")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        with self.lock:
+            index = self._ensure_index()
+            os.replace(tmp, p)
+            self._forget(p.name)
+            index[p.name] = (time.time(), len(data))
+            self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        if not self.cache_dir.exists():
+            return []
+        res = []
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            res.append((st.st_mtime, st.st_size, p))
+        return res
+
+    def _evict(self) -> None:
+        """Удалить просроченные, затем самые старые записи до EVICT_LOW_WATER * max_bytes (под self.lock)."""
+        self._reindex()
+        now = time.time()
+        limit = self.max_bytes * EVICT_LOW_WATER
+        for name, (mtime, size) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+            if self._total <= limit and now - mtime <= self.ttl:
+                continue
+            (self.cache_dir / name).unlink(missing_ok=True)
+            self._forget(name)
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Удалить одну запись или весь кеш; возвращает число удаленных файлов."""
+        with self.lock:
+            if key is not None:
+                p = self._path(key)
+                self._forget(p.name)
+                if p.exists():
+                    p.unlink(missing_ok=True)
+                    return 1
+                return 0
+            removed = 0
+            for _, _, p in self._entries():
+                p.unlink(missing_ok=True)
+                removed += 1
+            self._index, self._total = {}, 0
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            index = self._ensure_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(index),
+                "bytes": self._total,
+                "ttl": self.ttl,
+                "max_bytes": self.max_bytes,
+                "dir": str(self.cache_dir),
+            }
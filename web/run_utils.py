@@ -4,61 +4,149 @@
 import os
 import json
 import shlex
+import signal
+import threading
 import subprocess
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from .metrics import subprocess_outcome, track_subprocess
+from .config_store import bind_config_args, config_name, get_config_store
+from .sandbox import SandboxPolicy, read_usage
+
 def write_configs(configs_dir: Path, config_files: Dict[str, Any]) -> List[str]:
     """
     Сохраняем конфиги из словаря в папку configs_dir.
     Каждый ключ = имя файла, значение = содержимое (dict/str).
+    Запись атомарная (временный файл + os.replace), файл с тем же содержимым не переписывается.
+    Для запусков — ConfigStore: там у каждого набора конфигов свой неизменяемый каталог.
     """
     configs_dir.mkdir(parents=True, exist_ok=True)
     written: List[str] = []
     for name, content in config_files.items():
         if content is None:
             continue
-        if not name.endswith((".json", ".yaml", ".yml")):
-            name = f"{name}.json"
-        path = configs_dir / name
-        with open(path, "w", encoding="utf-8") as f:
-            if isinstance(content, (dict, list)):
-                json.dump(content, f, ensure_ascii=False, indent=2)
-            else:
-                f.write(str(content))
+        path = configs_dir / config_name(name)
+        if isinstance(content, (dict, list)):
+            data = json.dumps(content, ensure_ascii=False, indent=2).encode("utf-8")
+        else:
+            data = str(content).encode("utf-8")
+        try:
+            with open(path, "rb") as f:
+                unchanged = f.read() == data
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            # pid и поток в имени: одновременные записи из потоков одного процесса не делят временный файл
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
         written.append(str(path))
     return written
 
+def prepare_run_configs(
+    store_dir: Path,
+    args: List[str],
+    config_files: Optional[Dict[str, Any]],
+    env_add: Optional[Dict[str, str]] = None,
+) -> Tuple[List[str], Optional[Dict[str, str]], Dict[str, str]]:
+    """
+    Конфиги запуска в ConfigStore: (args со ссылками на неизменяемые пути, env_add с UC_CONFIGS_DIR
+    на каталог набора, {имя: путь}). Без config_files args и env_add возвращаются как есть.
+    """
+    if not config_files:
+        return args, env_add, {}
+    set_dir, paths = get_config_store(store_dir).put_set(config_files)
+    env = dict(env_add or {})
+    env["UC_CONFIGS_DIR"] = str(set_dir)
+    return bind_config_args(args, paths), env, paths
+
 def detect_python() -> str:
     return os.environ.get("PYTHON", "python")
 
+def build_env(repo_root: Path, env_add: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Окружение дочернего процесса: текущее + PYTHONPATH на репозиторий + env_add."""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(repo_root)
+    if env_add:
+        env.update(env_add)
+    return env
+
+def main_module_cmd(args: List[str], python_path: Optional[str] = None) -> List[str]:
+    """
+    [python, __main__.py, *args] — запуск UC из корня репозитория (cwd). "python -m __main__"
+    не работает: модуль __main__ уже занят самим интерпретатором (__main__.__spec__ is None).
+    """
+    return [python_path or detect_python(), "__main__.py"] + list(args)
+
 def run_command_cwd(
     repo_root: Path,
     cmdline: str,
     env_add: Optional[Dict[str, str]] = None,
     timeout: Optional[int] = 600,
     cwd: Optional[Path] = None,
+    sandbox: Optional[SandboxPolicy] = None,
+    usage: Optional[Dict[str, Any]] = None,
 ) -> Tuple[int, str, str]:
+    """
+    Запуск cmdline (разбивается shlex.split, без shell). С sandbox — через запускатель web/sandbox.py
+    с его лимитами в отдельной группе процессов; отчет о ресурсах (пиковая память, CPU-время)
+    дописывается в словарь usage, если он передан.
+    """
     cwd = cwd or repo_root
-    env = os.environ.copy()
-    env["PYTHONPATH"] = str(repo_root)
-    if env_add:
-        env.update(env_add)
-    try:
-        proc = subprocess.run(
-            cmdline,
-            shell=False,  # безопаснее, если cmdline приходит как список; здесь строка — разобьём ниже
-            capture_output=True,
-            text=True,
-            env=env,
-            cwd=str(cwd),
-            timeout=timeout
-        )
-        return proc.returncode, proc.stdout, proc.stderr
-    except subprocess.TimeoutExpired as e:
-        return 124, "", f"Timeout: {timeout}s"
-    except Exception as e:
-        return 2, "", f"Run failed: {e}"
+    env = build_env(repo_root, env_add)
+    cmd = shlex.split(cmdline)
+    sandbox = sandbox if sandbox is not None and sandbox.enabled else None
+    cpus: List[int] = []
+    usage_r = usage_w = None
+    kwargs: Dict[str, Any] = {}
+    if sandbox is not None:
+        cpus = sandbox.allocator.acquire() if sandbox.allocator is not None else []
+        usage_r, usage_w = os.pipe()
+        cmd = sandbox.wrap(cmd, usage_w, cpus)
+        kwargs = {"pass_fds": (usage_w,), "start_new_session": True}
+    with track_subprocess("run_command") as t:
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                env=env,
+                cwd=str(cwd),
+                **kwargs,
+            )
+            if usage_w is not None:
+                os.close(usage_w)
+                usage_w = None
+            try:
+                out, err = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                # в песочнице убиваем всю группу — вместе с потомками команды
+                if sandbox is not None:
+                    try:
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                else:
+                    proc.kill()
+                proc.communicate()
+                t.outcome = "timeout"
+                return 124, "", f"Timeout: {timeout}s"
+            t.outcome = subprocess_outcome(proc.returncode)
+            return proc.returncode, out, err
+        except Exception as e:
+            return 2, "", f"Run failed: {e}"
+        finally:
+            if usage_w is not None:
+                os.close(usage_w)
+            if usage_r is not None:
+                report = read_usage(usage_r)
+                if usage is not None and report is not None:
+                    usage.update(report)
+            if cpus:
+                sandbox.allocator.release(cpus)
 
 def run_command_from_args(
     repo_root: Path,
@@ -66,28 +154,30 @@ def run_command_from_args(
     config_map: Optional[Dict[str, Any]] = None,
     env_add: Optional[Dict[str, str]] = None,
     timeout: Optional[int] = 600,
-    python_path: Optional[str] = None
+    python_path: Optional[str] = None,
+    sandbox: Optional[SandboxPolicy] = None,
 ) -> Tuple[int, str, str]:
     """
-    Запуск команды как [python, -m, <module>, <...>].
-    Если config_map не пуст — подменяем конфиги в data/configs/.
+    Запуск команды как [python, __main__.py, <...>] из корня репозитория (см. main_module_cmd).
+    Если config_map не пуст — конфиги кладутся в хранилище data/configs/store, а ссылки
+    на них в args заменяются неизменяемыми путями (см. prepare_run_configs).
     """
     repo_root = Path(repo_root)
-    config_map = config_map or {}
-    written = []
-    if config_map:
-        configs_dir = repo_root.parent / "data" / "configs"
-        written = write_configs(configs_dir, config_map)
+    args, env_add, _ = prepare_run_configs(repo_root.parent / "data" / "configs" / "store", args, config_map, env_add)
 
-    python = python_path or detect_python()
-    full_cmd = [python, "-m", "__main__"] + args
-    return run_command_cwd(repo_root, " ".join(shlex.quote(c) for c in full_cmd), env_add=env_add, timeout=timeout, cwd=repo_root)
+    full_cmd = main_module_cmd(args, python_path)
+    return run_command_cwd(repo_root, " ".join(shlex.quote(c) for c in full_cmd), env_add=env_add, timeout=timeout, cwd=repo_root, sandbox=sandbox)
 
 def simple_shell_run(
     repo_root: Path,
     cmd: str,
     env_add: Optional[Dict[str, str]] = None,
-    timeout: Optional[int] = 600
+    timeout: Optional[int] = 600,
+    sandbox: Optional[SandboxPolicy] = None,
 ) -> Tuple[int, str, str]:
-    """Универсальный shell-вариант (менее безопасно). Используйте только если понимаете, что запускаете."""
-    return run_command_cwd(repo_root, cmd, env_add=env_add, timeout=timeout, cwd=repo_root)
+    """
+    Произвольная команда строкой (менее безопасно). Используйте только если понимаете, что запускаете.
+    Всегда в песочнице: без явной политики — SandboxPolicy.from_env() (лимиты UC_RUN_*).
+    """
+    sandbox = sandbox if sandbox is not None else SandboxPolicy.from_env()
+    return run_command_cwd(repo_root, cmd, env_add=env_add, timeout=timeout, cwd=repo_root, sandbox=sandbox)
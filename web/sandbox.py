@@ -0,0 +1,261 @@
+# =========================
+# Файл: web/sandbox.py
+# =========================
+# Запуск команд с ограничениями. Файл работает в двух ролях:
+#  - как модуль web.sandbox: SandboxPolicy (лимиты из окружения) и CpuAllocator (привязка к ядрам);
+#  - как скрипт-запускатель (python -I -S web/sandbox.py ... -- cmd): fork, в дочернем процессе
+#    setrlimit/nice/sched_setaffinity и exec команды, затем wait4 — пиковая память и CPU-время
+#    именно этого запуска (вместе с его дочерними процессами) пишутся JSON-ом в --usage-fd.
+# Поэтому здесь только стандартная библиотека и никаких относительных импортов.
+import os
+import sys
+import json
+import time
+import signal
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: лимиты и wait4 недоступны, песочница выключается
+    resource = None
+
+def _rlimit(name: str) -> Optional[int]:
+    return getattr(resource, f"RLIMIT_{name.upper()}", None) if resource is not None else None
+
+
+def parse_cpus(spec: str) -> List[int]:
+    """"0-3,6" -> [0, 1, 2, 3, 6]."""
+    cpus: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            cpus.extend(range(int(a), int(b) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CpuAllocator:
+    """
+    Привязка запусков к ядрам: каждому выдается cores_per_job наименее занятых ядер из cpus
+    (при равенстве — с меньшим номером), после завершения ядра возвращаются. Одновременные
+    запуски так расходятся по разным ядрам, а при нехватке ядер делят их поровну.
+    """
+
+    def __init__(self, cpus: List[int], cores_per_job: int = 1):
+        self.cpus = list(cpus)
+        self.cores_per_job = max(1, min(cores_per_job, len(self.cpus))) if self.cpus else 0
+        self.load: Dict[int, int] = {c: 0 for c in self.cpus}
+        self.lock = threading.Lock()
+
+    def acquire(self) -> List[int]:
+        if not self.cpus:
+            return []
+        with self.lock:
+            chosen = sorted(self.cpus, key=lambda c: (self.load[c], c))[: self.cores_per_job]
+            for c in chosen:
+                self.load[c] += 1
+            return sorted(chosen)
+
+    def release(self, cpus: List[int]) -> None:
+        with self.lock:
+            for c in cpus:
+                if c in self.load and self.load[c] > 0:
+                    self.load[c] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"cores_per_job": self.cores_per_job, "load": dict(self.load)}
+
+
+class SandboxPolicy:
+    """
+    Лимиты одного запуска: адресное пространство (memory_mb), CPU-время (cpu_seconds), открытые файлы,
+    число процессов пользователя (nproc — считается на весь UID, root его не соблюдает), niceness
+    и привязка к ядрам (cores_per_job из cpus). 0 — без ограничения.
+    """
+
+    def __init__(
+        self,
+        memory_mb: int = 0,
+        cpu_seconds: int = 0,
+        open_files: int = 0,
+        nproc: int = 0,
+        nice: int = 0,
+        cpus: Optional[List[int]] = None,
+        cores_per_job: int = 0,
+    ):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.open_files = open_files
+        self.nproc = nproc
+        self.nice = nice
+        self.allocator = CpuAllocator(cpus or available_cpus(), cores_per_job) if cores_per_job > 0 else None
+
+    @classmethod
+    def from_env(cls, environ: Optional[Dict[str, str]] = None) -> "SandboxPolicy":
+        env = os.environ if environ is None else environ
+        cpus = env.get("UC_RUN_CPUS", "")
+        return cls(
+            memory_mb=int(env.get("UC_RUN_MAX_MEMORY_MB", "0")),
+            cpu_seconds=int(env.get("UC_RUN_MAX_CPU_SECONDS", "0")),
+            open_files=int(env.get("UC_RUN_MAX_OPEN_FILES", "0")),
+            nproc=int(env.get("UC_RUN_MAX_PROCS", "0")),
+            nice=int(env.get("UC_RUN_NICE", "0")),
+            cpus=parse_cpus(cpus) if cpus else None,
+            cores_per_job=int(env.get("UC_RUN_CORES_PER_JOB", "0")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        # без resource нет ни лимитов, ни wait4 — команды запускаются как раньше
+        return resource is not None and hasattr(os, "fork")
+
+    def limits(self) -> Dict[str, int]:
+        res = {"core": 0}  # без core dump от упавших запусков
+        if self.memory_mb:
+            res["as"] = self.memory_mb << 20
+        if self.cpu_seconds:
+            res["cpu"] = self.cpu_seconds
+        if self.open_files:
+            res["nofile"] = self.open_files
+        if self.nproc:
+            res["nproc"] = self.nproc
+        return res
+
+    def wrap(self, cmd: List[str], usage_fd: int, cpus: Optional[List[int]] = None) -> List[str]:
+        """Команда через запускатель: тот же интерпретатор, -I -S — без site и PYTHON* окружения."""
+        launcher = [sys.executable, "-I", "-S", os.path.abspath(__file__), "--usage-fd", str(usage_fd)]
+        launcher += ["--limits", json.dumps(self.limits(), separators=(",", ":"))]
+        if self.nice:
+            launcher += ["--nice", str(self.nice)]
+        if cpus:
+            launcher += ["--cpus", ",".join(str(c) for c in cpus)]
+        return launcher + ["--"] + list(cmd)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "limits": self.limits(),
+            "nice": self.nice,
+            "cpus": self.allocator.stats() if self.allocator else None,
+        }
+
+
+def read_usage(fd: int) -> Optional[Dict[str, Any]]:
+    """Прочитать отчет запускателя из своего конца канала (после выхода процесса) и закрыть его."""
+    chunks = []
+    try:
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+    try:
+        return json.loads(b"".join(chunks).decode("utf-8")) if chunks else None
+    except ValueError:
+        return None
+
+
+def _apply(limits: Dict[str, int], nice: int, cpus: List[int]) -> None:
+    # вызывается в дочернем процессе между fork и exec
+    for name, value in limits.items():
+        which = _rlimit(name)
+        if which is None:
+            continue
+        soft, hard = resource.getrlimit(which)
+        # поднять жесткий лимит без привилегий нельзя — берем меньшее из желаемого и текущего
+        value = value if hard == resource.RLIM_INFINITY else min(value, hard)
+        resource.setrlimit(which, (value, value))
+    if nice:
+        os.nice(nice)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+
+def launch(argv: List[str]) -> int:
+    """Точка входа запускателя: [--usage-fd N] [--limits JSON] [--nice N] [--cpus a,b] -- cmd..."""
+    sep = argv.index("--")
+    opts = dict(zip(argv[:sep:2], argv[1:sep:2]))
+    cmd = argv[sep + 1:]
+    usage_fd = int(opts.get("--usage-fd", "-1"))
+    limits = json.loads(opts.get("--limits", "{}"))
+    nice = int(opts.get("--nice", "0"))
+    cpus = parse_cpus(opts.get("--cpus", ""))
+
+    # сигналы остановки пересылаются команде: запуск завершается сам и успевает отчитаться.
+    # До fork они заблокированы — пришедший между fork и установкой обработчика сигнал
+    # дождется ее, а не завершит запускатель без отчета, оставив команду работать
+    stop_signals = {signal.SIGTERM, signal.SIGINT, signal.SIGHUP}
+    old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+    t0 = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # маска сигналов наследуется через exec — команде возвращаем исходную
+            signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+            if usage_fd >= 0:
+                os.close(usage_fd)
+            _apply(limits, nice, cpus)
+            os.execvp(cmd[0], cmd)
+        except BaseException as e:
+            os.write(2, f"sandbox: cannot start {cmd[0]}: {e}\n".encode("utf-8", errors="replace"))
+        os._exit(127)
+
+    def forward(signum: int, frame: Any) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    for signum in stop_signals:
+        signal.signal(signum, forward)
+    signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+    _, status, ru = os.wait4(pid, 0)
+    wall = time.monotonic() - t0
+
+    usage: Dict[str, Any] = {
+        "max_rss_bytes": ru.ru_maxrss * 1024 if sys.platform != "darwin" else ru.ru_maxrss,
+        "user_cpu_s": round(ru.ru_utime, 4),
+        "system_cpu_s": round(ru.ru_stime, 4),
+        "cpu_s": round(ru.ru_utime + ru.ru_stime, 4),
+        "wall_s": round(wall, 4),
+        "cpus": cpus,
+        "limits": limits,
+    }
+    sig = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+    if sig is not None:
+        usage["signal"] = signal.Signals(sig).name
+        # SIGXCPU — исчерпан лимит CPU; при RLIMIT_AS процесс обычно сам выходит с MemoryError/ENOMEM
+        if sig in (signal.SIGXCPU, signal.SIGKILL) and "cpu" in limits and usage["cpu_s"] >= limits["cpu"] - 1:
+            usage["limit_exceeded"] = "cpu"
+    if usage_fd >= 0:
+        try:
+            os.write(usage_fd, json.dumps(usage).encode("utf-8"))
+        finally:
+            os.close(usage_fd)
+    if sig is not None:
+        # завершаемся тем же сигналом — для родителя код возврата как без запускателя (-sig)
+        if sig not in (signal.SIGKILL, signal.SIGSTOP):
+            signal.signal(sig, signal.SIG_DFL)
+        os.kill(os.getpid(), sig)
+    return os.WEXITSTATUS(status)
+
+
+if __name__ == "__main__":
+    sys.exit(launch(sys.argv[1:]))
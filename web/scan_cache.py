@@ -0,0 +1,179 @@
+# =========================
+# Файл: web/scan_cache.py
+# =========================
+import os
+import json
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Поднимайте при изменении формата результата parse_definitions —
+# старый индекс тогда будет отброшен целиком.
+SCAN_INDEX_VERSION = 2
+
+
+def file_digest(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+
+def git_head(repo_root: Path) -> Optional[str]:
+    """Текущий HEAD репозитория (или None, если это не git-репозиторий)."""
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(repo_root), "rev-parse", "HEAD"],
+            capture_output=True, text=True, timeout=10
+        )
+    except Exception:
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip() or None
+
+
+class ScanCache:
+    """
+    Персистентный индекс сканирования одного репозитория.
+    Запись на файл: путь -> mtime_ns, size, sha1 содержимого и результат parse_definitions.
+    - stat совпал (и HEAD не менялся) — результат берем без чтения файла;
+    - stat изменился — читаем и хешируем; если хеш тот же, ast.parse не запускаем;
+    - иначе парсим заново.
+    После смены HEAD (например, git pull из /api/clone) быстрый путь по stat
+    отключается, пока один проход не перепроверит все файлы по хешу содержимого.
+    Режим проверки — у каждого прохода свой (begin_scan -> lookup(verify=...) -> end_scan),
+    поэтому одновременные сканы одного кеша не переключают его друг другу.
+    """
+
+    def __init__(self, index_path: Path, repo_root: Path):
+        self.index_path = Path(index_path)
+        self.repo_root = Path(repo_root)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.rehashed = 0
+        self.misses = 0
+        self.head: Optional[str] = None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._unverified = False  # HEAD сменился, а проход с проверкой содержимого еще не завершен
+        self._load()
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        if data.get("version") != SCAN_INDEX_VERSION:
+            return
+        self.head = data.get("head")
+        self.entries = data.get("entries", {})
+
+    def save(self) -> None:
+        with self.lock:
+            if not self._dirty:
+                return
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            # json.dumps, а не json.dump: потоковая запись идет через медленный чисто-питоновый кодировщик
+            data = json.dumps({"version": SCAN_INDEX_VERSION, "head": self.head, "entries": self.entries}, ensure_ascii=False)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    def begin_scan(self) -> bool:
+        """
+        Вызывается перед проходом: сверяем HEAD. Возвращает verify для lookup и end_scan этого
+        прохода: True — stat не доверяем, каждый файл сверяется по хешу содержимого.
+        """
+        head = git_head(self.repo_root)
+        with self.lock:
+            if head != self.head:
+                self.head = head
+                self._unverified = True
+                self._dirty = True
+            return self._unverified
+
+    def pending_verify(self) -> bool:
+        """Для чтения без прохода (module_call_map): доверять ли stat сейчас."""
+        with self.lock:
+            return self._unverified
+
+    def lookup(self, rel: str, st: os.stat_result, verify: bool = False) -> Optional[Dict[str, Any]]:
+        """Результат по stat без чтения файла; None — нужно читать содержимое."""
+        with self.lock:
+            entry = self.entries.get(rel)
+            if entry is None or verify:
+                return None
+            if entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size:
+                return None
+            self.hits += 1
+            return entry["result"]
+
+    def lookup_digest(self, rel: str, st: os.stat_result, digest: str) -> Optional[Dict[str, Any]]:
+        """Результат по хешу содержимого; заодно обновляем stat в записи."""
+        with self.lock:
+            entry = self.entries.get(rel)
+            if entry is None or entry["sha1"] != digest:
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns
+            entry["size"] = st.st_size
+            self.rehashed += 1
+            self._dirty = True
+            return entry["result"]
+
+    def store(self, rel: str, st: os.stat_result, digest: str, result: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": digest, "result": result}
+            self.misses += 1
+            self._dirty = True
+
+    def end_scan(self, seen: set, verify: bool = False) -> None:
+        """Удаляем записи о файлах, которых больше нет в дереве, и сохраняем индекс."""
+        with self.lock:
+            if verify:
+                # проход перепроверил все файлы — дальше снова можно доверять stat
+                self._unverified = False
+            stale = [rel for rel in self.entries if rel not in seen]
+            for rel in stale:
+                del self.entries[rel]
+            if stale:
+                self._dirty = True
+        self.save()
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.entries = {}
+            self.head = None
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "rehashed": self.rehashed,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "head": self.head,
+                "index": str(self.index_path),
+            }
+
+
+_caches: Dict[str, ScanCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_scan_cache(repo_root: Path, cache_dir: Path) -> ScanCache:
+    """Один экземпляр ScanCache на репозиторий в рамках процесса."""
+    repo_root = Path(repo_root).resolve()
+    key = str(repo_root)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+            cache = ScanCache(Path(cache_dir) / f"scan-{name}.json", repo_root)
+            _caches[key] = cache
+        return cache
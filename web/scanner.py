@@ -5,11 +5,15 @@ import os
 import sys
 import ast
 import json
+import time
 import configparser
 import subprocess
-import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .scan_cache import ScanCache, file_digest
+from .metrics import SCAN_FILES, SCAN_PARSE_SECONDS, SCAN_SECONDS, subprocess_outcome, track_subprocess
 
 def safe_eval_node_name(node: ast.AST) -> Optional[str]:
     try:
@@ -24,36 +28,134 @@ def safe_eval_node_name(node: ast.AST) -> Optional[str]:
         return None
     return None
 
+# Узлы, внутри которых не бывает определений, импортов и вызовов, — в них не спускаемся
+_LEAF_NODES = (
+    ast.Name, ast.Constant, ast.expr_context, ast.operator, ast.unaryop, ast.cmpop,
+    ast.boolop, ast.alias, ast.Pass, ast.Break, ast.Continue, ast.Global, ast.Nonlocal,
+)
+
+def is_main_guard(test: ast.AST) -> bool:
+    """if __name__ == "__main__" (в любом порядке операндов)."""
+    if not isinstance(test, ast.Compare) or len(test.ops) != 1 or not isinstance(test.ops[0], ast.Eq):
+        return False
+    pair = (test.left, test.comparators[0])
+    has_name = any(isinstance(n, ast.Name) and n.id == "__name__" for n in pair)
+    has_main = any(isinstance(n, ast.Constant) and n.value == "__main__" for n in pair)
+    return has_name and has_main
+
+class DefinitionVisitor(ast.NodeVisitor):
+    """
+    Однопроходный сбор определений. Вместо getattr("visit_" + имя класса) на каждом узле
+    используется таблица type -> обработчик; листовые узлы (_LEAF_NODES) не обходятся.
+    """
+
+    def __init__(self) -> None:
+        self.classes: List[str] = []
+        self.functions: List[str] = []
+        self.async_functions: List[str] = []
+        self.methods: Dict[str, List[str]] = {}
+        self.imports: List[str] = []
+        self.relative_imports: List[str] = []
+        self.uses_argparse = False
+        self.has_main_guard = False
+        # None — уровень модуля, имя класса — тело класса, "" — внутри функции
+        self._scope: Optional[str] = None
+        self._dispatch = {
+            ast.ClassDef: self.visit_ClassDef,
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.AsyncFunctionDef: self.visit_AsyncFunctionDef,
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom,
+            ast.Call: self.visit_Call,
+            ast.If: self.visit_If,
+        }
+
+    def visit(self, node: ast.AST) -> None:
+        handler = self._dispatch.get(type(node))
+        if handler is not None:
+            handler(node)
+        else:
+            self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, _LEAF_NODES):
+                        self.visit(item)
+            elif isinstance(value, ast.AST) and not isinstance(value, _LEAF_NODES):
+                self.visit(value)
+
+    def _visit_scoped(self, node: ast.AST, scope: Optional[str]) -> None:
+        outer = self._scope
+        self._scope = scope
+        self.generic_visit(node)
+        self._scope = outer
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append(node.name)
+        self.methods.setdefault(node.name, [])
+        self._visit_scoped(node, node.name)
+
+    def _visit_function(self, node: ast.AST) -> None:
+        if self._scope:
+            self.methods[self._scope].append(node.name)
+        self._visit_scoped(node, "")
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(node.name)
+        self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self.async_functions.append(node.name)
+        self._visit_function(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for a in node.names:
+            self.imports.append(a.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = node.module or ""
+        self.imports.append(module.split(".")[0])
+        if node.level:
+            self.relative_imports.append("." * node.level + module)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if not self.uses_argparse:
+            func = node.func
+            # дешевая проверка последнего звена до разбора всей цепочки атрибутов
+            tail = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if tail == "ArgumentParser" and safe_eval_node_name(func) in ("argparse.ArgumentParser", "ArgumentParser"):
+                self.uses_argparse = True
+        self.generic_visit(node)
+
+    def visit_If(self, node: ast.If) -> None:
+        if self._scope is None and not self.has_main_guard and is_main_guard(node.test):
+            self.has_main_guard = True
+        self.generic_visit(node)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "classes": self.classes,
+            "functions": self.functions,
+            "async_functions": self.async_functions,
+            "methods": self.methods,
+            "imports": self.imports,
+            "relative_imports": self.relative_imports,
+            "uses_argparse": self.uses_argparse,
+            "has_main_guard": self.has_main_guard,
+        }
+
+def extract_definitions(tree: ast.AST) -> Dict[str, Any]:
+    visitor = DefinitionVisitor()
+    visitor.visit(tree)
+    return visitor.result()
+
 def parse_definitions(content: str, fname: str) -> Dict[str, Any]:
-    """Парсим .py файл: классы, функции, импорты и наличие argparse."""
+    """Парсим .py файл: классы (с методами), функции, импорты, argparse и __main__-guard."""
     tree = ast.parse(content, filename=fname)
-    classes: List[str] = []
-    functions: List[str] = []
-    imports: List[str] = []
-    uses_argparse = False
-
-    for node in ast.walk(tree):
-        if isinstance(node, ast.ClassDef):
-            classes.append(node.name)
-        if isinstance(node, ast.FunctionDef):
-            functions.append(node.name)
-        if isinstance(node, (ast.Import, ast.ImportFrom)):
-            if isinstance(node, ast.Import):
-                for a in node.names:
-                    imports.append(a.name)
-            else:
-                module = node.module or ""
-                imports.append(module.split(".")[0])
-        if isinstance(node, ast.Call):
-            callee = safe_eval_node_name(node.func)
-            if callee in ("argparse.ArgumentParser", "ArgumentParser"):
-                uses_argparse = True
-    return {
-        "classes": classes,
-        "functions": functions,
-        "imports": imports,
-        "uses_argparse": uses_argparse,
-    }
+    return extract_definitions(tree)
 
 def read_setup_cfg(setup_cfg_path: Path) -> Dict[str, List[str]]:
     """Читаем entry points из setup.cfg [entry_points]."""
@@ -120,18 +222,22 @@ def detect_entrypoints(repo_root: Path) -> Dict[str, List[str]]:
         entry.update(read_pyproject_toml(pyproject))
     return entry
 
-def find_python_files(repo_root: Path, exclude_dirs: List[str] = None, max_files: int = 1000) -> List[Path]:
+def iter_python_files(repo_root: Path, exclude_dirs: List[str] = None, max_files: int = 1000) -> Iterator[Path]:
+    """Ленивый обход дерева: .py файлы отдаются по мере нахождения."""
     exclude_dirs = exclude_dirs or [".git", "__pycache__", ".pytest_cache", ".mypy_cache", "node_modules", ".venv", "venv", "env", ".env", "build", "dist"]
-    py_files: List[Path] = []
+    found = 0
     for root, dirs, files in os.walk(repo_root):
         # срезаем исключения
         dirs[:] = [d for d in dirs if d not in exclude_dirs and not d.startswith(".")]
         for f in files:
             if f.endswith(".py"):
-                py_files.append(Path(root) / f)
-                if len(py_files) >= max_files:
-                    return py_files
-    return py_files
+                yield Path(root) / f
+                found += 1
+                if found >= max_files:
+                    return
+
+def find_python_files(repo_root: Path, exclude_dirs: List[str] = None, max_files: int = 1000) -> List[Path]:
+    return list(iter_python_files(repo_root, exclude_dirs=exclude_dirs, max_files=max_files))
 
 def parse_requirements_txt(requirements_path: Path) -> List[str]:
     if not requirements_path.exists():
@@ -154,27 +260,123 @@ def detect_config_files(repo_root: Path) -> Dict[str, Any]:
                     with open(p, "r", encoding="utf-8") as f:
                         configs[cfg] = json.load(f)
                 else:
+                    import yaml  # только при наличии YAML-конфига — не на старте приложения
                     with open(p, "r", encoding="utf-8") as f:
                         configs[cfg] = yaml.safe_load(f) if cfg.endswith(".yaml") or cfg.endswith(".yml") else {}
             except Exception as e:
                 configs[cfg] = {"error": str(e)}
     return configs
 
-def scan_repo(repo_root: Path) -> Dict[str, Any]:
-    repo_root = Path(repo_root)
-    py_files = find_python_files(repo_root)
-    modules: Dict[str, Dict[str, Any]] = {}
-    for p in py_files:
-        try:
-            with open(p, "r", encoding="utf-8", errors="ignore") as f:
+def parse_file_job(job: Tuple[str, Optional[str]]) -> Dict[str, Any]:
+    """Задача разбора для пула процессов: (путь, содержимое или None — прочитать с диска)."""
+    fname, content = job
+    try:
+        if content is None:
+            with open(fname, "r", encoding="utf-8", errors="ignore") as f:
                 content = f.read()
-            rel = str(p.relative_to(repo_root))
-            modules[rel] = parse_definitions(content, str(p))
-        except Exception as e:
-            modules[str(p.relative_to(repo_root))] = {"error": str(e)}
+        return parse_definitions(content, fname)
+    except Exception as e:
+        return {"error": str(e)}
 
+def prepare_module(
+    p: Path, rel: str, cache: Optional[ScanCache] = None, verify: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[Any, Optional[str], Tuple[str, Optional[str]]]]]:
+    """
+    Готовый результат из кеша или задача на разбор (stat, sha1, job для parse_file_job).
+    Без кеша файл читает сам parse_file_job; verify — из cache.begin_scan() этого прохода.
+    """
+    if cache is None:
+        return None, (None, None, (str(p), None))
+    try:
+        st = p.stat()
+        cached = cache.lookup(rel, st, verify)
+        if cached is not None:
+            return cached, None
+        with open(p, "rb") as f:
+            raw = f.read()
+        digest = file_digest(raw)
+        cached = cache.lookup_digest(rel, st, digest)
+        if cached is not None:
+            return cached, None
+        return None, (st, digest, (str(p), raw.decode("utf-8", errors="ignore")))
+    except Exception as e:
+        return {"error": str(e)}, None
+
+def scan_modules(
+    repo_root: Path,
+    py_files: List[Path],
+    cache: Optional[ScanCache] = None,
+    workers: int = 0,
+    chunksize: int = 64,
+    verify: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Разбор списка файлов. С кешем ast.parse запускается только для изменившихся файлов.
+    workers > 1 — разбор в ProcessPoolExecutor пачками по chunksize;
+    порядок ключей результата совпадает с порядком py_files в любом режиме.
+    """
+    modules: Dict[str, Any] = {}
+    pending: List[Tuple[str, Any, Optional[str], Tuple[str, Optional[str]]]] = []
+    for p in py_files:
+        rel = str(p.relative_to(repo_root))
+        result, task = prepare_module(p, rel, cache, verify)
+        modules[rel] = result
+        if task is not None:
+            pending.append((rel,) + task)
+
+    jobs = [job for _, _, _, job in pending]
+    t0 = time.perf_counter()
+    if workers > 1 and len(jobs) > chunksize:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(parse_file_job, jobs, chunksize=chunksize))
+    else:
+        results = [parse_file_job(job) for job in jobs]
+    SCAN_PARSE_SECONDS.labels("full").observe(time.perf_counter() - t0)
+
+    for (rel, st, digest, _), result in zip(pending, results):
+        modules[rel] = result
+        if cache is not None:
+            cache.store(rel, st, digest, result)
+    count_scan_files(modules.values(), len(pending) - sum(1 for r in results if "error" in r))
+    return modules
+
+def count_scan_files(results: Iterable[Dict[str, Any]], parsed: int) -> None:
+    """uc_scan_files_total: error — с ошибкой, parsed — разобраны заново, cached — взяты из кеша."""
+    total = errors = 0
+    for r in results:
+        total += 1
+        if "error" in r:
+            errors += 1
+    SCAN_FILES.labels("parsed").inc(parsed)
+    SCAN_FILES.labels("cached").inc(total - errors - parsed)
+    SCAN_FILES.labels("error").inc(errors)
+
+def iter_scan_modules(
+    repo_root: Path, py_files: Iterable[Path], cache: Optional[ScanCache] = None, verify: bool = False
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Потоковый вариант scan_modules: (rel, результат) по одному файлу, в порядке обхода."""
+    parse_s = 0.0
+    for p in py_files:
+        rel = str(p.relative_to(repo_root))
+        result, task = prepare_module(p, rel, cache, verify)
+        if task is not None:
+            st, digest, job = task
+            t0 = time.perf_counter()
+            result = parse_file_job(job)
+            parse_s += time.perf_counter() - t0
+            if cache is not None:
+                cache.store(rel, st, digest, result)
+            SCAN_FILES.labels("error" if "error" in result else "parsed").inc()
+        else:
+            SCAN_FILES.labels("error" if "error" in result else "cached").inc()
+        yield rel, result
+    SCAN_PARSE_SECONDS.labels("stream").observe(parse_s)
+
+def scan_metadata(repo_root: Path) -> Dict[str, Any]:
+    """Все, кроме модулей: entrypoints, README, requirements, конфиги, лицензия."""
     entrypoints = detect_entrypoints(repo_root)
     readme = None
+    readme_file = None
     for p in ["README.md", "readme.md", "README.rst", "readme.rst", "README.txt"]:
         rp = repo_root / p
         if rp.exists():
@@ -206,8 +408,6 @@ def scan_repo(repo_root: Path) -> Dict[str, Any]:
                 pass
 
     return {
-        "repo_root": str(repo_root),
-        "modules": modules,
         "entrypoints": entrypoints,
         "readme": {"file": readme_file, "text": readme},
         "requirements": reqs,
@@ -215,20 +415,67 @@ def scan_repo(repo_root: Path) -> Dict[str, Any]:
         "license": license_file,
     }
 
-def module_call_map(repo_root: Path, selected_modules: List[str]) -> Dict[str, Any]:
-    """Собираем карту модулей: классы, функции, импорты; можно расширить поиск вызовов."""
+def scan_repo(
+    repo_root: Path,
+    cache: Optional[ScanCache] = None,
+    workers: int = 0,
+    chunksize: int = 64,
+    max_files: int = 1000,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    repo_root = Path(repo_root)
+    py_files = find_python_files(repo_root, max_files=max_files)
+    verify = cache.begin_scan() if cache is not None else False
+    modules = scan_modules(repo_root, py_files, cache=cache, workers=workers, chunksize=chunksize, verify=verify)
+    if cache is not None:
+        cache.end_scan(set(modules), verify)
+    res = {"repo_root": str(repo_root), "modules": modules, **scan_metadata(repo_root)}
+    SCAN_SECONDS.labels("full").observe(time.perf_counter() - t0)
+    return res
+
+def iter_scan_repo(
+    repo_root: Path, cache: Optional[ScanCache] = None, max_files: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковый scan_repo: запись {"type": "module", ...} на каждый файл по мере разбора,
+    в конце — {"type": "summary", ...} с метаданными репозитория и числом модулей.
+    """
+    t0 = time.perf_counter()
+    repo_root = Path(repo_root)
+    verify = cache.begin_scan() if cache is not None else False
+    seen = set()
+    errors = 0
+    for rel, result in iter_scan_modules(repo_root, iter_python_files(repo_root, max_files=max_files), cache, verify):
+        seen.add(rel)
+        if "error" in result:
+            errors += 1
+        yield {"type": "module", "path": rel, "data": result}
+    if cache is not None:
+        cache.end_scan(seen, verify)
+    SCAN_SECONDS.labels("stream").observe(time.perf_counter() - t0)
+    yield {"type": "summary", "repo_root": str(repo_root), "module_count": len(seen), "errors": errors, **scan_metadata(repo_root)}
+
+def module_call_map(repo_root: Path, selected_modules: List[str], cache: Optional[ScanCache] = None) -> Dict[str, Any]:
+    """
+    Собираем карту модулей: классы, функции, импорты. С cache неизменные файлы
+    берутся из индекса сканирования без повторного разбора; связи между модулями — code_index.
+    """
     repo_root = Path(repo_root)
     out: Dict[str, Any] = {}
+    verify = cache.pending_verify() if cache is not None else False
     for rel in selected_modules:
         p = repo_root / rel
         if not p.exists():
             continue
-        try:
-            with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            out[rel] = parse_definitions(content, str(p))
-        except Exception as e:
-            out[rel] = {"error": str(e)}
+        result, task = prepare_module(p, rel, cache, verify)
+        if task is not None:
+            st, digest, job = task
+            result = parse_file_job(job)
+            if cache is not None:
+                cache.store(rel, st, digest, result)
+        out[rel] = result
+    if cache is not None:
+        cache.save()
     return out
 
 def run_help_for_module(repo_root: Path, module: str, entry: str, python: str) -> Tuple[int, str, str]:
@@ -253,9 +500,14 @@ def run_help_for_module(repo_root: Path, module: str, entry: str, python: str) -
         # Сначала пробуем как модуль
         cmd = [python, "-m", module, "--help"]
 
-    try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=repo_root, timeout=20)
-        return proc.returncode, proc.stdout, proc.stderr
-    except Exception as e:
-        # fallback
-        return 2, "", f"Help run failed: {e}"
+    with track_subprocess("help") as t:
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=repo_root, timeout=20)
+            t.outcome = subprocess_outcome(proc.returncode)
+            return proc.returncode, proc.stdout, proc.stderr
+        except subprocess.TimeoutExpired:
+            t.outcome = "timeout"
+            return 124, "", "Help run failed: timeout 20s"
+        except Exception as e:
+            # fallback
+            return 2, "", f"Help run failed: {e}"
@@ -0,0 +1,310 @@
+# =========================
+# Файл: web/sweeps.py
+# =========================
+import copy
+import math
+import time
+import uuid
+import queue
+import random
+import itertools
+import threading
+import statistics
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .result_cache import ResultCache, canonical_hash
+
+FINAL_STATUSES = ("done", "stopped", "failed", "cached")
+
+
+def set_dotted(config: Dict[str, Any], key: str, value: Any) -> None:
+    """set_dotted(cfg, "training.lr", 1e-4) — промежуточные секции создаются при необходимости."""
+    parts = key.split(".")
+    node = config
+    for p in parts[:-1]:
+        node = node.setdefault(p, {})
+    node[parts[-1]] = value
+
+
+def apply_params(base: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    config = copy.deepcopy(base)
+    for k, v in params.items():
+        set_dotted(config, k, v)
+    return config
+
+
+def expand_grid(space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Полный перебор: space — {"training.lr": [1e-3, 1e-4], "model.hidden_size": [128, 256]}."""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def sample_random(space: Dict[str, Any], n_trials: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Случайный поиск. Значение в space — список (равновероятный выбор) или
+    {"min": a, "max": b, "log": bool, "int": bool} — непрерывный (или целочисленный) диапазон.
+    """
+    rnd = random.Random(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for k in sorted(space):
+            spec = space[k]
+            if isinstance(spec, list):
+                params[k] = rnd.choice(spec)
+                continue
+            lo, hi = spec["min"], spec["max"]
+            if spec.get("log"):
+                v = math.exp(rnd.uniform(math.log(lo), math.log(hi)))
+            else:
+                v = rnd.uniform(lo, hi)
+            params[k] = int(round(v)) if spec.get("int") else v
+        trials.append(params)
+    return trials
+
+
+def run_trial(config: Dict[str, Any], key: str, reports: Any, stops: Any) -> Dict[str, Any]:
+    """Выполняется в процессе пула: обучение с передачей метрик планировщику после каждой эпохи."""
+    from .uc_api import train
+
+    def report(step: int, metrics: Dict[str, Any]) -> bool:
+        reports.put((key, step, metrics))
+        return not stops.get(key, False)
+
+    return train(config, report=report)
+
+
+class Trial:
+    def __init__(self, index: int, params: Dict[str, Any], config: Dict[str, Any]):
+        self.index = index
+        self.params = params
+        self.config = config
+        self.cache_key = canonical_hash(config)
+        self.status = "queued"
+        self.history: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "params": self.params,
+            "status": self.status,
+            "history": self.history,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class Sweep:
+    def __init__(self, trials: List[Trial], metric: str, goal: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.trials = trials
+        self.metric = metric
+        self.goal = goal
+        self.created_at = time.time()
+
+    def value(self, trial: Trial) -> Optional[float]:
+        metrics = (trial.result or {}).get("metrics") or {}
+        v = metrics.get(self.metric)
+        return float(v) if isinstance(v, (int, float)) else None
+
+    def best(self) -> Optional[Dict[str, Any]]:
+        scored = [(self.value(t), t) for t in self.trials if t.status in ("done", "cached") and self.value(t) is not None]
+        if not scored:
+            return None
+        pick = min if self.goal == "min" else max
+        v, t = pick(scored, key=lambda x: x[0])
+        return {"index": t.index, "params": t.params, self.metric: v}
+
+    def to_dict(self, with_trials: bool = True) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for t in self.trials:
+            counts[t.status] = counts.get(t.status, 0) + 1
+        res: Dict[str, Any] = {
+            "id": self.id,
+            "metric": self.metric,
+            "goal": self.goal,
+            "finished": all(t.status in FINAL_STATUSES for t in self.trials),
+            "counts": counts,
+            "best": self.best(),
+            "created_at": self.created_at,
+        }
+        if with_trials:
+            res["trials"] = [t.to_dict() for t in self.trials]
+        return res
+
+
+class SweepManager:
+    """
+    Планировщик перебора гиперпараметров. Испытания выполняются в ограниченном пуле процессов
+    (не больше max_workers одновременно), метрики после каждой эпохи приходят через очередь.
+    Ранняя остановка — медианное правило: испытание, у которого метрика на шаге хуже медианы
+    остальных на том же шаге (при min_peers соседях и после grace_steps шагов), останавливается.
+    Завершенные испытания кешируются по хешу конфигурации и при повторе не запускаются; остановленные —
+    нет: решение об остановке зависело от соседних испытаний этого перебора.
+    Испытание завершает поток-монитор по маркеру в той же очереди отчетов: все отчеты процесса пула
+    уже стоят в ней раньше маркера, поэтому история в статусе done и в кеше полная.
+    """
+
+    def __init__(self, cache: ResultCache, max_workers: int = 2, grace_steps: int = 1, min_peers: int = 3, max_history: int = 50):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.grace_steps = grace_steps
+        self.min_peers = min_peers
+        self.max_history = max_history
+        self.sweeps: "OrderedDict[str, Sweep]" = OrderedDict()
+        self.lock = threading.RLock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager: Any = None
+        self._reports: Any = None
+        self._stops: Any = None
+        self._monitor: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        # вызывается под self.lock
+        if self._pool is not None:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._reports = self._manager.Queue()
+        self._stops = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="sweep-monitor", daemon=True)
+        self._monitor.start()
+
+    def submit(
+        self,
+        base: Dict[str, Any],
+        space: Dict[str, Any],
+        search: str = "grid",
+        n_trials: int = 10,
+        seed: int = 0,
+        metric: str = "loss",
+        goal: str = "min",
+    ) -> Sweep:
+        if search == "grid":
+            param_sets = expand_grid(space)
+        elif search == "random":
+            param_sets = sample_random(space, n_trials, seed)
+        else:
+            raise ValueError("search must be grid or random")
+        if goal not in ("min", "max"):
+            raise ValueError("goal must be min or max")
+        trials = [Trial(i, params, apply_params(base, params)) for i, params in enumerate(param_sets)]
+        sweep = Sweep(trials, metric, goal)
+        with self.lock:
+            self.sweeps[sweep.id] = sweep
+            self._prune()
+            for trial in trials:
+                cached = self.cache.get(trial.cache_key)
+                if cached is not None:
+                    trial.status = "cached"
+                    trial.result = cached.get("result")
+                    trial.history = cached.get("history", [])
+                    continue
+                self._start()
+                key = f"{sweep.id}:{trial.index}"
+                fut = self._pool.submit(run_trial, trial.config, key, self._reports, self._stops)
+                fut.add_done_callback(lambda f, s=sweep, t=trial: self._done(s, t, f))
+        return sweep
+
+    def _done(self, sweep: Sweep, trial: Trial, fut: Future) -> None:
+        try:
+            res = fut.result()
+        except Exception as e:
+            res = {"ok": False, "error": f"Trial failed: {e}"}
+        key = f"{sweep.id}:{trial.index}"
+        try:
+            # run_trial отправил все отчеты до возврата результата — маркер встанет после них
+            self._reports.put((key, None, res))
+        except Exception:
+            # менеджер очередей уже остановлен — завершаем без оставшихся отчетов
+            self._finish(key, res)
+
+    def _finish(self, key: str, res: Dict[str, Any]) -> None:
+        sweep_id, index = key.split(":")
+        with self.lock:
+            sweep = self.sweeps.get(sweep_id)
+            if sweep is None:
+                return
+            trial = sweep.trials[int(index)]
+            if res.get("ok"):
+                trial.result = res["result"]
+                trial.status = "stopped" if trial.result.get("stopped") else "done"
+            else:
+                trial.status = "failed"
+                trial.error = res.get("error")
+            if self._stops is not None:
+                self._stops.pop(key, None)
+        # неудачные не кешируем — их стоит перезапустить; остановленные — см. docstring класса
+        if trial.status == "done":
+            self.cache.put(trial.cache_key, {"result": trial.result, "history": trial.history}, meta={"params": trial.params})
+
+    def _report(self, key: str, step: int, metrics: Dict[str, Any]) -> None:
+        sweep_id, index = key.split(":")
+        with self.lock:
+            sweep = self.sweeps.get(sweep_id)
+            if sweep is None:
+                return
+            trial = sweep.trials[int(index)]
+            if trial.status in FINAL_STATUSES:
+                return
+            trial.status = "running"
+            trial.history.append({"step": step, **metrics})
+            if self._should_stop(sweep, trial, step, metrics):
+                self._stops[key] = True
+
+    def _monitor_loop(self) -> None:
+        while True:
+            try:
+                key, step, payload = self._reports.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if step is None:
+                self._finish(key, payload)
+            else:
+                self._report(key, step, payload)
+
+    def _should_stop(self, sweep: Sweep, trial: Trial, step: int, metrics: Dict[str, Any]) -> bool:
+        value = metrics.get(sweep.metric)
+        if not isinstance(value, (int, float)) or step < self.grace_steps:
+            return False
+        peers = []
+        for other in sweep.trials:
+            if other is trial:
+                continue
+            for h in other.history:
+                if h["step"] == step and isinstance(h.get(sweep.metric), (int, float)):
+                    peers.append(h[sweep.metric])
+                    break
+        if len(peers) < self.min_peers:
+            return False
+        median = statistics.median(peers)
+        return value > median if sweep.goal == "min" else value < median
+
+    def get(self, sweep_id: str) -> Optional[Sweep]:
+        return self.sweeps.get(sweep_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [s.to_dict(with_trials=False) for s in self.sweeps.values()]
+
+    def shutdown(self) -> None:
+        with self.lock:
+            pool, self._pool = self._pool, None
+            manager, self._manager = self._manager, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+    def _prune(self) -> None:
+        done = [sid for sid, s in self.sweeps.items() if all(t.status in FINAL_STATUSES for t in s.trials)]
+        for sid in done[: max(0, len(done) - self.max_history)]:
+            del self.sweeps[sid]
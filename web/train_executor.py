@@ -0,0 +1,243 @@
+# =========================
+# Файл: web/train_executor.py
+# =========================
+import time
+import uuid
+import importlib
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+FINAL_STATUSES = ("done", "failed", "cancelled")
+
+
+def warm_worker(modules: List[str]) -> None:
+    """Инициализатор процесса пула: заранее импортируем обвязку UC и тяжелые библиотеки."""
+    from .uc_api import ensure_repo_path
+    ensure_repo_path()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # модуль может отсутствовать в окружении — прогрев не обязателен
+            pass
+
+
+def ping() -> int:
+    return 0
+
+
+def run_training(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Выполняется в процессе пула: обычный uc_api.train без запуска нового интерпретатора."""
+    from .uc_api import train
+    return train(config)
+
+
+def parse_device_limits(spec: str) -> Dict[str, int]:
+    """"cpu=2,cuda=1" -> {"cpu": 2, "cuda": 1}."""
+    limits: Dict[str, int] = {}
+    for part in spec.split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            limits[k.strip()] = int(v)
+    return limits
+
+
+class TrainRun:
+    def __init__(self, config: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.device = str(config.get("runtime", {}).get("device", "cpu"))
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        # число отправок в пул и пул последней отправки (по нему узнаем, чей сбой пришел в _done)
+        self.attempts = 0
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "device": self.device,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "attempts": self.attempts,
+        }
+
+
+class TrainingExecutor:
+    """
+    Обучение в постоянном пуле процессов. Процессы создаются один раз (spawn) и при старте
+    импортируют UC и warm_modules, поэтому запуск не платит за старт интерпретатора и импорты.
+    На каждое устройство runtime.device — свой лимит одновременных запусков, остальные ждут
+    в очереди устройства.
+    Если процесс пула падает, ProcessPoolExecutor ломается целиком и обрывает все идущие в нем
+    запуски — какой из них уронил процесс, не узнать. Поэтому пул пересоздается, а каждый оборванный
+    запуск возвращается в начало очереди и выполняется заново с нуля (до max_retries раз);
+    запуск, чей пул сломался и на последней попытке, завершается с ошибкой.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        device_limits: Optional[Dict[str, int]] = None,
+        warm_modules: Optional[List[str]] = None,
+        max_history: int = 200,
+        max_retries: int = 1,
+        target: Callable[[Dict[str, Any]], Dict[str, Any]] = run_training,
+    ):
+        self.max_workers = max_workers
+        self.device_limits = device_limits or {}
+        self.warm_modules = warm_modules or []
+        self.max_history = max_history
+        self.max_retries = max_retries
+        self.target = target
+        self.runs: "OrderedDict[str, TrainRun]" = OrderedDict()
+        self.queues: Dict[str, Deque[TrainRun]] = {}
+        self.running: Dict[str, int] = {}
+        # RLock: done-callback уже завершенного future вызывается сразу, под тем же замком
+        self.lock = threading.RLock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_worker,
+                    initargs=(self.warm_modules,),
+                )
+            return self._pool
+
+    def warm(self) -> None:
+        """Поднять все процессы пула заранее (не дожидаясь первого запуска)."""
+        pool = self.pool()
+        for _ in range(self.max_workers):
+            pool.submit(ping)
+
+    def limit(self, device: str) -> int:
+        return self.device_limits.get(device, self.max_workers if device == "cpu" else 1)
+
+    def submit(self, config: Dict[str, Any]) -> TrainRun:
+        run = TrainRun(config)
+        with self.lock:
+            self.runs[run.id] = run
+            self.queues.setdefault(run.device, deque()).append(run)
+            self._dispatch(run.device)
+            self._prune()
+        return run
+
+    def _dispatch(self, device: str) -> None:
+        # вызывается под self.lock
+        queue = self.queues.get(device)
+        while queue and self.running.get(device, 0) < self.limit(device):
+            run = queue.popleft()
+            run.status = "running"
+            run.started_at = time.time()
+            run.attempts += 1
+            pool = self.pool()
+            try:
+                future = pool.submit(self.target, run.config)
+            except BrokenProcessPool:
+                # пул сломан (процесс упал) — пересоздаем и пробуем еще раз
+                self._reset_pool(pool)
+                pool = self.pool()
+                try:
+                    future = pool.submit(self.target, run.config)
+                except Exception as e:
+                    run.status = "failed"
+                    run.error = f"Training failed: {e}"
+                    run.finished_at = time.time()
+                    continue
+            self.running[device] = self.running.get(device, 0) + 1
+            run.executor = pool
+            run.future = future
+            future.add_done_callback(lambda fut, run=run: self._done(run, fut))
+
+    def _reset_pool(self, broken: Optional[ProcessPoolExecutor] = None) -> None:
+        """
+        Остановить пул. С broken — только если текущий пул все еще тот самый сломанный: поздний
+        callback старого пула не должен останавливать уже пересозданный и обрывать его запуски.
+        """
+        with self.lock:
+            if broken is not None and self._pool is not broken:
+                return
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, run: TrainRun, fut: Future) -> None:
+        retry = False
+        try:
+            res = fut.result()
+            run.result = res
+            run.status = "done" if res.get("ok") else "failed"
+            run.error = res.get("error")
+        except BrokenProcessPool as e:
+            self._reset_pool(run.executor)
+            retry = run.attempts <= self.max_retries
+            run.status = "failed"
+            run.error = f"Training worker crashed: {e}"
+        except Exception as e:
+            run.status = "failed"
+            run.error = f"Training failed: {e}"
+        with self.lock:
+            self.running[run.device] -= 1
+            if retry:
+                # запуск мог и не быть причиной падения — выполняем заново раньше ожидающих
+                run.status = "queued"
+                run.future = run.executor = None
+                self.queues.setdefault(run.device, deque()).appendleft(run)
+            else:
+                run.finished_at = time.time()
+            self._dispatch(run.device)
+
+    def get(self, run_id: str) -> Optional[TrainRun]:
+        return self.runs.get(run_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [r.to_dict() for r in self.runs.values()]
+
+    def cancel(self, run_id: str) -> Optional[TrainRun]:
+        """Отменить можно только ожидающий запуск; уже идущий процесс пула не прерывается."""
+        with self.lock:
+            run = self.runs.get(run_id)
+            if run is None or run.status != "queued":
+                return run
+            self.queues[run.device].remove(run)
+            run.status = "cancelled"
+            run.finished_at = time.time()
+            return run
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            devices = set(self.queues) | set(self.running) | set(self.device_limits)
+            return {
+                "workers": self.max_workers,
+                "started": self._pool is not None,
+                "devices": {
+                    d: {"limit": self.limit(d), "running": self.running.get(d, 0), "queued": len(self.queues.get(d, ()))}
+                    for d in sorted(devices)
+                },
+            }
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+    def _prune(self) -> None:
+        finished = [rid for rid, r in self.runs.items() if r.status in FINAL_STATUSES]
+        for rid in finished[: max(0, len(finished) - self.max_history)]:
+            del self.runs[rid]
@@ -1,32 +1,78 @@
 # =========================
 # Файл: web/uc_api.py
 # =========================
+import os
 import sys
 import json
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-# Добавим путь к репозиторию, чтобы импортировать UC как пакет
-REPO_ROOT = Path(__file__).parent.parent.parent / "data" / "repos" / "UC"
-if str(REPO_ROOT) not in sys.path:
-    sys.path.insert(0, str(REPO_ROOT))
+from .model_registry import ModelRegistry
+from .batching import BatchScheduler
+from .result_cache import ResultCache, canonical_hash, dataset_fingerprint
+from .datasets import MmapCsvDataset, open_dataset
+from .metrics import INFER_ITEMS, INFER_SECONDS, REGISTRY
 
-def train(config: Dict[str, Any]) -> Dict[str, Any]:
+DATA_DIR = Path(os.environ.get("UC_DATA_DIR", str(Path(__file__).parent.parent.parent / "data")))
+REPO_ROOT = DATA_DIR / "repos" / "UC"
+EVAL_CACHE_DIR = DATA_DIR / "cache" / "eval"
+DATASET_CACHE_DIR = DATA_DIR / "cache" / "datasets"
+
+def ensure_repo_path() -> None:
+    """Добавим путь к репозиторию, чтобы импортировать UC как пакет — не при импорте модуля, а перед первым обращением к UC."""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+def set_repo_root(path: Path) -> None:
+    """
+    Другой checkout UC для этого процесса (процесс репозитория из RepoRegistry). Вызывать до
+    первого обращения к UC: уже импортированные модули UC из sys.modules не выгружаются.
+    """
+    global REPO_ROOT
+    if str(REPO_ROOT) in sys.path:
+        sys.path.remove(str(REPO_ROOT))
+    REPO_ROOT = Path(path)
+
+def load_split(config: Dict[str, Any], split: str = "train") -> MmapCsvDataset:
+    """Датасет из config["dataset"][split] через mmap-индекс (без чтения CSV целиком)."""
+    path = config.get("dataset", {}).get(split)
+    if not path:
+        raise ValueError(f"dataset.{split} is not set in config")
+    return open_dataset(Path(path), DATASET_CACHE_DIR)
+
+def iter_batches(config: Dict[str, Any], split: str = "train", columnar: bool = False) -> Iterator[Dict[str, Any]]:
+    """Батчи по training.batch_size строк; columnar=True — через закешированный колоночный формат."""
+    batch_size = int(config.get("training", {}).get("batch_size", 16))
+    return load_split(config, split).iter_batches(batch_size, columnar=columnar)
+
+def train(config: Dict[str, Any], report: Optional[Callable[[int, Dict[str, Any]], bool]] = None) -> Dict[str, Any]:
     """
     Пример train-обвязки. Замените импорты и логику на реальные из UC.
+    report(epoch, metrics) — промежуточные метрики после эпохи; False — остановить обучение досрочно.
     """
+    ensure_repo_path()
     # from uc.train import main  # пример импорта
     # Допустим, у UC есть функция train_from_config
     try:
         # from uc.train import train_from_config
-        # result = train_from_config(config)
+        # result = train_from_config(config, callback=report)
         # Здесь заглушка:
-        result = {"status": "ok", "epochs": config.get("training", {}).get("epochs", 1), "device": config.get("runtime", {}).get("device", "cpu")}
+        epochs = config.get("training", {}).get("epochs", 1)
+        stopped = False
+        metrics: Dict[str, Any] = {}
+        for epoch in range(epochs):
+            metrics = {"loss": 1.0 / (epoch + 1)}
+            if report is not None and report(epoch, metrics) is False:
+                stopped = True
+                break
+        result = {"status": "ok", "epochs": epochs, "device": config.get("runtime", {}).get("device", "cpu"), "metrics": metrics, "stopped": stopped}
         return {"ok": True, "result": result}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
 def eval_model(config: Dict[str, Any]) -> Dict[str, Any]:
+    ensure_repo_path()
     try:
         # from uc.eval import evaluate
         # res = evaluate(config)
@@ -35,11 +81,110 @@ def eval_model(config: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+# Результаты eval_model на диске: TTL и общий размер задаются через окружение
+eval_cache = ResultCache(
+    EVAL_CACHE_DIR,
+    ttl=float(os.environ.get("UC_EVAL_CACHE_TTL", "86400")),
+    max_bytes=int(os.environ.get("UC_EVAL_CACHE_MAX_MB", "256")) << 20,
+)
+
+def eval_cache_key(config: Dict[str, Any]) -> str:
+    """Ключ: канонический хеш конфигурации + отпечаток val-датасета (размер, mtime, sha256)."""
+    val_path = config.get("dataset", {}).get("val")
+    return canonical_hash({"config": config, "dataset": dataset_fingerprint(val_path)})
+
+def eval_model_cached(config: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
+    """eval_model с мемоизацией; refresh=True — пересчитать и перезаписать запись."""
+    try:
+        key = eval_cache_key(config)
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    if not refresh:
+        cached = eval_cache.get(key)
+        if cached is not None:
+            return {"ok": True, "result": cached, "cached": True}
+    res = eval_model(config)
+    if res.get("ok"):
+        eval_cache.put(key, res["result"], meta={"model": config.get("model"), "val": config.get("dataset", {}).get("val")})
+    return {**res, "cached": False}
+
+class StubModel:
+    """Заглушка модели UC: держит свою конфигурацию и отдает фиксированный ответ."""
+
+    def __init__(self, name: str, hidden_size: int, device: str):
+        self.name = name
+        self.hidden_size = hidden_size
+        self.device = device
+
+    @property
+    def nbytes(self) -> int:
+        # оценка для бюджета памяти реестра: один слой hidden_size x hidden_size в float32
+        return self.hidden_size * self.hidden_size * 4
+
+    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"prediction": "UC-123", "confidence": 0.98}
+
+    def predict_batch(self, inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.predict(x) for x in inputs]
+
+def load_model(config: Dict[str, Any]) -> Any:
+    """Загрузка весов и конфигурации модели — вызывается реестром один раз на конфигурацию."""
+    ensure_repo_path()
+    # from uc.infer import load_model as uc_load_model
+    # return uc_load_model(config)
+    model_cfg = config.get("model", {})
+    return StubModel(
+        model_cfg.get("name", "UCModel"),
+        model_cfg.get("hidden_size", 256),
+        config.get("runtime", {}).get("device", "cpu"),
+    )
+
+# Прогретые модели: бюджет памяти и число моделей задаются через окружение
+models = ModelRegistry(
+    load_model,
+    memory_budget=int(os.environ.get("UC_MODEL_MEMORY_MB", "2048")) << 20,
+    max_models=int(os.environ.get("UC_MAX_MODELS", "4")),
+)
+
 def infer_model(config: Dict[str, Any], input_data: Dict[str, Any]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
     try:
+        model = models.get(config)
         # from uc.infer import infer
-        # out = infer(config, input_data)
-        out = {"prediction": "UC-123", "confidence": 0.98}
+        # out = infer(model, input_data)
+        out = model.predict(input_data)
+        INFER_ITEMS.labels("single", "ok").inc()
         return {"ok": True, "result": out}
     except Exception as e:
+        INFER_ITEMS.labels("single", "error").inc()
         return {"ok": False, "error": str(e)}
+    finally:
+        INFER_SECONDS.labels("single").observe(time.perf_counter() - t0)
+
+def infer_batch(config: Dict[str, Any], inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Пакетный инференс: один вызов модели на весь список входов, ответы — в том же порядке."""
+    t0 = time.perf_counter()
+    try:
+        model = models.get(config)
+        # from uc.infer import infer_batch as uc_infer_batch
+        # outs = uc_infer_batch(model, inputs)
+        if hasattr(model, "predict_batch"):
+            outs = model.predict_batch(inputs)
+        else:
+            outs = [model.predict(x) for x in inputs]
+        INFER_ITEMS.labels("batch", "ok").inc(len(inputs))
+        return [{"ok": True, "result": out} for out in outs]
+    except Exception as e:
+        INFER_ITEMS.labels("batch", "error").inc(len(inputs))
+        return [{"ok": False, "error": str(e)} for _ in inputs]
+    finally:
+        INFER_SECONDS.labels("batch").observe(time.perf_counter() - t0)
+
+# Микро-батчинг /api/uc/infer: UC_INFER_MAX_BATCH=1 отключает его
+batcher = BatchScheduler(
+    infer_batch,
+    max_batch_size=int(os.environ.get("UC_INFER_MAX_BATCH", "32")),
+    max_wait_ms=float(os.environ.get("UC_INFER_MAX_WAIT_MS", "5")),
+)
+REGISTRY.register("uc_infer_batch_size", "histogram", "Micro-batch sizes of /api/uc/infer", batcher.batch_sizes)
+REGISTRY.register("uc_infer_queue_wait_ms", "histogram", "Time /api/uc/infer requests wait for their batch, ms", batcher.queue_wait_ms)
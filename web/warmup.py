@@ -0,0 +1,69 @@
+# =========================
+# Файл: web/warmup.py
+# =========================
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class Warmup:
+    """
+    Прогрев после старта: шаги (импорты тяжелых модулей, шаблоны, пул обучения) выполняются
+    по очереди в фоновом потоке, пока приложение уже отвечает на /health. Состояние —
+    pending -> running -> ready (или failed, если упал шаг с required=True).
+    """
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any], bool]] = []
+        self.state = "pending"
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, name: str, fn: Callable[[], Any], required: bool = True) -> None:
+        self.steps.append((name, fn, required))
+
+    def run(self) -> None:
+        with self.lock:
+            if self.state != "pending":
+                return
+            self.state = "running"
+            self.started_at = time.time()
+        failed = False
+        for name, fn, required in self.steps:
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.errors[name] = str(e)
+                failed = failed or required
+            self.timings[name] = round(time.perf_counter() - t0, 4)
+        self.finished_at = time.time()
+        self.state = "failed" if failed else "ready"
+
+    def start(self) -> None:
+        """Запустить прогрев в фоновом потоке (повторный вызов ничего не делает)."""
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 4)
+        return {
+            "state": self.state,
+            "steps": [name for name, _, _ in self.steps],
+            "timings": dict(self.timings),
+            "errors": dict(self.errors),
+            "elapsed": elapsed,
+        }